@@ -0,0 +1,47 @@
+"""Add embedding_cache table for content-addressed chunk embeddings
+
+Revision ID: 13
+Revises: 12
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "13"
+down_revision: Union[str, None] = "12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - add embedding_cache table."""
+
+    # The embedding column is dimensionless so that several embedding models
+    # can share the cache
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            id SERIAL PRIMARY KEY,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            model_name VARCHAR NOT NULL,
+            content_hash VARCHAR(64) NOT NULL,
+            embedding VECTOR NOT NULL,
+            last_used_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            CONSTRAINT uq_embedding_cache_model_content_hash UNIQUE (model_name, content_hash)
+        )
+    """)
+
+    op.create_index(op.f('ix_embedding_cache_id'), 'embedding_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_embedding_cache_created_at'), 'embedding_cache', ['created_at'], unique=False)
+    op.create_index(op.f('ix_embedding_cache_last_used_at'), 'embedding_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema - remove embedding_cache table."""
+
+    op.drop_index(op.f('ix_embedding_cache_last_used_at'), table_name='embedding_cache')
+    op.drop_index(op.f('ix_embedding_cache_created_at'), table_name='embedding_cache')
+    op.drop_index(op.f('ix_embedding_cache_id'), table_name='embedding_cache')
+    op.drop_table('embedding_cache')
@@ -0,0 +1,40 @@
+"""Add position column to chunks to keep chunk order across incremental updates
+
+Revision ID: 14
+Revises: 13
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "14"
+down_revision: Union[str, None] = "13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - add chunks.position and backfill it from insertion order."""
+
+    op.add_column('chunks', sa.Column('position', sa.Integer(), nullable=True))
+
+    # Existing chunks were inserted in document order
+    op.execute("""
+        UPDATE chunks
+        SET position = ordered.position
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY document_id ORDER BY id) - 1 AS position
+            FROM chunks
+        ) AS ordered
+        WHERE chunks.id = ordered.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema - remove chunks.position."""
+
+    op.drop_column('chunks', 'position')
@@ -0,0 +1,52 @@
+"""Add stored tsvector columns to documents and chunks for keyword search
+
+Revision ID: 15
+Revises: 14
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "15"
+down_revision: Union[str, None] = "14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - add generated content_tsv columns and index them."""
+
+    # Generated columns are computed for existing rows when they are added
+    op.execute("""
+        ALTER TABLE documents
+        ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+    """)
+    op.execute("""
+        ALTER TABLE chunks
+        ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+    """)
+
+    op.execute("CREATE INDEX IF NOT EXISTS document_content_tsv_index ON documents USING gin (content_tsv)")
+    op.execute("CREATE INDEX IF NOT EXISTS chucks_content_tsv_index ON chunks USING gin (content_tsv)")
+
+    # The expression indexes are replaced by the column indexes
+    op.execute("DROP INDEX IF EXISTS document_search_index")
+    op.execute("DROP INDEX IF EXISTS chucks_search_index")
+
+
+def downgrade() -> None:
+    """Downgrade schema - restore the expression indexes and drop content_tsv."""
+
+    op.execute("CREATE INDEX IF NOT EXISTS document_search_index ON documents USING gin (to_tsvector('english', content))")
+    op.execute("CREATE INDEX IF NOT EXISTS chucks_search_index ON chunks USING gin (to_tsvector('english', content))")
+
+    op.execute("DROP INDEX IF EXISTS document_content_tsv_index")
+    op.execute("DROP INDEX IF EXISTS chucks_content_tsv_index")
+
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS content_tsv")
+    op.execute("ALTER TABLE chunks DROP COLUMN IF EXISTS content_tsv")
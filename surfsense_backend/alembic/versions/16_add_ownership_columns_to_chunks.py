@@ -0,0 +1,105 @@
+"""Add search_space_id and document_type to chunks so searches can filter without joins
+
+Revision ID: 16
+Revises: 15
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "16"
+down_revision: Union[str, None] = "15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - add chunks.search_space_id and chunks.document_type, kept in sync by triggers."""
+
+    op.add_column('chunks', sa.Column('search_space_id', sa.Integer(), nullable=True))
+    op.add_column(
+        'chunks',
+        sa.Column(
+            'document_type',
+            postgresql.ENUM(name='documenttype', create_type=False),
+            nullable=True,
+        ),
+    )
+
+    # Backfill from the documents
+    op.execute("""
+        UPDATE chunks
+        SET search_space_id = documents.search_space_id, document_type = documents.document_type
+        FROM documents
+        WHERE chunks.document_id = documents.id
+    """)
+
+    op.alter_column('chunks', 'search_space_id', nullable=False)
+    op.alter_column('chunks', 'document_type', nullable=False)
+    op.create_foreign_key(
+        'chunks_search_space_id_fkey', 'chunks', 'searchspaces',
+        ['search_space_id'], ['id'], ondelete='CASCADE',
+    )
+    op.create_index(
+        'chunks_search_space_id_document_type_index', 'chunks',
+        ['search_space_id', 'document_type'],
+    )
+
+    # Copy the columns from the document when a chunk is inserted
+    op.execute("""
+        CREATE OR REPLACE FUNCTION chunks_copy_document_columns() RETURNS trigger AS $$
+        BEGIN
+            SELECT search_space_id, document_type
+            INTO NEW.search_space_id, NEW.document_type
+            FROM documents
+            WHERE id = NEW.document_id;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS chunks_copy_document_columns ON chunks")
+    op.execute("""
+        CREATE TRIGGER chunks_copy_document_columns
+        BEFORE INSERT OR UPDATE OF document_id ON chunks
+        FOR EACH ROW EXECUTE FUNCTION chunks_copy_document_columns()
+    """)
+
+    # Propagate changes of the document columns to its chunks
+    op.execute("""
+        CREATE OR REPLACE FUNCTION documents_propagate_columns_to_chunks() RETURNS trigger AS $$
+        BEGIN
+            UPDATE chunks
+            SET search_space_id = NEW.search_space_id, document_type = NEW.document_type
+            WHERE document_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS documents_propagate_columns_to_chunks ON documents")
+    op.execute("""
+        CREATE TRIGGER documents_propagate_columns_to_chunks
+        AFTER UPDATE OF search_space_id, document_type ON documents
+        FOR EACH ROW
+        WHEN (OLD.search_space_id IS DISTINCT FROM NEW.search_space_id
+              OR OLD.document_type IS DISTINCT FROM NEW.document_type)
+        EXECUTE FUNCTION documents_propagate_columns_to_chunks()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema - remove the chunk ownership columns and their triggers."""
+
+    op.execute("DROP TRIGGER IF EXISTS documents_propagate_columns_to_chunks ON documents")
+    op.execute("DROP FUNCTION IF EXISTS documents_propagate_columns_to_chunks()")
+    op.execute("DROP TRIGGER IF EXISTS chunks_copy_document_columns ON chunks")
+    op.execute("DROP FUNCTION IF EXISTS chunks_copy_document_columns()")
+
+    op.drop_index('chunks_search_space_id_document_type_index', table_name='chunks')
+    op.drop_constraint('chunks_search_space_id_fkey', 'chunks', type_='foreignkey')
+    op.drop_column('chunks', 'document_type')
+    op.drop_column('chunks', 'search_space_id')
@@ -0,0 +1,185 @@
+"""Opt-in hash partitioning of documents and chunks by search space
+
+Only converts the tables when PARTITIONED_STORAGE=true, with STORAGE_PARTITIONS
+partitions (16 by default), the same variables app/config reads to map the
+models. Without it the migration does nothing. To switch an existing database,
+downgrade to 16, set the variables and upgrade again.
+
+The tables are rebuilt and their rows copied, so run it in a maintenance window
+on large databases. The vector indexes are created per partition by
+setup_indexes in app/db.py on the next startup, for the configured
+VECTOR_INDEX_STORAGE mode.
+
+Revision ID: 17
+Revises: 16
+"""
+
+import os
+from typing import List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "17"
+down_revision: Union[str, None] = "16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CHUNK_TRIGGERS = [
+    """
+    CREATE TRIGGER chunks_copy_document_columns
+    BEFORE INSERT OR UPDATE OF document_id ON chunks
+    FOR EACH ROW EXECUTE FUNCTION chunks_copy_document_columns()
+    """,
+    """
+    CREATE TRIGGER documents_propagate_columns_to_chunks
+    AFTER UPDATE OF search_space_id, document_type ON documents
+    FOR EACH ROW
+    WHEN (OLD.search_space_id IS DISTINCT FROM NEW.search_space_id
+          OR OLD.document_type IS DISTINCT FROM NEW.document_type)
+    EXECUTE FUNCTION documents_propagate_columns_to_chunks()
+    """,
+]
+
+# Indexes of the models and of setup_indexes, except the vector indexes
+INDEXES = [
+    "CREATE INDEX ix_documents_id ON documents (id)",
+    "CREATE INDEX ix_documents_title ON documents (title)",
+    "CREATE INDEX ix_documents_content_hash ON documents (content_hash)",
+    "CREATE INDEX ix_documents_created_at ON documents (created_at)",
+    "CREATE INDEX document_content_tsv_index ON documents USING gin (content_tsv)",
+    "CREATE INDEX ix_chunks_id ON chunks (id)",
+    "CREATE INDEX ix_chunks_created_at ON chunks (created_at)",
+    "CREATE INDEX chunks_search_space_id_document_type_index ON chunks (search_space_id, document_type)",
+    "CREATE INDEX chucks_content_tsv_index ON chunks USING gin (content_tsv)",
+]
+
+
+def _is_partitioned(table_name: str) -> bool:
+    bind = op.get_bind()
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(:table_name)"
+            ),
+            {"table_name": table_name},
+        ).scalar()
+    )
+
+
+def _stored_columns(table_name: str) -> List[str]:
+    """Columns of a table that can be copied, i.e. all but generated columns."""
+    bind = op.get_bind()
+    return [
+        row[0]
+        for row in bind.execute(
+            sa.text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = :table_name "
+                "AND is_generated = 'NEVER' ORDER BY ordinal_position"
+            ),
+            {"table_name": table_name},
+        )
+    ]
+
+
+def _rebuild_tables(partition_by: Union[str, None]) -> None:
+    """
+    Recreate documents and chunks, partitioned or not, and copy their rows.
+
+    Constraints are added by the callers, which differ between both layouts.
+    """
+    # Keep the id sequences when the old tables are dropped
+    op.execute("ALTER SEQUENCE documents_id_seq OWNED BY NONE")
+    op.execute("ALTER SEQUENCE chunks_id_seq OWNED BY NONE")
+
+    for table_name in ("documents", "chunks"):
+        op.execute(f"ALTER TABLE {table_name} RENAME TO {table_name}_old")
+        op.execute(
+            f"CREATE TABLE {table_name} (LIKE {table_name}_old INCLUDING DEFAULTS INCLUDING GENERATED)"
+            + (f" PARTITION BY {partition_by}" if partition_by else "")
+        )
+
+    if partition_by:
+        modulus = int(os.getenv("STORAGE_PARTITIONS", "16"))
+        for table_name in ("documents", "chunks"):
+            for remainder in range(modulus):
+                op.execute(
+                    f"CREATE TABLE {table_name}_p{remainder} PARTITION OF {table_name} "
+                    f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+                )
+
+    for table_name in ("documents", "chunks"):
+        columns = ", ".join(_stored_columns(f"{table_name}_old"))
+        op.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {table_name}_old")
+
+    op.execute("DROP TABLE chunks_old")
+    op.execute("DROP TABLE documents_old")
+
+    op.execute("ALTER SEQUENCE documents_id_seq OWNED BY documents.id")
+    op.execute("ALTER SEQUENCE chunks_id_seq OWNED BY chunks.id")
+
+
+def upgrade() -> None:
+    """Upgrade schema - partition documents and chunks by search_space_id if opted in."""
+
+    if os.getenv("PARTITIONED_STORAGE", "false").lower() != "true" or _is_partitioned("documents"):
+        return
+
+    _rebuild_tables("HASH (search_space_id)")
+
+    op.execute("ALTER TABLE documents ADD PRIMARY KEY (id, search_space_id)")
+    op.execute(
+        "ALTER TABLE documents ADD CONSTRAINT uq_documents_content_hash_search_space_id "
+        "UNIQUE (content_hash, search_space_id)"
+    )
+    op.execute(
+        "ALTER TABLE documents ADD CONSTRAINT documents_search_space_id_fkey "
+        "FOREIGN KEY (search_space_id) REFERENCES searchspaces (id) ON DELETE CASCADE"
+    )
+    op.execute("ALTER TABLE chunks ADD PRIMARY KEY (id, search_space_id)")
+    op.execute(
+        "ALTER TABLE chunks ADD CONSTRAINT chunks_document_id_search_space_id_fkey "
+        "FOREIGN KEY (document_id, search_space_id) REFERENCES documents (id, search_space_id) ON DELETE CASCADE"
+    )
+    op.execute(
+        "ALTER TABLE chunks ADD CONSTRAINT chunks_search_space_id_fkey "
+        "FOREIGN KEY (search_space_id) REFERENCES searchspaces (id) ON DELETE CASCADE"
+    )
+
+    for statement in INDEXES + CHUNK_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema - turn partitioned documents and chunks back into plain tables."""
+
+    if not _is_partitioned("documents"):
+        return
+
+    _rebuild_tables(None)
+
+    op.execute("ALTER TABLE documents ADD PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE documents ADD CONSTRAINT documents_content_hash_key UNIQUE (content_hash)"
+    )
+    op.execute(
+        "ALTER TABLE documents ADD CONSTRAINT documents_search_space_id_fkey "
+        "FOREIGN KEY (search_space_id) REFERENCES searchspaces (id) ON DELETE CASCADE"
+    )
+    op.execute("ALTER TABLE chunks ADD PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE chunks ADD CONSTRAINT chunks_document_id_fkey "
+        "FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE"
+    )
+    op.execute(
+        "ALTER TABLE chunks ADD CONSTRAINT chunks_search_space_id_fkey "
+        "FOREIGN KEY (search_space_id) REFERENCES searchspaces (id) ON DELETE CASCADE"
+    )
+
+    for statement in INDEXES + CHUNK_TRIGGERS:
+        op.execute(statement)
@@ -0,0 +1,79 @@
+"""Add search space corpus generations and the search_result_cache table
+
+Revision ID: 18
+Revises: 17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "18"
+down_revision: Union[str, None] = "17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGGER_EVENTS = {"INSERT": "NEW", "UPDATE": "NEW", "DELETE": "OLD"}
+
+
+def upgrade() -> None:
+    """Upgrade schema - add searchspaces.corpus_generation, its triggers and search_result_cache."""
+
+    op.add_column(
+        'searchspaces',
+        sa.Column('corpus_generation', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Bump the generation of the search spaces whose documents a statement changed
+    op.execute("""
+        CREATE OR REPLACE FUNCTION documents_bump_corpus_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE searchspaces
+            SET corpus_generation = corpus_generation + 1
+            WHERE id IN (SELECT DISTINCT search_space_id FROM changed_documents);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for event, transition_table in TRIGGER_EVENTS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS documents_{event.lower()}_bump_corpus_generation ON documents")
+        op.execute(f"""
+            CREATE TRIGGER documents_{event.lower()}_bump_corpus_generation
+            AFTER {event} ON documents
+            REFERENCING {transition_table} TABLE AS changed_documents
+            FOR EACH STATEMENT EXECUTE FUNCTION documents_bump_corpus_generation()
+        """)
+
+    # Cached results can be recomputed, so the table skips the write-ahead log
+    op.execute("""
+        CREATE UNLOGGED TABLE IF NOT EXISTS search_result_cache (
+            id SERIAL PRIMARY KEY,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            cache_key VARCHAR(64) NOT NULL UNIQUE,
+            results JSON NOT NULL,
+            last_used_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+        )
+    """)
+
+    op.create_index(op.f('ix_search_result_cache_id'), 'search_result_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_search_result_cache_created_at'), 'search_result_cache', ['created_at'], unique=False)
+    op.create_index(op.f('ix_search_result_cache_last_used_at'), 'search_result_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema - remove search_result_cache, the triggers and searchspaces.corpus_generation."""
+
+    op.drop_index(op.f('ix_search_result_cache_last_used_at'), table_name='search_result_cache')
+    op.drop_index(op.f('ix_search_result_cache_created_at'), table_name='search_result_cache')
+    op.drop_index(op.f('ix_search_result_cache_id'), table_name='search_result_cache')
+    op.drop_table('search_result_cache')
+
+    for event in TRIGGER_EVENTS:
+        op.execute(f"DROP TRIGGER IF EXISTS documents_{event.lower()}_bump_corpus_generation ON documents")
+    op.execute("DROP FUNCTION IF EXISTS documents_bump_corpus_generation()")
+
+    op.drop_column('searchspaces', 'corpus_generation')
@@ -0,0 +1,39 @@
+"""Add documents.simhash for near-duplicate detection at ingestion
+
+Existing documents keep a NULL fingerprint, as their source content is not
+stored, and are never matched as near-duplicates.
+
+Revision ID: 19
+Revises: 18
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "19"
+down_revision: Union[str, None] = "18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - add documents.simhash and an index on the recent documents of a type."""
+
+    op.add_column('documents', sa.Column('simhash', sa.BigInteger(), nullable=True))
+    op.create_index(
+        'documents_search_space_id_document_type_created_at_index',
+        'documents',
+        ['search_space_id', 'document_type', 'created_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - remove documents.simhash and its index."""
+
+    op.drop_index('documents_search_space_id_document_type_created_at_index', table_name='documents')
+    op.drop_column('documents', 'simhash')
@@ -0,0 +1,96 @@
+"""Move search space corpus generations to a striped counter table
+
+The document triggers updated the searchspaces row on every document change,
+which serialized concurrent writers to a search space on that row lock until
+commit. They now increment one of several counter rows per search space, picked
+by database connection, and the generation is the sum of the counters.
+
+Cached search results now store the corpus generation they were computed for,
+so existing entries are discarded.
+
+Revision ID: 20
+Revises: 19
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20"
+down_revision: Union[str, None] = "19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STRIPES = 16
+
+
+def upgrade() -> None:
+    """Upgrade schema - add search_space_corpus_generations and search_result_cache.corpus_generation."""
+
+    op.create_table(
+        'search_space_corpus_generations',
+        sa.Column('search_space_id', sa.Integer(), nullable=False),
+        sa.Column('stripe', sa.SmallInteger(), nullable=False),
+        sa.Column('generation', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['search_space_id'], ['searchspaces.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('search_space_id', 'stripe'),
+    )
+    op.execute("""
+        INSERT INTO search_space_corpus_generations (search_space_id, stripe, generation)
+        SELECT id, 0, corpus_generation FROM searchspaces WHERE corpus_generation > 0
+    """)
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION documents_bump_corpus_generation() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO search_space_corpus_generations AS counters (search_space_id, stripe, generation)
+            SELECT searchspaces.id, pg_backend_pid() % {STRIPES}, 1
+            FROM searchspaces
+            WHERE searchspaces.id IN (SELECT search_space_id FROM changed_documents)
+            ON CONFLICT (search_space_id, stripe)
+            DO UPDATE SET generation = counters.generation + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.drop_column('searchspaces', 'corpus_generation')
+
+    op.execute("TRUNCATE search_result_cache")
+    op.add_column('search_result_cache', sa.Column('corpus_generation', sa.BigInteger(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema - restore searchspaces.corpus_generation and remove the counter table."""
+
+    op.execute("TRUNCATE search_result_cache")
+    op.drop_column('search_result_cache', 'corpus_generation')
+
+    op.add_column(
+        'searchspaces',
+        sa.Column('corpus_generation', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.execute("""
+        UPDATE searchspaces
+        SET corpus_generation = counters.generation
+        FROM (
+            SELECT search_space_id, SUM(generation) AS generation
+            FROM search_space_corpus_generations
+            GROUP BY search_space_id
+        ) AS counters
+        WHERE searchspaces.id = counters.search_space_id
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION documents_bump_corpus_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE searchspaces
+            SET corpus_generation = corpus_generation + 1
+            WHERE id IN (SELECT DISTINCT search_space_id FROM changed_documents);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.drop_table('search_space_corpus_generations')
@@ -179,6 +179,9 @@ async def create_merged_podcast_audio(state: State, config: RunnableConfig) -> D
     
     # Merge audio files using ffmpeg
     try:
+        # Installs ffmpeg on first use if it is missing
+        app_config.ffmpeg_path
+
         # Create FFmpeg instance with the first input
         ffmpeg = FFmpeg().option("y")
         
@@ -21,6 +21,26 @@ class ResearchMode(Enum):
     REPORT_DEEPER = "REPORT_DEEPER"
 
 
+# Vector search preset of each research mode, see VECTOR_SEARCH_PRESETS in
+# app/retriver/vector_storage.py: quick answers favour latency, deeper reports recall
+RESEARCH_MODE_SEARCH_PRESETS = {
+    ResearchMode.QNA.value: "fast",
+    ResearchMode.REPORT_GENERAL.value: "balanced",
+    ResearchMode.REPORT_DEEP.value: "balanced",
+    ResearchMode.REPORT_DEEPER.value: "high_recall",
+}
+
+# Maximal Marginal Relevance settings of each research mode, used when
+# MMR_DIVERSIFICATION is enabled: lambda_mult weighs relevance against diversity
+# and top_k is the number of retrieved documents kept
+RESEARCH_MODE_MMR_SETTINGS = {
+    ResearchMode.QNA.value: {"lambda_mult": 0.7, "top_k": 20},
+    ResearchMode.REPORT_GENERAL.value: {"lambda_mult": 0.6, "top_k": 40},
+    ResearchMode.REPORT_DEEP.value: {"lambda_mult": 0.5, "top_k": 80},
+    ResearchMode.REPORT_DEEPER.value: {"lambda_mult": 0.5, "top_k": 120},
+}
+
+
 @dataclass(kw_only=True)
 class Configuration:
     """The configuration for the agent."""
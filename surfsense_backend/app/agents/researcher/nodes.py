@@ -1,15 +1,17 @@
 import asyncio
 import json
+import logging
 from typing import Any, Dict, List
 
+from app.config import config as app_config
 from app.db import async_session_maker
-from app.utils.connector_service import ConnectorService
+from app.utils.connector_service import LOCAL_DOCUMENT_TYPES, ConnectorService
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .configuration import Configuration, SearchMode
+from .configuration import Configuration, RESEARCH_MODE_MMR_SETTINGS, RESEARCH_MODE_SEARCH_PRESETS, SearchMode
 from .prompts import get_answer_outline_system_prompt
 from .state import State
 from .sub_section_writer.graph import graph as sub_section_writer_graph
@@ -23,6 +25,11 @@ from langgraph.types import StreamWriter
 # Additional imports for document fetching
 from sqlalchemy.future import select
 from app.db import Document, SearchSpace
+from app.retriver.documents_hybrid_search import DocumentHybridSearchRetriever
+from app.retriver.mmr import maximal_marginal_relevance
+from app.retriver.query_embedding_cache import get_query_embeddings
+
+logger = logging.getLogger(__name__)
 
 
 async def fetch_documents_by_ids(
@@ -65,15 +72,11 @@ async def fetch_documents_by_ids(
         documents_by_type = {}
         formatted_documents = []
         
+        # Fetch the concatenated chunks of all documents at once (similar to SearchMode.DOCUMENTS approach)
+        chunks_contents = await DocumentHybridSearchRetriever(db_session).fetch_chunks_content(documents)
+        
         for doc in documents:
-            # Fetch associated chunks for this document (similar to DocumentHybridSearchRetriever)
-            from app.db import Chunk
-            chunks_query = select(Chunk).where(Chunk.document_id == doc.id).order_by(Chunk.id)
-            chunks_result = await db_session.execute(chunks_query)
-            chunks = chunks_result.scalars().all()
-            
-            # Concatenate chunks content (similar to SearchMode.DOCUMENTS approach)
-            concatenated_chunks_content = " ".join([chunk.content for chunk in chunks]) if chunks else doc.content
+            concatenated_chunks_content = chunks_contents.get(doc.id, doc.content)
             
             # Format to match connector service return format
             formatted_doc = {
@@ -379,6 +382,89 @@ async def write_answer_outline(state: State, config: RunnableConfig, writer: Str
         print(f"Raw response: {response.content}")
         raise
 
+# Progress message streamed after searching each connector
+CONNECTOR_FOUND_MESSAGES = {
+    "YOUTUBE_VIDEO": "📹 Found {count} YouTube chunks related to your query",
+    "EXTENSION": "🧩 Found {count} Browser Extension chunks related to your query",
+    "CRAWLED_URL": "🌐 Found {count} Web Pages chunks related to your query",
+    "FILE": "📄 Found {count} Files chunks related to your query",
+    "SLACK_CONNECTOR": "💬 Found {count} Slack messages related to your query",
+    "NOTION_CONNECTOR": "📘 Found {count} Notion pages/blocks related to your query",
+    "GITHUB_CONNECTOR": "🐙 Found {count} GitHub files/issues related to your query",
+    "LINEAR_CONNECTOR": "📊 Found {count} Linear issues related to your query",
+    "TAVILY_API": "🔍 Found {count} Web Search results related to your query",
+    "LINKUP_API": "🔗 Found {count} Linkup results related to your query",
+    "DISCORD_CONNECTOR": "🗨️ Found {count} Discord messages related to your query",
+}
+
+
+async def search_connector(
+    connector_service: ConnectorService,
+    connector: str,
+    user_query: str,
+    user_id: str,
+    search_space_id: int,
+    top_k: int,
+    search_mode: SearchMode
+) -> tuple:
+    """
+    Search a single connector for a query.
+    
+    Args:
+        connector_service: The connector service to search with
+        connector: The connector to search
+        user_query: The search query
+        user_id: The user ID
+        search_space_id: The search space ID
+        top_k: Number of top results to retrieve
+        search_mode: Whether to search chunks or documents
+        
+    Returns:
+        tuple: (source_object, chunks). Unknown connectors return (None, []).
+    """
+    if connector == "TAVILY_API":
+        return await connector_service.search_tavily(
+            user_query=user_query,
+            user_id=user_id,
+            top_k=top_k
+        )
+
+    if connector == "LINKUP_API":
+        if top_k > 10:
+            linkup_mode = "deep"
+        else:
+            linkup_mode = "standard"
+
+        return await connector_service.search_linkup(
+            user_query=user_query,
+            user_id=user_id,
+            mode=linkup_mode
+        )
+
+    local_search_methods = {
+        "YOUTUBE_VIDEO": connector_service.search_youtube,
+        "EXTENSION": connector_service.search_extension,
+        "CRAWLED_URL": connector_service.search_crawled_urls,
+        "FILE": connector_service.search_files,
+        "SLACK_CONNECTOR": connector_service.search_slack,
+        "NOTION_CONNECTOR": connector_service.search_notion,
+        "GITHUB_CONNECTOR": connector_service.search_github,
+        "LINEAR_CONNECTOR": connector_service.search_linear,
+        "DISCORD_CONNECTOR": connector_service.search_discord,
+    }
+    search_method = local_search_methods.get(connector)
+    if search_method is None:
+        return None, []
+
+    return await search_method(
+        user_query=user_query,
+        user_id=user_id,
+        search_space_id=search_space_id,
+        top_k=top_k,
+        search_mode=search_mode
+    )
+
+
 async def fetch_relevant_documents(
     research_questions: List[str],
     user_id: str,
@@ -390,7 +476,8 @@ async def fetch_relevant_documents(
     top_k: int = 10,
     connector_service: ConnectorService = None,
     search_mode: SearchMode = SearchMode.CHUNKS,
-    user_selected_sources: List[Dict[str, Any]] = None
+    user_selected_sources: List[Dict[str, Any]] = None,
+    research_mode: str = None
 ) -> List[Dict[str, Any]]:
     """
     Fetch relevant documents for research questions using the provided connectors.
@@ -410,6 +497,7 @@ async def fetch_relevant_documents(
         state: The current state containing the streaming service
         top_k: Number of top results to retrieve per connector per question
         connector_service: An initialized connector service to use for searching
+        research_mode: The research mode, selecting the MMR_DIVERSIFICATION settings
         
     Returns:
         List of relevant documents
@@ -430,247 +518,122 @@ async def fetch_relevant_documents(
     all_raw_documents = []  # Store all raw documents
     all_sources = []  # Store all sources
     
-    for i, user_query in enumerate(research_questions):
-        # Stream question being researched
+    # Search every (question, connector) pair concurrently, each on its own session,
+    # with at most CONNECTOR_SEARCH_CONCURRENCY searches running at a time
+    search_semaphore = asyncio.Semaphore(max(1, app_config.CONNECTOR_SEARCH_CONCURRENCY))
+    connector_service.clear_prefetched_results()
+    local_connectors = [connector for connector in connectors_to_search if connector in LOCAL_DOCUMENT_TYPES]
+    prefetch_done = asyncio.Event()
+
+    def stream_error(message: str):
         if streaming_service and writer:
-            streaming_service.only_update_terminal(f"🧠 Researching question {i+1}/{len(research_questions)}: \"{user_query[:100]}...\"")
+            streaming_service.only_update_terminal(f"⚠️ {message}", "error")
             writer({"yeild_value": streaming_service._format_annotations()})
-            
-        # Use original research question as the query
-        reformulated_query = user_query
-        
-        # Process each selected connector
-        for connector in connectors_to_search:
+
+    async def prefetch(user_query: str = None, connector: str = None):
+        async with search_semaphore:
+            try:
+                async with async_session_maker() as prefetch_session:
+                    prefetch_service = connector_service.for_session(prefetch_session)
+                    if connector is not None:
+                        # One connector searched for all research questions at once
+                        await prefetch_service.prefetch_local_search_many(
+                            user_queries=research_questions,
+                            user_id=user_id,
+                            search_space_id=search_space_id,
+                            connectors=[connector],
+                            top_k=top_k,
+                            search_mode=search_mode
+                        )
+                    else:
+                        # All local connectors searched for one question at once
+                        await prefetch_service.prefetch_local_search(
+                            user_query=user_query,
+                            user_id=user_id,
+                            search_space_id=search_space_id,
+                            connectors=local_connectors,
+                            top_k=top_k,
+                            search_mode=search_mode
+                        )
+            except Exception as e:
+                # The pair searches below fall back to searching each connector separately
+                logger.warning(f"Error prefetching local connector results: {str(e)}")
+                stream_error(f"Batched search failed, searching each source separately: {str(e)}")
+
+    async def prefetch_local_connectors():
+        # Prefetch the local connectors on their own sessions, concurrently with the
+        # searches of the other connectors
+        try:
+            if search_mode == SearchMode.CHUNKS and len(research_questions) > 1:
+                await asyncio.gather(*(prefetch(connector=connector) for connector in local_connectors))
+            elif len(local_connectors) > 1:
+                await asyncio.gather(*(prefetch(user_query=user_query) for user_query in research_questions))
+        finally:
+            prefetch_done.set()
+
+    async def search_question_connector(question_index: int, user_query: str, connector: str):
+        if connector in LOCAL_DOCUMENT_TYPES:
+            # Use the prefetched results of local connectors
+            await prefetch_done.wait()
+
+        async with search_semaphore:
             # Stream connector being searched
             if streaming_service and writer:
                 connector_emoji = get_connector_emoji(connector)
                 friendly_name = get_connector_friendly_name(connector)
-                streaming_service.only_update_terminal(f"{connector_emoji} Searching {friendly_name} for relevant information...")
+                streaming_service.only_update_terminal(f"{connector_emoji} Searching {friendly_name} for question {question_index + 1}/{len(research_questions)}...")
                 writer({"yeild_value": streaming_service._format_annotations()})
-                
+
             try:
-                if connector == "YOUTUBE_VIDEO":
-                    source_object, youtube_chunks = await connector_service.search_youtube(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(youtube_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"📹 Found {len(youtube_chunks)} YouTube chunks related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                elif connector == "EXTENSION":
-                    source_object, extension_chunks = await connector_service.search_extension(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(extension_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"🧩 Found {len(extension_chunks)} Browser Extension chunks related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                elif connector == "CRAWLED_URL":
-                    source_object, crawled_urls_chunks = await connector_service.search_crawled_urls(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(crawled_urls_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"🌐 Found {len(crawled_urls_chunks)} Web Pages chunks related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                elif connector == "FILE":
-                    source_object, files_chunks = await connector_service.search_files(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(files_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"📄 Found {len(files_chunks)} Files chunks related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                    
-                elif connector == "SLACK_CONNECTOR":
-                    source_object, slack_chunks = await connector_service.search_slack(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(slack_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"💬 Found {len(slack_chunks)} Slack messages related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                elif connector == "NOTION_CONNECTOR":
-                    source_object, notion_chunks = await connector_service.search_notion(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(notion_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"📘 Found {len(notion_chunks)} Notion pages/blocks related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                elif connector == "GITHUB_CONNECTOR":
-                    source_object, github_chunks = await connector_service.search_github(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(github_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"🐙 Found {len(github_chunks)} GitHub files/issues related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
-                elif connector == "LINEAR_CONNECTOR":
-                    source_object, linear_chunks = await connector_service.search_linear(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        search_space_id=search_space_id,
-                        top_k=top_k,
-                        search_mode=search_mode
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(linear_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"📊 Found {len(linear_chunks)} Linear issues related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                        
-                elif connector == "TAVILY_API":
-                    source_object, tavily_chunks = await connector_service.search_tavily(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        top_k=top_k
-                    )
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(tavily_chunks)
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"🔍 Found {len(tavily_chunks)} Web Search results related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                        
-                elif connector == "LINKUP_API":
-                    if top_k > 10:
-                        linkup_mode = "deep"
-                    else:
-                        linkup_mode = "standard"
-                        
-                    source_object, linkup_chunks = await connector_service.search_linkup(
-                        user_query=reformulated_query,
-                        user_id=user_id,
-                        mode=linkup_mode
-                    )   
-                    
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(linkup_chunks) 
-                    
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"🔗 Found {len(linkup_chunks)} Linkup results related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                        
-                elif connector == "DISCORD_CONNECTOR":
-                    source_object, discord_chunks = await connector_service.search_discord(
-                        user_query=reformulated_query,
+                async with async_session_maker() as search_session:
+                    source_object, chunks = await search_connector(
+                        connector_service.for_session(search_session),
+                        connector,
+                        user_query=user_query,
                         user_id=user_id,
                         search_space_id=search_space_id,
                         top_k=top_k,
                         search_mode=search_mode
                     )
-                    # Add to sources and raw documents
-                    if source_object:
-                        all_sources.append(source_object)
-                    all_raw_documents.extend(discord_chunks)
-                    # Stream found document count
-                    if streaming_service and writer:
-                        streaming_service.only_update_terminal(f"🗨️ Found {len(discord_chunks)} Discord messages related to your query")
-                        writer({"yeild_value": streaming_service._format_annotations()})
-                    
+
+                # Stream found document count
+                if streaming_service and writer and connector in CONNECTOR_FOUND_MESSAGES:
+                    streaming_service.only_update_terminal(CONNECTOR_FOUND_MESSAGES[connector].format(count=len(chunks)))
+                    writer({"yeild_value": streaming_service._format_annotations()})
+
+                return source_object, chunks
 
             except Exception as e:
-                error_message = f"Error searching connector {connector}: {str(e)}"
-                print(error_message)
-                
+                logger.error(f"Error searching connector {connector}: {str(e)}")
+
                 # Stream error message
-                if streaming_service and writer:
-                    friendly_name = get_connector_friendly_name(connector)
-                    streaming_service.only_update_terminal(f"⚠️ Error searching {friendly_name}: {str(e)}", "error")
-                    writer({"yeild_value": streaming_service._format_annotations()})
-                
+                stream_error(f"Error searching {get_connector_friendly_name(connector)}: {str(e)}")
+
                 # Continue with other connectors on error
-                continue
+                return None, []
+
+    # Stream questions being researched
+    if streaming_service and writer:
+        for i, user_query in enumerate(research_questions):
+            streaming_service.only_update_terminal(f"🧠 Researching question {i+1}/{len(research_questions)}: \"{user_query[:100]}...\"")
+        writer({"yeild_value": streaming_service._format_annotations()})
+
+    # Use original research questions as the queries
+    _, *search_results = await asyncio.gather(
+        prefetch_local_connectors(),
+        *(
+            search_question_connector(i, user_query, connector)
+            for i, user_query in enumerate(research_questions)
+            for connector in connectors_to_search
+        )
+    )
+
+    # Merge results in question and connector order, independent of completion order
+    for source_object, chunks in search_results:
+        # Add to sources and raw documents
+        if source_object:
+            all_sources.append(source_object)
+        all_raw_documents.extend(chunks)
     
     # Deduplicate source objects by ID before streaming
     deduplicated_sources = []
@@ -743,9 +706,89 @@ async def fetch_relevant_documents(
         streaming_service.only_update_terminal(f"🧹 Found {len(deduplicated_docs)} unique document chunks after removing duplicates")
         writer({"yeild_value": streaming_service._format_annotations()})
     
+    # Keep a diverse subset of near-identical documents
+    mmr_settings = RESEARCH_MODE_MMR_SETTINGS.get(research_mode)
+    if app_config.MMR_DIVERSIFICATION and mmr_settings:
+        try:
+            diversified_docs = await diversify_documents(
+                deduplicated_docs,
+                research_questions,
+                user_id,
+                search_space_id,
+                connector_service,
+                search_mode,
+                **mmr_settings
+            )
+            if streaming_service and writer and len(diversified_docs) < len(deduplicated_docs):
+                streaming_service.only_update_terminal(f"🧭 Kept {len(diversified_docs)} diverse document chunks out of {len(deduplicated_docs)}")
+                writer({"yeild_value": streaming_service._format_annotations()})
+            deduplicated_docs = diversified_docs
+        except Exception as e:
+            # Fall back to all deduplicated documents
+            logger.warning(f"Error diversifying documents: {str(e)}")
+            if streaming_service and writer:
+                streaming_service.only_update_terminal(f"⚠️ Could not diversify document chunks, keeping all of them: {str(e)}", "error")
+                writer({"yeild_value": streaming_service._format_annotations()})
+    
     # Return deduplicated documents
     return deduplicated_docs
 
+
+async def diversify_documents(
+    documents: List[Dict[str, Any]],
+    research_questions: List[str],
+    user_id: str,
+    search_space_id: int,
+    connector_service: ConnectorService,
+    search_mode: SearchMode,
+    lambda_mult: float,
+    top_k: int
+) -> List[Dict[str, Any]]:
+    """
+    Keep a diverse subset of the retrieved search space documents with Maximal Marginal Relevance.
+    
+    Documents are selected on their stored embeddings, so near-identical chunks,
+    e.g. from overlapping Slack or Discord threads, don't crowd out other evidence.
+    Documents without stored embeddings, like web search results, are all kept.
+    
+    Args:
+        documents: The deduplicated retrieved documents
+        research_questions: The questions the documents were retrieved for
+        user_id: The user ID
+        search_space_id: The search space ID
+        connector_service: The connector service whose retrievers fetch the embeddings
+        search_mode: The search mode the documents were retrieved with
+        lambda_mult: Weight of relevance against diversity, see maximal_marginal_relevance
+        top_k: Number of search space documents to keep
+        
+    Returns:
+        The kept documents, in their original order
+    """
+    # Search space results are identified by their chunk or document ID
+    if search_mode == SearchMode.CHUNKS:
+        retriever = connector_service.chunk_retriever
+        keys = [doc.get("chunk_id") if isinstance(doc.get("chunk_id"), int) else None for doc in documents]
+    else:
+        retriever = connector_service.document_retriever
+        keys = [doc.get("document", {}).get("id") if "chunk_id" not in doc else None for doc in documents]
+    
+    embeddings = await retriever.fetch_embeddings([key for key in keys if key is not None], user_id, search_space_id)
+    candidates = [index for index, key in enumerate(keys) if key is not None and key in embeddings]
+    if len(candidates) <= top_k:
+        return documents
+    
+    query_embeddings = await get_query_embeddings(research_questions)
+    selected = await asyncio.to_thread(
+        maximal_marginal_relevance,
+        query_embeddings,
+        [embeddings[keys[index]] for index in candidates],
+        top_k,
+        lambda_mult
+    )
+    
+    dropped = set(candidates) - {candidates[index] for index in selected}
+    return [doc for index, doc in enumerate(documents) if index not in dropped]
+
 def get_connector_emoji(connector_name: str) -> str:
     """Get an appropriate emoji for a connector type."""
     connector_emojis = {
@@ -853,7 +896,11 @@ async def process_sections(state: State, config: RunnableConfig, writer: StreamW
                 writer({"yeild_value": streaming_service._format_annotations()})
         
         # Create connector service using state db_session
-        connector_service = ConnectorService(state.db_session, user_id=configuration.user_id)
+        connector_service = ConnectorService(
+            state.db_session,
+            user_id=configuration.user_id,
+            search_preset=RESEARCH_MODE_SEARCH_PRESETS.get(configuration.research_mode)
+        )
         await connector_service.initialize_counter()
         
         relevant_documents = await fetch_relevant_documents(
@@ -867,7 +914,8 @@ async def process_sections(state: State, config: RunnableConfig, writer: StreamW
             top_k=TOP_K,
             connector_service=connector_service,
             search_mode=configuration.search_mode,
-            user_selected_sources=user_selected_sources
+            user_selected_sources=user_selected_sources,
+            research_mode=configuration.research_mode
         )
     except Exception as e:
         error_message = f"Error fetching relevant documents: {str(e)}"
@@ -1174,7 +1222,11 @@ async def handle_qna_workflow(state: State, config: RunnableConfig, writer: Stre
                 writer({"yeild_value": streaming_service._format_annotations()})
         
         # Create connector service using state db_session
-        connector_service = ConnectorService(state.db_session, user_id=configuration.user_id)
+        connector_service = ConnectorService(
+            state.db_session,
+            user_id=configuration.user_id,
+            search_preset=RESEARCH_MODE_SEARCH_PRESETS.get(configuration.research_mode)
+        )
         await connector_service.initialize_counter()
         
         # Use the reformulated query as a single research question
@@ -1191,7 +1243,8 @@ async def handle_qna_workflow(state: State, config: RunnableConfig, writer: Stre
             top_k=TOP_K,
             connector_service=connector_service,
             search_mode=configuration.search_mode,
-            user_selected_sources=user_selected_sources
+            user_selected_sources=user_selected_sources,
+            research_mode=configuration.research_mode
         )
     except Exception as e:
         error_message = f"Error fetching relevant documents for QNA: {str(e)}"
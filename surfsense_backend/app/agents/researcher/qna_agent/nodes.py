@@ -2,7 +2,7 @@ from .configuration import Configuration
 from langchain_core.runnables import RunnableConfig
 from .state import State
 from typing import Any, Dict
-from app.config import config as app_config
+from app.utils.reranker_service import reranker_service
 from .prompts import get_qna_citation_system_prompt, get_qna_no_documents_system_prompt
 from langchain_core.messages import HumanMessage, SystemMessage
 from ..utils import (
@@ -34,13 +34,10 @@ async def rerank_documents(state: State, config: RunnableConfig) -> Dict[str, An
             "reranked_documents": []
         }
     
-    # Get reranker service from app config
-    reranker_service = getattr(app_config, "reranker_service", None)
-    
-    # Use documents as is if no reranker service is available
+    # Use documents as is if no reranker is configured
     reranked_docs = documents
     
-    if reranker_service:
+    if reranker_service.enabled:
         try:
             # Convert documents to format expected by reranker if needed
             reranker_input_docs = [
@@ -58,7 +55,7 @@ async def rerank_documents(state: State, config: RunnableConfig) -> Dict[str, An
             ]
             
             # Rerank documents using the user's query
-            reranked_docs = reranker_service.rerank_documents(user_query + "\n" + reformulated_query, reranker_input_docs)  
+            reranked_docs = await reranker_service.arerank_documents(user_query + "\n" + reformulated_query, reranker_input_docs)  
             
             # Sort by score in descending order
             reranked_docs.sort(key=lambda x: x.get("score", 0), reverse=True)
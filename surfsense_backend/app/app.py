@@ -1,3 +1,6 @@
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import Depends, FastAPI
@@ -11,6 +14,10 @@ from app.schemas import UserCreate, UserRead, UserUpdate
 
 from app.routes import router as crud_router
 from app.config import config
+from app.utils.chunking_service import chunking_service
+from app.utils.embedding_service import embedding_service
+from app.utils.reranker_service import reranker_service
+from app.retriver.vector_backend import vector_backend
 
 from app.users import (
     SECRET,
@@ -20,11 +27,57 @@ from app.users import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    startup_timings = {}
+
     # Not needed if you setup a migration system like Alembic
+    start = time.perf_counter()
     await create_db_and_tables()
+    startup_timings["database"] = time.perf_counter() - start
+
+    # Load the models now so that the first requests do not pay for it
+    if config.MODEL_WARMUP:
+        # Models of process pools are loaded by the pool workers, not by this process
+        pool_executors = [
+            executor
+            for executor in (
+                embedding_service.executor,
+                chunking_service.executor,
+                reranker_service.executor if reranker_service.enabled else None,
+            )
+            if executor is not None and executor.kind == "process"
+        ]
+        skip = set()
+        if embedding_service.uses_worker_model:
+            skip.add("embedding_model_instance")
+        if chunking_service.executor is not None:
+            skip.update({"chunker_instance", "code_chunker_instance"})
+        if reranker_service.executor.kind == "process":
+            skip.add("reranker_instance")
+        startup_timings.update(await asyncio.to_thread(config.warm_up, skip))
+
+        async def warm_up_workers(executor):
+            start = time.perf_counter()
+            await executor.warm_up()
+            startup_timings[f"{executor.name}_workers"] = time.perf_counter() - start
+
+        await asyncio.gather(*(warm_up_workers(executor) for executor in pool_executors))
+
+    logger.info(
+        f"Startup finished in {sum(startup_timings.values()):.2f}s ("
+        + ", ".join(f"{name}: {seconds:.2f}s" for name, seconds in startup_timings.items())
+        + ")"
+    )
     yield
+    await vector_backend.close()
+    embedding_service.executor.shutdown()
+    if chunking_service.executor:
+        chunking_service.executor.shutdown()
+    reranker_service.executor.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
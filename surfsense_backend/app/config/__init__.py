@@ -1,12 +1,13 @@
+import logging
 import os
 from pathlib import Path
 import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterable
 
-from chonkie import AutoEmbeddings, CodeChunker, RecursiveChunker
 from dotenv import load_dotenv
 
-from rerankers import Reranker
-
 
 # Get the base directory of the project
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -15,6 +16,17 @@ env_file = BASE_DIR / ".env"
 load_dotenv(env_file)
 
 
+# Maximum number of dimensions PGVector can index with HNSW per storage mode
+MAX_INDEXED_DIMENSIONS = {
+    "full": 2000,
+    "halfvec": 4000,
+    "binary": 64000,
+}
+
+
+logger = logging.getLogger(__name__)
+
+
 def is_ffmpeg_installed():
     """
     Check if ffmpeg is installed on the current system.
@@ -25,9 +37,46 @@ def is_ffmpeg_installed():
     return shutil.which("ffmpeg") is not None
 
 
+class LazyResource:
+    """
+    Config attribute that is loaded on first access, once per process.
 
-class Config:
-    # Check if ffmpeg is installed
+    Loading is guarded by a lock, so concurrent first accesses from several
+    threads load the resource only once. Importing app.config therefore stays
+    cheap for entry points that never use the models, such as alembic.
+    """
+
+    def __init__(self, loader: Callable):
+        """
+        Initialize the lazy resource
+
+        Args:
+            loader: Called with the config class to create the resource
+        """
+        self._loader = loader
+        self._lock = threading.RLock()
+        self._value = None
+        self.name = loader.__name__
+        self.loaded = False
+        self.load_time = 0.0
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    start = time.perf_counter()
+                    self._value = self._loader(owner)
+                    self.load_time = time.perf_counter() - start
+                    self.loaded = True
+                    logger.info(f"Loaded {self.name} in {self.load_time:.2f}s")
+        return self._value
+
+
+def _install_ffmpeg(cls):
+    """Make sure ffmpeg is installed and return its path."""
     if not is_ffmpeg_installed():
         import static_ffmpeg
         # ffmpeg installed on first call to add_paths(), threadsafe.
@@ -35,6 +84,62 @@ class Config:
         # check if ffmpeg is installed again
         if not is_ffmpeg_installed():
             raise ValueError("FFmpeg is not installed on the system. Please install it to use the Surfsense Podcaster.")
+    return shutil.which("ffmpeg")
+
+
+def _load_embedding_model(cls):
+    """Load the embedding model and check its dimension."""
+    from chonkie import AutoEmbeddings
+
+    model = AutoEmbeddings.get_embeddings(cls.EMBEDDING_MODEL)
+    dimension = getattr(model, "dimension", None)
+
+    # Check embedding dimension against the limit of the index storage mode
+    if dimension and dimension > MAX_INDEXED_DIMENSIONS[cls.VECTOR_INDEX_STORAGE]:
+        raise ValueError(
+            f"Embedding dimension for Model: {cls.EMBEDDING_MODEL} "
+            f"has {dimension} dimensions, which "
+            f"exceeds the maximum of {MAX_INDEXED_DIMENSIONS[cls.VECTOR_INDEX_STORAGE]} allowed by "
+            f"PGVector for VECTOR_INDEX_STORAGE={cls.VECTOR_INDEX_STORAGE}."
+        )
+
+    # Check the configured dimension matches the model
+    if dimension and dimension != cls.EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"EMBEDDING_DIMENSION is {cls.EMBEDDING_DIMENSION} but Model: {cls.EMBEDDING_MODEL} "
+            f"has {dimension} dimensions."
+        )
+    return model
+
+
+def _load_chunker(cls):
+    from chonkie import RecursiveChunker
+
+    return RecursiveChunker(
+        chunk_size=getattr(cls.embedding_model_instance, 'max_seq_length', 512)
+    )
+
+
+def _load_code_chunker(cls):
+    from chonkie import CodeChunker
+
+    return CodeChunker(
+        chunk_size=getattr(cls.embedding_model_instance, 'max_seq_length', 512)
+    )
+
+
+def _load_reranker(cls):
+    from rerankers import Reranker
+
+    return Reranker(
+        model_name=cls.RERANKERS_MODEL_NAME,
+        model_type=cls.RERANKERS_MODEL_TYPE,
+    )
+
+
+class Config:
+    # ffmpeg is installed on first use, e.g. by the Surfsense Podcaster
+    ffmpeg_path = LazyResource(_install_ffmpeg)
     
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL")
@@ -53,22 +158,127 @@ class Config:
     # Legacy environment variables removed in favor of user-specific configurations
 
     # Chonkie Configuration | Edit this to your needs
+    # Models are loaded on first use or by warm_up() in the app lifespan
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
-    embedding_model_instance = AutoEmbeddings.get_embeddings(EMBEDDING_MODEL)
-    chunker_instance = RecursiveChunker(
-        chunk_size=getattr(embedding_model_instance, 'max_seq_length', 512)
-    )
-    code_chunker_instance = CodeChunker(
-        chunk_size=getattr(embedding_model_instance, 'max_seq_length', 512)
-    )
+    # Dimension of EMBEDDING_MODEL. Setting it lets alembic and other entry points
+    # that only need the schema start without loading the model.
+    # Required, so the vector columns are defined without loading the model
+    EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "0"))
+    embedding_model_instance = LazyResource(_load_embedding_model)
+    embedding_dimension = EMBEDDING_DIMENSION
+    chunker_instance = LazyResource(_load_chunker)
+    code_chunker_instance = LazyResource(_load_code_chunker)
+    # Number of texts sent to the embedding model in a single forward pass
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    # Persistent chunk embedding cache keyed by (model, sha256 of text)
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+    # Executor running embedding inference off the event loop: "thread" or "process"
+    EMBEDDING_EXECUTOR = os.getenv("EMBEDDING_EXECUTOR", "thread")
+    EMBEDDING_EXECUTOR_WORKERS = int(os.getenv("EMBEDDING_EXECUTOR_WORKERS", "1"))
+    EMBEDDING_EXECUTOR_MAX_QUEUE = int(os.getenv("EMBEDDING_EXECUTOR_MAX_QUEUE", "64"))
+    # LRU cache of query embeddings shared by the retrievers
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+    QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+    # Hybrid search result cache invalidated by search space corpus generations:
+    # "memory" (per worker LRU), "database" (shared by all workers) or "off"
+    SEARCH_RESULT_CACHE_BACKEND = os.getenv("SEARCH_RESULT_CACHE_BACKEND", "memory").lower()
+    SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "1024"))
+    SEARCH_RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", "3600")) or None
+    
+    # Vector index storage: "full" (float32), "halfvec" (float16) or "binary" (binary quantized).
+    # Compact modes search a smaller index for VECTOR_RESCORE_FACTOR x more candidates
+    # and rescore them exactly against the full precision vectors.
+    VECTOR_INDEX_STORAGE = os.getenv("VECTOR_INDEX_STORAGE", "full").lower()
+    VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+
+    # Vector index type, "hnsw" or "ivfflat", and its build parameters. Indexes built
+    # with other settings are rebuilt on startup. IVFFlat should be built once the
+    # tables hold data, with about rows / 1000 lists.
+    VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+    HNSW_M = int(os.getenv("HNSW_M", "16"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+    IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "100"))
+    # Default query-time preset ("fast", "balanced" or "high_recall"), the researcher
+    # picks one per research mode
+    VECTOR_SEARCH_PRESET = os.getenv("VECTOR_SEARCH_PRESET", "fast").lower()
+
+    # pgvector iterative index scans for filtered ANN searches: "off",
+    # "strict_order" or "relaxed_order". When the search space or document type
+    # filters discard most of the nearest rows, the HNSW scan keeps going until
+    # it has found enough matching rows, up to VECTOR_MAX_SCAN_TUPLES. Requires
+    # pgvector 0.8+, so it is off by default.
+    VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "off").lower()
+    VECTOR_MAX_SCAN_TUPLES = int(os.getenv("VECTOR_MAX_SCAN_TUPLES", "20000"))
+
+    # Engine of the semantic half of the hybrid searches: "pgvector" searches the
+    # database indexes, "numpy" an exact in-process index synced per search space,
+    # persisted to NUMPY_VECTOR_STORE_PATH when set, at most every
+    # NUMPY_VECTOR_STORE_SAVE_INTERVAL seconds and on shutdown. The numpy engine scans
+    # every row of the searched search spaces, so it only suits small corpora.
+    # Keyword search stays in Postgres.
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pgvector").lower()
+    NUMPY_VECTOR_STORE_PATH = os.getenv("NUMPY_VECTOR_STORE_PATH", "")
+    NUMPY_VECTOR_STORE_SAVE_INTERVAL = float(os.getenv("NUMPY_VECTOR_STORE_SAVE_INTERVAL", "300"))
+
+    # Opt-in storage of documents and chunks in STORAGE_PARTITIONS hash partitions by
+    # search_space_id, each with its own vector and text indexes. Must match the schema
+    # created by alembic migration 17, which reads the same variables.
+    PARTITIONED_STORAGE = os.getenv("PARTITIONED_STORAGE", "false").lower() == "true"
+    STORAGE_PARTITIONS = int(os.getenv("STORAGE_PARTITIONS", "16"))
+
+    # Maximum characters of concatenated chunks returned per document in DOCUMENTS
+    # search mode (about 4 characters per token). 0 returns whole documents.
+    DOCUMENT_CHUNKS_CONTENT_MAX_CHARS = int(os.getenv("DOCUMENT_CHUNKS_CONTENT_MAX_CHARS", "0"))
+    # Diversify the documents retrieved by the researcher with Maximal Marginal
+    # Relevance, with the settings of RESEARCH_MODE_MMR_SETTINGS in the agent configuration
+    MMR_DIVERSIFICATION = os.getenv("MMR_DIVERSIFICATION", "false").lower() == "true"
+
+    # Documents longer than this many characters are chunked, embedded and inserted
+    # in batches of STREAMING_CHUNK_BATCH_SIZE chunks instead of all at once.
+    STREAMING_INGESTION_THRESHOLD = int(os.getenv("STREAMING_INGESTION_THRESHOLD", "500000"))
+    STREAMING_CHUNK_BATCH_SIZE = int(os.getenv("STREAMING_CHUNK_BATCH_SIZE", "256"))
+    # Process pool for chunking. Contents of at least CHUNKING_PARALLEL_THRESHOLD characters
+    # are split into segments of CHUNKING_SEGMENT_SIZE characters chunked in parallel.
+    # Set CHUNKING_WORKERS to 0 to chunk in a thread of the API process instead.
+    CHUNKING_WORKERS = int(os.getenv("CHUNKING_WORKERS", "2"))
+    CHUNKING_PARALLEL_THRESHOLD = int(os.getenv("CHUNKING_PARALLEL_THRESHOLD", "200000"))
+    CHUNKING_SEGMENT_SIZE = int(os.getenv("CHUNKING_SEGMENT_SIZE", "100000"))
+    # Maximum number of connector searches a research run performs concurrently,
+    # each on its own database session
+    CONNECTOR_SEARCH_CONCURRENCY = int(os.getenv("CONNECTOR_SEARCH_CONCURRENCY", "4"))
+    # Number of ranked results the /search API paginates through per query; later
+    # results are not reachable and the cap is returned with every page
+    SEARCH_API_MAX_RESULTS = int(os.getenv("SEARCH_API_MAX_RESULTS", "200"))
+    # Skip ingesting content whose SimHash is within NEAR_DUPLICATE_MAX_DISTANCE bits
+    # of one of the NEAR_DUPLICATE_WINDOW most recent documents of the same type.
+    # Only applies to NEAR_DUPLICATE_DOCUMENT_TYPES: extension captures by default,
+    # since a skipped file upload or crawl would silently drop the edited content.
+    NEAR_DUPLICATE_DETECTION = os.getenv("NEAR_DUPLICATE_DETECTION", "true").lower() == "true"
+    NEAR_DUPLICATE_DOCUMENT_TYPES = [
+        document_type.strip().upper()
+        for document_type in os.getenv("NEAR_DUPLICATE_DOCUMENT_TYPES", "EXTENSION").split(",")
+        if document_type.strip()
+    ]
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "3"))
+    NEAR_DUPLICATE_WINDOW = int(os.getenv("NEAR_DUPLICATE_WINDOW", "1000"))
     
     # Reranker's Configuration | Pinecode, Cohere etc. Read more at https://github.com/AnswerDotAI/rerankers?tab=readme-ov-file#usage
     RERANKERS_MODEL_NAME = os.getenv("RERANKERS_MODEL_NAME")
     RERANKERS_MODEL_TYPE = os.getenv("RERANKERS_MODEL_TYPE")
-    reranker_instance = Reranker(
-        model_name=RERANKERS_MODEL_NAME,
-        model_type=RERANKERS_MODEL_TYPE,
-    )
+    reranker_instance = LazyResource(_load_reranker)
+    # Executor running reranking off the event loop: "thread" or "process"
+    RERANKER_EXECUTOR = os.getenv("RERANKER_EXECUTOR", "thread")
+    RERANKER_EXECUTOR_WORKERS = int(os.getenv("RERANKER_EXECUTOR_WORKERS", "1"))
+    RERANKER_EXECUTOR_MAX_QUEUE = int(os.getenv("RERANKER_EXECUTOR_MAX_QUEUE", "64"))
+    # Seconds a reranking call may take, queue wait included, before the documents
+    # are returned unreranked; 0 disables the timeout
+    RERANKER_TIMEOUT = float(os.getenv("RERANKER_TIMEOUT", "30")) or None
+    # LRU cache of reranker scores keyed by (model, query hash, chunk content hash); 0 disables it
+    RERANKER_SCORE_CACHE_SIZE = int(os.getenv("RERANKER_SCORE_CACHE_SIZE", "50000"))
+    RERANKER_SCORE_CACHE_TTL = float(os.getenv("RERANKER_SCORE_CACHE_TTL", "3600"))
+    # Load models and other lazy resources during app startup instead of on first use
+    MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
     
     # OAuth JWT
     SECRET_KEY = os.getenv("SECRET_KEY")
@@ -100,24 +310,82 @@ class Config:
     
     
     # Validation Checks
-    # Check embedding dimension
-    if hasattr(embedding_model_instance, 'dimension') and embedding_model_instance.dimension > 2000:
+    # Check vector index storage mode
+    if VECTOR_INDEX_STORAGE not in MAX_INDEXED_DIMENSIONS:
+        raise ValueError(
+            f"Invalid VECTOR_INDEX_STORAGE: {VECTOR_INDEX_STORAGE}. "
+            f"Expected one of {', '.join(MAX_INDEXED_DIMENSIONS)}."
+        )
+
+    # Check vector index type and search preset
+    if VECTOR_INDEX_TYPE not in ("hnsw", "ivfflat"):
         raise ValueError(
-            f"Embedding dimension for Model: {EMBEDDING_MODEL} "
-            f"has {embedding_model_instance.dimension} dimensions, which "
-            f"exceeds the maximum of 2000 allowed by PGVector."
+            f"Invalid VECTOR_INDEX_TYPE: {VECTOR_INDEX_TYPE}. Expected one of hnsw, ivfflat."
+        )
+    if VECTOR_SEARCH_PRESET not in ("fast", "balanced", "high_recall"):
+        raise ValueError(
+            f"Invalid VECTOR_SEARCH_PRESET: {VECTOR_SEARCH_PRESET}. "
+            "Expected one of fast, balanced, high_recall."
+        )
+
+    # Check iterative scan mode
+    if VECTOR_ITERATIVE_SCAN not in ("off", "strict_order", "relaxed_order"):
+        raise ValueError(
+            f"Invalid VECTOR_ITERATIVE_SCAN: {VECTOR_ITERATIVE_SCAN}. "
+            "Expected one of off, strict_order, relaxed_order."
+        )
+
+    # Check vector backend
+    if VECTOR_BACKEND not in ("pgvector", "numpy"):
+        raise ValueError(
+            f"Invalid VECTOR_BACKEND: {VECTOR_BACKEND}. Expected one of pgvector, numpy."
+        )
+
+    # Check configured embedding dimension against the limit of the index storage mode.
+    # The dimension of the model itself is checked when it is loaded.
+    if EMBEDDING_DIMENSION <= 0:
+        raise ValueError(
+            f"EMBEDDING_DIMENSION must be set to the dimension of Model: {EMBEDDING_MODEL}."
+        )
+    if EMBEDDING_DIMENSION > MAX_INDEXED_DIMENSIONS[VECTOR_INDEX_STORAGE]:
+        raise ValueError(
+            f"EMBEDDING_DIMENSION={EMBEDDING_DIMENSION} exceeds the maximum of "
+            f"{MAX_INDEXED_DIMENSIONS[VECTOR_INDEX_STORAGE]} allowed by "
+            f"PGVector for VECTOR_INDEX_STORAGE={VECTOR_INDEX_STORAGE}."
         )
 
 
     @classmethod
     def get_settings(cls):
-        """Get all settings as a dictionary."""
+        """Get all settings as a dictionary, without loading lazy resources."""
         return {
             key: value
             for key, value in cls.__dict__.items()
-            if not key.startswith("_") and not callable(value)
+            if not key.startswith("_")
+            and not callable(value)
+            and not isinstance(value, LazyResource)
         }
 
+    @classmethod
+    def warm_up(cls, skip: Iterable[str] = ()) -> Dict[str, float]:
+        """
+        Load all lazy resources, e.g. from the app lifespan.
+
+        Args:
+            skip: Names of resources not to load, e.g. models only used by process pool workers
+
+        Returns:
+            Load time in seconds of each resource, 0 for resources loaded before
+        """
+        skip = set(skip)
+        timings = {}
+        for name, value in list(cls.__dict__.items()):
+            if isinstance(value, LazyResource) and name not in skip:
+                was_loaded = value.loaded
+                getattr(cls, name)
+                timings[name] = 0.0 if was_loaded else value.load_time
+        return timings
+
 
 # Create a config instance
 config = Config()
@@ -7,24 +7,36 @@ from fastapi import Depends
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import (
     ARRAY,
+    BigInteger,
     Boolean,
     Column,
+    Computed,
     Enum as SQLAlchemyEnum,
+    FetchedValue,
     ForeignKey,
+    ForeignKeyConstraint,
+    Index,
     Integer,
     JSON,
+    PrimaryKeyConstraint,
+    SmallInteger,
     String,
     Text,
+    cast,
+    func,
+    select,
     text,
     TIMESTAMP,
+    UniqueConstraint,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, relationship
+from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, deferred, relationship
 
 from app.config import config
 from app.retriver.chunks_hybrid_search import ChucksHybridSearchRetriever
 from app.retriver.documents_hybrid_search import DocumentHybridSearchRetriever
+from app.retriver.vector_storage import vector_index_options
 
 if config.AUTH_TYPE == "GOOGLE":
     from fastapi_users.db import (
@@ -136,14 +148,51 @@ class Chat(BaseModel, TimestampMixin):
 
 class Document(BaseModel, TimestampMixin):
     __tablename__ = "documents"
+    if config.PARTITIONED_STORAGE:
+        # The primary key and unique constraints of a partitioned table must include
+        # the partition key. Content hashes already include the search space.
+        __table_args__ = (
+            PrimaryKeyConstraint("id", "search_space_id"),
+            UniqueConstraint(
+                "content_hash",
+                "search_space_id",
+                name="uq_documents_content_hash_search_space_id",
+            ),
+            Index(
+                "documents_search_space_id_document_type_created_at_index",
+                "search_space_id",
+                "document_type",
+                "created_at",
+            ),
+            {"postgresql_partition_by": "HASH (search_space_id)"},
+        )
+        id = Column(Integer, autoincrement=True, index=True)
+    else:
+        # Recent documents of a type, e.g. for the near-duplicate check at ingestion
+        __table_args__ = (
+            Index(
+                "documents_search_space_id_document_type_created_at_index",
+                "search_space_id",
+                "document_type",
+                "created_at",
+            ),
+        )
 
     title = Column(String, nullable=False, index=True)
     document_type = Column(SQLAlchemyEnum(DocumentType), nullable=False)
     document_metadata = Column(JSON, nullable=True)
 
     content = Column(Text, nullable=False)
-    content_hash = Column(String, nullable=False, index=True, unique=True)
-    embedding = Column(Vector(config.embedding_model_instance.dimension))
+    content_hash = Column(
+        String, nullable=False, index=True, unique=not config.PARTITIONED_STORAGE
+    )
+    # SimHash fingerprint of the source content, see app/utils/near_duplicate_service.py
+    simhash = Column(BigInteger, nullable=True)
+    embedding = Column(Vector(config.embedding_dimension))
+    # Full-text search vector of the content, maintained by the database
+    content_tsv = deferred(
+        Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True))
+    )
 
     search_space_id = Column(
         Integer, ForeignKey("searchspaces.id", ondelete="CASCADE"), nullable=False
@@ -156,15 +205,128 @@ class Document(BaseModel, TimestampMixin):
 
 class Chunk(BaseModel, TimestampMixin):
     __tablename__ = "chunks"
+    if config.PARTITIONED_STORAGE:
+        # Partitioned like documents, so a chunk references its document by
+        # (document_id, search_space_id)
+        __table_args__ = (
+            PrimaryKeyConstraint("id", "search_space_id"),
+            ForeignKeyConstraint(
+                ["document_id", "search_space_id"],
+                ["documents.id", "documents.search_space_id"],
+                ondelete="CASCADE",
+            ),
+            Index("chunks_search_space_id_document_type_index", "search_space_id", "document_type"),
+            {"postgresql_partition_by": "HASH (search_space_id)"},
+        )
+        id = Column(Integer, autoincrement=True, index=True)
+    else:
+        __table_args__ = (
+            Index("chunks_search_space_id_document_type_index", "search_space_id", "document_type"),
+        )
 
     content = Column(Text, nullable=False)
-    embedding = Column(Vector(config.embedding_model_instance.dimension))
-
-    document_id = Column(
-        Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False
+    embedding = Column(Vector(config.embedding_dimension))
+    # Full-text search vector of the content, maintained by the database
+    content_tsv = deferred(
+        Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True))
     )
+    # Order of the chunk within its document
+    position = Column(Integer, nullable=True)
+
+    if config.PARTITIONED_STORAGE:
+        document_id = Column(Integer, nullable=False)
+    else:
+        document_id = Column(
+            Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False
+        )
     document = relationship("Document", back_populates="chunks")
 
+    # Copied from the document by a trigger, see CHUNK_DOCUMENT_COLUMNS_TRIGGERS, so
+    # that searches can filter chunks without joining documents
+    search_space_id = Column(
+        Integer,
+        ForeignKey("searchspaces.id", ondelete="CASCADE"),
+        nullable=False,
+        server_default=FetchedValue(),
+    )
+    document_type = Column(
+        SQLAlchemyEnum(DocumentType), nullable=False, server_default=FetchedValue()
+    )
+
+
+class EmbeddingCacheEntry(BaseModel, TimestampMixin):
+    __tablename__ = "embedding_cache"
+    __table_args__ = (
+        UniqueConstraint(
+            "model_name", "content_hash", name="uq_embedding_cache_model_content_hash"
+        ),
+    )
+
+    model_name = Column(String, nullable=False)
+    # SHA-256 of the embedded text
+    content_hash = Column(String(64), nullable=False)
+    # Dimensionless so entries of different embedding models can share the table
+    embedding = Column(Vector(), nullable=False)
+    last_used_at = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        index=True,
+    )
+
+
+class SearchResultCacheEntry(BaseModel, TimestampMixin):
+    __tablename__ = "search_result_cache"
+    # Cached results can be recomputed, so the table skips the write-ahead log
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    # SHA-256 of the search scope and query
+    cache_key = Column(String(64), nullable=False, unique=True)
+    # Corpus generation of the searched search space the results were computed for
+    corpus_generation = Column(BigInteger, nullable=False)
+    results = Column(JSON, nullable=False)
+    last_used_at = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        index=True,
+    )
+
+
+class SearchSpaceCorpusGeneration(Base):
+    """
+    Striped counter of the document changes of a search space.
+
+    A trigger increments the stripe of the writing database connection whenever
+    documents of the search space change, see CORPUS_GENERATION_FUNCTION, so
+    concurrent writers to one search space rarely wait on the same row lock. The
+    corpus generation of the search space is the sum of its stripes.
+    """
+
+    __tablename__ = "search_space_corpus_generations"
+
+    search_space_id = Column(
+        Integer, ForeignKey("searchspaces.id", ondelete="CASCADE"), primary_key=True
+    )
+    stripe = Column(SmallInteger, primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+
+
+def corpus_generation(search_space_id):
+    """
+    SQL expression of the corpus generation of a search space, used to invalidate
+    cached search results and vector engines.
+
+    Args:
+        search_space_id: Search space ID value or column, e.g. SearchSpace.id
+    """
+    return func.coalesce(
+        select(cast(func.sum(SearchSpaceCorpusGeneration.generation), BigInteger))
+        .where(SearchSpaceCorpusGeneration.search_space_id == search_space_id)
+        .scalar_subquery(),
+        0,
+    )
+
 
 class Podcast(BaseModel, TimestampMixin):
     __tablename__ = "podcasts"
@@ -328,37 +490,188 @@ engine = create_async_engine(DATABASE_URL)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
+# Triggers keeping chunks.search_space_id and chunks.document_type equal to the
+# columns of their document
+CHUNK_DOCUMENT_COLUMNS_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION chunks_copy_document_columns() RETURNS trigger AS $$
+    BEGIN
+        SELECT search_space_id, document_type
+        INTO NEW.search_space_id, NEW.document_type
+        FROM documents
+        WHERE id = NEW.document_id;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS chunks_copy_document_columns ON chunks",
+    """
+    CREATE TRIGGER chunks_copy_document_columns
+    BEFORE INSERT OR UPDATE OF document_id ON chunks
+    FOR EACH ROW EXECUTE FUNCTION chunks_copy_document_columns()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION documents_propagate_columns_to_chunks() RETURNS trigger AS $$
+    BEGIN
+        UPDATE chunks
+        SET search_space_id = NEW.search_space_id, document_type = NEW.document_type
+        WHERE document_id = NEW.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS documents_propagate_columns_to_chunks ON documents",
+    """
+    CREATE TRIGGER documents_propagate_columns_to_chunks
+    AFTER UPDATE OF search_space_id, document_type ON documents
+    FOR EACH ROW
+    WHEN (OLD.search_space_id IS DISTINCT FROM NEW.search_space_id
+          OR OLD.document_type IS DISTINCT FROM NEW.document_type)
+    EXECUTE FUNCTION documents_propagate_columns_to_chunks()
+    """,
+]
+
+
+# Number of counter stripes per search space in search_space_corpus_generations
+CORPUS_GENERATION_STRIPES = 16
+
+# Function bumping the corpus generation of the search spaces of the documents
+# changed by a statement, and the transition table each document event exposes
+# to it. Search spaces being deleted are skipped.
+CORPUS_GENERATION_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION documents_bump_corpus_generation() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO search_space_corpus_generations AS counters (search_space_id, stripe, generation)
+        SELECT searchspaces.id, pg_backend_pid() % {CORPUS_GENERATION_STRIPES}, 1
+        FROM searchspaces
+        WHERE searchspaces.id IN (SELECT search_space_id FROM changed_documents)
+        ON CONFLICT (search_space_id, stripe)
+        DO UPDATE SET generation = counters.generation + 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+CORPUS_GENERATION_TRIGGER_EVENTS = {"INSERT": "NEW", "UPDATE": "NEW", "DELETE": "OLD"}
+
+
+async def setup_partitions():
+    """Create the hash partitions of documents and chunks for partitioned storage."""
+    modulus = config.STORAGE_PARTITIONS
+    async with engine.begin() as conn:
+        for table_name in ("documents", "chunks"):
+            for remainder in range(modulus):
+                await conn.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {table_name}_p{remainder} "
+                        f"PARTITION OF {table_name} "
+                        f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+                    )
+                )
+
+
 async def setup_indexes():
+    dimension = config.embedding_dimension
     async with engine.begin() as conn:
         # Create indexes
-        # Document Summary Indexes
+        # Document Summary Indexes on the stored tsvector column
         await conn.execute(
             text(
-                "CREATE INDEX IF NOT EXISTS document_vector_index ON documents USING hnsw (embedding public.vector_cosine_ops)"
+                "CREATE INDEX IF NOT EXISTS document_content_tsv_index ON documents USING gin (content_tsv)"
             )
         )
+        # Document Chuck Indexes on the stored tsvector column
         await conn.execute(
             text(
-                "CREATE INDEX IF NOT EXISTS document_search_index ON documents USING gin (to_tsvector('english', content))"
+                "CREATE INDEX IF NOT EXISTS chucks_content_tsv_index ON chunks USING gin (content_tsv)"
             )
         )
-        # Document Chuck Indexes
-        await conn.execute(
-            text(
-                "CREATE INDEX IF NOT EXISTS chucks_vector_index ON chunks USING hnsw (embedding public.vector_cosine_ops)"
+        # The expression indexes they replace are no longer used by the retrievers
+        await conn.execute(text("DROP INDEX IF EXISTS document_search_index"))
+        await conn.execute(text("DROP INDEX IF EXISTS chucks_search_index"))
+
+        # Chunk ownership columns copied from their document
+        for statement in CHUNK_DOCUMENT_COLUMNS_TRIGGERS:
+            await conn.execute(text(statement))
+
+        # Corpus generations invalidating cached search results
+        await conn.execute(text(CORPUS_GENERATION_FUNCTION))
+        for event, transition_table in CORPUS_GENERATION_TRIGGER_EVENTS.items():
+            trigger_name = f"documents_{event.lower()}_bump_corpus_generation"
+            await conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger_name} ON documents"))
+            await conn.execute(
+                text(
+                    f"CREATE TRIGGER {trigger_name} AFTER {event} ON documents "
+                    f"REFERENCING {transition_table} TABLE AS changed_documents "
+                    "FOR EACH STATEMENT EXECUTE FUNCTION documents_bump_corpus_generation()"
+                )
             )
-        )
-        await conn.execute(
-            text(
-                "CREATE INDEX IF NOT EXISTS chucks_search_index ON chunks USING gin (to_tsvector('english', content))"
+
+        # Vector Indexes, depending on the configured storage mode
+        if config.VECTOR_INDEX_STORAGE == "halfvec":
+            vector_indexes = {
+                "document_halfvec_index": ("documents", f"(embedding::halfvec({dimension})) halfvec_cosine_ops"),
+                "chucks_halfvec_index": ("chunks", f"(embedding::halfvec({dimension})) halfvec_cosine_ops"),
+            }
+        elif config.VECTOR_INDEX_STORAGE == "binary":
+            vector_indexes = {
+                "document_binary_index": ("documents", f"(binary_quantize(embedding)::bit({dimension})) bit_hamming_ops"),
+                "chucks_binary_index": ("chunks", f"(binary_quantize(embedding)::bit({dimension})) bit_hamming_ops"),
+            }
+        else:
+            vector_indexes = {
+                "document_vector_index": ("documents", "embedding public.vector_cosine_ops"),
+                "chucks_vector_index": ("chunks", "embedding public.vector_cosine_ops"),
+            }
+
+        # Drop the vector indexes of the other storage modes so only one stays in memory
+        for index_name in (
+            "document_vector_index",
+            "chucks_vector_index",
+            "document_halfvec_index",
+            "chucks_halfvec_index",
+            "document_binary_index",
+            "chucks_binary_index",
+        ):
+            if index_name not in vector_indexes:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+        # Index type (HNSW or IVFFlat) and build parameters
+        index_type = config.VECTOR_INDEX_TYPE
+        index_options = vector_index_options()
+        with_clause = ", ".join(f"{name} = {value}" for name, value in index_options.items())
+        expected_reloptions = sorted(f"{name}={value}" for name, value in index_options.items())
+
+        for index_name, (table_name, index_expression) in vector_indexes.items():
+            # Rebuild the index if it was built with another type or other parameters
+            existing_index = (
+                await conn.execute(
+                    text(
+                        "SELECT am.amname, c.reloptions FROM pg_class c "
+                        "JOIN pg_am am ON am.oid = c.relam WHERE c.relname = :index_name"
+                    ),
+                    {"index_name": index_name},
+                )
+            ).first()
+            if existing_index and (
+                existing_index.amname != index_type
+                or sorted(existing_index.reloptions or []) != expected_reloptions
+            ):
+                await conn.execute(text(f"DROP INDEX {index_name}"))
+
+            await conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} "
+                    f"USING {index_type} ({index_expression}) WITH ({with_clause})"
+                )
             )
-        )
 
 
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         await conn.run_sync(Base.metadata.create_all)
+    if config.PARTITIONED_STORAGE:
+        await setup_partitions()
     await setup_indexes()
 
 
@@ -1,12 +1,15 @@
 class ChucksHybridSearchRetriever:
-    def __init__(self, db_session):
+    def __init__(self, db_session, search_preset: str = None):
         """
         Initialize the hybrid search retriever with a database session.
         
         Args:
             db_session: SQLAlchemy AsyncSession from FastAPI dependency injection
+            search_preset: Vector search preset trading recall for latency, see
+                VECTOR_SEARCH_PRESETS. Defaults to VECTOR_SEARCH_PRESET.
         """
         self.db_session = db_session
+        self.search_preset = search_preset
 
     async def vector_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None) -> list:
         """
@@ -19,42 +22,42 @@ class ChucksHybridSearchRetriever:
             search_space_id: Optional search space ID to filter results
             
         Returns:
-            List of chunks sorted by vector similarity
+            List of result rows sorted by vector similarity, see _select_results
         """
-        from sqlalchemy import select, func
-        from sqlalchemy.orm import joinedload
-        from app.db import Chunk, Document, SearchSpace
-        from app.config import config
+        from app.db import Chunk
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
         
-        # Get embedding for the query
-        embedding_model = config.embedding_model_instance
-        query_embedding = embedding_model.embed(query_text)
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
         
-        # Build the base query with user ownership check
-        query = (
-            select(Chunk)
-            .options(joinedload(Chunk.document).joinedload(Document.search_space))
-            .join(Document, Chunk.document_id == Document.id)
-            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
-            .where(SearchSpace.user_id == user_id)
-        )
+        # Ownership conditions on the chunk columns, without joining documents
+        base_conditions = self._ownership_conditions(user_id, search_space_id)
         
-        # Add search space filter if provided
-        if search_space_id is not None:
-            query = query.where(Document.search_space_id == search_space_id)
+        # Rank chunks by vector similarity
+        semantic_search_cte = await vector_backend.semantic_search_cte(
+            self.db_session,
+            Chunk,
+            query_embedding,
+            top_k,
+            lambda query: query.where(*base_conditions),
+            VectorSearchFilters(user_id, search_space_id),
+        )
         
-        # Add vector similarity ordering
         query = (
-            query
-            .order_by(Chunk.embedding.op("<=>")(query_embedding))
-            .limit(top_k)
+            self._select_results()
+            .join(semantic_search_cte, Chunk.id == semantic_search_cte.c.id)
+            # Repeat the search space filter so partitioned storage prunes the chunk lookups
+            .where(*base_conditions)
+            .order_by(semantic_search_cte.c.rank)
         )
         
-        # Execute the query
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
         result = await self.db_session.execute(query)
-        chunks = result.scalars().all()
         
-        return chunks
+        return result.all()
 
     async def full_text_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None) -> list:
         """
@@ -67,30 +70,22 @@ class ChucksHybridSearchRetriever:
             search_space_id: Optional search space ID to filter results
             
         Returns:
-            List of chunks sorted by text relevance
+            List of result rows sorted by text relevance, see _select_results
         """
-        from sqlalchemy import select, func, text
-        from sqlalchemy.orm import joinedload
-        from app.db import Chunk, Document, SearchSpace
+        from sqlalchemy import func
+        from app.db import Chunk
         
-        # Create tsvector and tsquery for PostgreSQL full-text search
-        tsvector = func.to_tsvector('english', Chunk.content)
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Chunk.content_tsv
         tsquery = func.plainto_tsquery('english', query_text)
         
         # Build the base query with user ownership check
         query = (
-            select(Chunk)
-            .options(joinedload(Chunk.document).joinedload(Document.search_space))
-            .join(Document, Chunk.document_id == Document.id)
-            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
-            .where(SearchSpace.user_id == user_id)
+            self._select_results()
+            .where(*self._ownership_conditions(user_id, search_space_id))
             .where(tsvector.op("@@")(tsquery))  # Only include results that match the query
         )
         
-        # Add search space filter if provided
-        if search_space_id is not None:
-            query = query.where(Document.search_space_id == search_space_id)
-        
         # Add text search ranking
         query = (
             query
@@ -100,9 +95,8 @@ class ChucksHybridSearchRetriever:
         
         # Execute the query
         result = await self.db_session.execute(query)
-        chunks = result.scalars().all()
         
-        return chunks
+        return result.all()
 
     async def hybrid_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_type: str = None) -> list:
         """
@@ -118,29 +112,39 @@ class ChucksHybridSearchRetriever:
         Returns:
             List of dictionaries containing chunk data and relevance scores
         """
+        from app.retriver.search_result_cache import search_result_cache
+        
+        # Serve searches of an unchanged search space from the result cache
+        searches = [(query_text, document_type)]
+        cache_scope, (cached_results,) = await search_result_cache.lookup(self.db_session, "chunks", user_id, search_space_id, top_k, self.search_preset, searches)
+        if cached_results is not None:
+            return cached_results
+        
+        results = await self._hybrid_search(query_text, top_k, user_id, search_space_id, document_type)
+        await search_result_cache.store(cache_scope, searches, [results])
+        return results
+
+    async def _hybrid_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_type: str = None) -> list:
+        """Run hybrid_search without the result cache."""
         from sqlalchemy import select, func, text
-        from sqlalchemy.orm import joinedload
-        from app.db import Chunk, Document, SearchSpace, DocumentType
-        from app.config import config
+        from app.db import Chunk, DocumentType
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
         
-        # Get embedding for the query
-        embedding_model = config.embedding_model_instance
-        query_embedding = embedding_model.embed(query_text)
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
         
         # Constants for RRF calculation
         k = 60  # Constant for RRF calculation
         n_results = top_k * 2  # Get more results for better fusion
         
-        # Create tsvector and tsquery for PostgreSQL full-text search
-        tsvector = func.to_tsvector('english', Chunk.content)
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Chunk.content_tsv
         tsquery = func.plainto_tsquery('english', query_text)
         
-        # Base conditions for document filtering
-        base_conditions = [SearchSpace.user_id == user_id]
-        
-        # Add search space filter if provided
-        if search_space_id is not None:
-            base_conditions.append(Document.search_space_id == search_space_id)
+        # Ownership conditions on the chunk columns, without joining documents
+        base_conditions = self._ownership_conditions(user_id, search_space_id)
             
         # Add document type filter if provided
         if document_type is not None:
@@ -148,29 +152,132 @@ class ChucksHybridSearchRetriever:
             if isinstance(document_type, str):
                 try:
                     doc_type_enum = DocumentType[document_type]
-                    base_conditions.append(Document.document_type == doc_type_enum)
+                    base_conditions.append(Chunk.document_type == doc_type_enum)
                 except KeyError:
                     # If the document type doesn't exist in the enum, return empty results
                     return []
             else:
-                base_conditions.append(Document.document_type == document_type)
+                base_conditions.append(Chunk.document_type == document_type)
         
         # CTE for semantic search with user ownership check
-        semantic_search_cte = (
+        semantic_search_cte = await vector_backend.semantic_search_cte(
+            self.db_session,
+            Chunk,
+            query_embedding,
+            n_results,
+            lambda query: query.where(*base_conditions),
+            VectorSearchFilters(user_id, search_space_id, None if document_type is None else [document_type]),
+        )
+        
+        # CTE for keyword search with user ownership check
+        keyword_search_cte = (
             select(
                 Chunk.id,
-                func.rank().over(order_by=Chunk.embedding.op("<=>")(query_embedding)).label("rank")
+                func.rank().over(order_by=func.ts_rank_cd(tsvector, tsquery).desc()).label("rank")
             )
-            .join(Document, Chunk.document_id == Document.id)
-            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
             .where(*base_conditions)
+            .where(tsvector.op("@@")(tsquery))
         )
         
-        semantic_search_cte = (
-            semantic_search_cte
-            .order_by(Chunk.embedding.op("<=>")(query_embedding))
+        keyword_search_cte = (
+            keyword_search_cte
+            # Break keyword rank ties by id, like the per-type keyword search
+            .order_by(func.ts_rank_cd(tsvector, tsquery).desc(), Chunk.id.desc())
             .limit(n_results)
-            .cte("semantic_search")
+            .cte("keyword_search")
+        )
+        
+        # Final combined query using a FULL OUTER JOIN with RRF scoring
+        final_query = (
+            self._select_results(
+                (
+                    func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
+                    func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0)
+                ).label("score"),
+                from_clause=semantic_search_cte.outerjoin(
+                    keyword_search_cte, 
+                    semantic_search_cte.c.id == keyword_search_cte.c.id,
+                    full=True
+                ).join(
+                    Chunk.__table__,
+                    Chunk.id == func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id)
+                ),
+            )
+            # Repeat the search space filter so partitioned storage prunes the chunk lookups
+            .where(*base_conditions)
+            .order_by(text("score DESC"), Chunk.id.desc())
+            .limit(top_k)
+        )
+        
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
+        result = await self.db_session.execute(final_query)
+        chunks_with_scores = result.all()
+        
+        # If no results were found, return an empty list
+        if not chunks_with_scores:
+            return []
+        
+        return self._serialize_results(chunks_with_scores)
+
+    async def hybrid_search_page(self, query_text: str, limit: int, user_id: str, search_space_id: int = None, document_types: list = None, after: tuple = None, max_results: int = 200) -> list:
+        """
+        Get a page of the hybrid search results, ordered by (score DESC, id DESC).
+        
+        Fuses the same candidates as hybrid_search with top_k=max_results, so only
+        the first max_results results can be paginated through. The page is
+        selected in SQL with the keyset predicate (score, id) < after and a LIMIT,
+        so no page returns the results before it. Pages are not cached.
+        
+        Args:
+            query_text: The search query text
+            limit: Number of results to return
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID to filter results
+            document_types: Optional document types to filter results (e.g., ["FILE", "CRAWLED_URL"])
+            after: (score, chunk id) of the last result of the previous page, None for the first page
+            max_results: Number of ranked results to paginate through
+            
+        Returns:
+            List of dictionaries containing chunk data and relevance scores, in the
+            same format as hybrid_search
+        """
+        from sqlalchemy import Float, cast, func, literal, select, tuple_
+        from app.db import Chunk, DocumentType
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
+        
+        # Ownership conditions on the chunk columns, without joining documents
+        base_conditions = self._ownership_conditions(user_id, search_space_id)
+        
+        # Unknown document types have no results
+        valid_types = None
+        if document_types is not None:
+            valid_types = [document_type for document_type in document_types if document_type in DocumentType.__members__]
+            if not valid_types:
+                return []
+            base_conditions.append(Chunk.document_type.in_([DocumentType[document_type] for document_type in valid_types]))
+        
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
+        
+        # Constants for RRF calculation, matching hybrid_search with top_k=max_results
+        k = 60
+        n_results = max_results * 2
+        
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Chunk.content_tsv
+        tsquery = func.plainto_tsquery('english', query_text)
+        
+        # CTE for semantic search with user ownership check
+        semantic_search_cte = await vector_backend.semantic_search_cte(
+            self.db_session,
+            Chunk,
+            query_embedding,
+            n_results,
+            lambda query: query.where(*base_conditions),
+            VectorSearchFilters(user_id, search_space_id, valid_types),
         )
         
         # CTE for keyword search with user ownership check
@@ -179,23 +286,183 @@ class ChucksHybridSearchRetriever:
                 Chunk.id,
                 func.rank().over(order_by=func.ts_rank_cd(tsvector, tsquery).desc()).label("rank")
             )
-            .join(Document, Chunk.document_id == Document.id)
-            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
             .where(*base_conditions)
             .where(tsvector.op("@@")(tsquery))
+            # Break keyword rank ties by id, like the per-type keyword search
+            .order_by(func.ts_rank_cd(tsvector, tsquery).desc(), Chunk.id.desc())
+            .limit(n_results)
+            .cte("keyword_search")
+        )
+        
+        # Fuse both rankings with RRF as double precision, so the cursor score compares exactly
+        fused = (
+            select(
+                func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id).label("id"),
+                cast(
+                    func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
+                    func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0),
+                    Float
+                ).label("score")
+            )
+            .select_from(
+                semantic_search_cte.outerjoin(
+                    keyword_search_cte,
+                    semantic_search_cte.c.id == keyword_search_cte.c.id,
+                    full=True
+                )
+            )
+            .subquery("fused")
+        )
+        
+        fused_ranked = (
+            select(
+                fused.c.id,
+                fused.c.score,
+                func.row_number().over(order_by=(fused.c.score.desc(), fused.c.id.desc())).label("position")
+            )
+            .subquery("fused_ranked")
+        )
+        
+        final_query = (
+            self._select_results(
+                fused_ranked.c.score,
+                from_clause=Chunk.__table__.join(fused_ranked, Chunk.id == fused_ranked.c.id),
+            )
+            # Repeat the search space filter so partitioned storage prunes the chunk lookups
+            .where(*base_conditions)
+            .where(fused_ranked.c.position <= max_results)
+        )
+        if after is not None:
+            after_score, after_id = after
+            final_query = final_query.where(
+                tuple_(fused_ranked.c.score, fused_ranked.c.id) < tuple_(literal(after_score, Float), literal(after_id))
+            )
+        final_query = final_query.order_by(fused_ranked.c.score.desc(), fused_ranked.c.id.desc()).limit(limit)
+        
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
+        result = await self.db_session.execute(final_query)
+        
+        return self._serialize_results(result.all())
+
+    async def hybrid_search_by_types(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_types: list = None) -> dict:
+        """
+        Run hybrid search for several document types at once, returning the top-k per type.
+        
+        Gives the same results as calling hybrid_search once per document type, but
+        in a single SQL statement: semantic and keyword rankings are partitioned by
+        document type and fused with Reciprocal Rank Fusion per type. Keyword and
+        fused score ties are broken by id in both, so they keep the same rows in
+        the same order. Rows at exactly the same vector distance may still differ,
+        as the ANN index returns them in no fixed order.
+        
+        Args:
+            query_text: The search query text
+            top_k: Number of results to return per document type
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID to filter results
+            document_types: Document types to search (e.g., ["FILE", "SLACK_CONNECTOR"])
+            
+        Returns:
+            Dictionary mapping each requested document type to its list of chunk
+            dictionaries, in the same format as hybrid_search
+        """
+        from app.retriver.search_result_cache import search_result_cache
+        
+        # Only search the document types without cached results
+        cache_scope, cached_results = await search_result_cache.lookup(
+            self.db_session, "chunks", user_id, search_space_id, top_k, self.search_preset,
+            [(query_text, document_type) for document_type in document_types or []]
+        )
+        results_by_type = {
+            document_type: results
+            for document_type, results in zip(document_types or [], cached_results)
+            if results is not None
+        }
+        
+        missing_types = [document_type for document_type in document_types or [] if document_type not in results_by_type]
+        if missing_types:
+            searched_results = await self._hybrid_search_by_types(query_text, top_k, user_id, search_space_id, missing_types)
+            await search_result_cache.store(
+                cache_scope,
+                [(query_text, document_type) for document_type in missing_types],
+                [searched_results[document_type] for document_type in missing_types]
+            )
+            results_by_type.update(searched_results)
+        
+        return {document_type: results_by_type[document_type] for document_type in document_types or []}
+
+    async def _hybrid_search_by_types(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_types: list = None) -> dict:
+        """Run hybrid_search_by_types without the result cache."""
+        from sqlalchemy import select, func
+        from app.db import Chunk, DocumentType
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
+        
+        results_by_type = {document_type: [] for document_type in document_types or []}
+        
+        # Unknown document types have no results
+        valid_types = [document_type for document_type in results_by_type if document_type in DocumentType.__members__]
+        if not valid_types:
+            return results_by_type
+        
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
+        
+        # Constants for RRF calculation
+        k = 60  # Constant for RRF calculation
+        n_results = top_k * 2  # Get more results for better fusion
+        
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Chunk.content_tsv
+        tsquery = func.plainto_tsquery('english', query_text)
+        
+        # Ownership conditions on the chunk columns, without joining documents
+        base_conditions = self._ownership_conditions(user_id, search_space_id)
+        
+        # CTE for semantic search per document type with user ownership check
+        semantic_search_cte = await vector_backend.partitioned_semantic_search_cte(
+            self.db_session,
+            Chunk,
+            valid_types,
+            query_embedding,
+            n_results,
+            lambda query: query.where(*base_conditions),
+            VectorSearchFilters(user_id, search_space_id),
+        )
+        
+        # Keyword search ranked per document type with user ownership check
+        keyword_ranked = (
+            select(
+                Chunk.id,
+                Chunk.document_type,
+                func.rank().over(
+                    partition_by=Chunk.document_type,
+                    order_by=func.ts_rank_cd(tsvector, tsquery).desc()
+                ).label("rank"),
+                # Keep exactly n_results rows per type, breaking rank ties by id like hybrid_search
+                func.row_number().over(
+                    partition_by=Chunk.document_type,
+                    order_by=(func.ts_rank_cd(tsvector, tsquery).desc(), Chunk.id.desc())
+                ).label("position")
+            )
+            .where(*base_conditions)
+            .where(Chunk.document_type.in_([DocumentType[document_type] for document_type in valid_types]))
+            .where(tsvector.op("@@")(tsquery))
+            .subquery("keyword_ranked")
         )
         
         keyword_search_cte = (
-            keyword_search_cte
-            .order_by(func.ts_rank_cd(tsvector, tsquery).desc())
-            .limit(n_results)
+            select(keyword_ranked.c.id, keyword_ranked.c.document_type, keyword_ranked.c.rank)
+            .where(keyword_ranked.c.position <= n_results)
             .cte("keyword_search")
         )
         
-        # Final combined query using a FULL OUTER JOIN with RRF scoring
-        final_query = (
+        # Fuse both rankings with RRF and rank the fused results per document type
+        fused = (
             select(
-                Chunk,
+                func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id).label("id"),
                 (
                     func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
                     func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0)
@@ -203,40 +470,349 @@ class ChucksHybridSearchRetriever:
             )
             .select_from(
                 semantic_search_cte.outerjoin(
-                    keyword_search_cte, 
+                    keyword_search_cte,
                     semantic_search_cte.c.id == keyword_search_cte.c.id,
                     full=True
                 )
             )
-            .join(
-                Chunk,
-                Chunk.id == func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id)
+            .subquery("fused")
+        )
+        
+        fused_ranked = (
+            select(
+                fused.c.id,
+                fused.c.score,
+                Chunk.document_type,
+                func.row_number().over(
+                    partition_by=Chunk.document_type,
+                    order_by=(fused.c.score.desc(), fused.c.id.desc())
+                ).label("position")
             )
-            .options(joinedload(Chunk.document))
-            .order_by(text("score DESC"))
-            .limit(top_k)
+            .join(Chunk, Chunk.id == fused.c.id)
+            # Repeat the search space filter so partitioned storage prunes the chunk lookups
+            .where(*base_conditions)
+            .subquery("fused_ranked")
         )
         
-        # Execute the query
+        final_query = (
+            self._select_results(
+                fused_ranked.c.score,
+                from_clause=Chunk.__table__.join(fused_ranked, Chunk.id == fused_ranked.c.id),
+            )
+            .where(*base_conditions)
+            .where(fused_ranked.c.position <= top_k)
+            .order_by(fused_ranked.c.document_type, fused_ranked.c.position)
+        )
+        
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
         result = await self.db_session.execute(final_query)
-        chunks_with_scores = result.all()
         
-        # If no results were found, return an empty list
-        if not chunks_with_scores:
-            return []
+        for serialized_result in self._serialize_results(result.all()):
+            results_by_type[serialized_result["document"]["document_type"]].append(serialized_result)
+        
+        return results_by_type
+
+    async def hybrid_search_many(self, query_texts: list, top_k: int, user_id: str, search_space_id: int = None, document_type: str = None) -> list:
+        """
+        Run hybrid search for several queries at once, returning the top-k per query.
+        
+        Gives the same results as calling hybrid_search once per query, but the
+        queries are embedded in one batch and searched in a single SQL statement:
+        the semantic and keyword searches run in a LATERAL join over the list of
+        queries and their embeddings, and are fused with Reciprocal Rank Fusion per query.
+        
+        Args:
+            query_texts: The search query texts
+            top_k: Number of results to return per query
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID to filter results
+            document_type: Optional document type to filter results (e.g., "FILE", "CRAWLED_URL")
+            
+        Returns:
+            For each query text, in order, the list of chunk dictionaries in the same
+            format as hybrid_search
+        """
+        from app.retriver.search_result_cache import search_result_cache
+        
+        # Only search the queries without cached results
+        cache_scope, results_by_query = await search_result_cache.lookup(
+            self.db_session, "chunks", user_id, search_space_id, top_k, self.search_preset,
+            [(query_text, document_type) for query_text in query_texts]
+        )
+        
+        missing_indexes = [query_index for query_index, results in enumerate(results_by_query) if results is None]
+        if missing_indexes:
+            searched_results = await self._hybrid_search_many(
+                [query_texts[query_index] for query_index in missing_indexes], top_k, user_id, search_space_id, document_type
+            )
+            await search_result_cache.store(
+                cache_scope,
+                [(query_texts[query_index], document_type) for query_index in missing_indexes],
+                searched_results
+            )
+            for query_index, results in zip(missing_indexes, searched_results):
+                results_by_query[query_index] = results
+        
+        return results_by_query
+
+    async def _hybrid_search_many(self, query_texts: list, top_k: int, user_id: str, search_space_id: int = None, document_type: str = None) -> list:
+        """Run hybrid_search_many without the result cache."""
+        from pgvector.sqlalchemy import Vector
+        from sqlalchemy import Integer, String, and_, cast, column, select, func, true, values
+        from app.config import config
+        from app.db import Chunk, DocumentType
+        from app.retriver.query_embedding_cache import get_query_embeddings
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
         
-        # Convert to serializable dictionaries if no reranker is available or if reranking failed
+        results_by_query = [[] for _ in query_texts]
+        if not query_texts:
+            return results_by_query
+        
+        # Ownership conditions on the chunk columns, without joining documents
+        base_conditions = self._ownership_conditions(user_id, search_space_id)
+            
+        # Add document type filter if provided
+        if document_type is not None:
+            # Convert string to enum value if needed
+            if isinstance(document_type, str):
+                try:
+                    doc_type_enum = DocumentType[document_type]
+                    base_conditions.append(Chunk.document_type == doc_type_enum)
+                except KeyError:
+                    # If the document type doesn't exist in the enum, return empty results
+                    return results_by_query
+            else:
+                base_conditions.append(Chunk.document_type == document_type)
+        
+        # Embed all queries in one batch, shared across retrievers and connectors
+        query_embeddings = await get_query_embeddings(query_texts)
+        
+        # Constants for RRF calculation
+        k = 60  # Constant for RRF calculation
+        n_results = top_k * 2  # Get more results for better fusion
+        
+        # The queries with their embeddings, sent once and shared by both searches
+        dimension = config.embedding_dimension
+        query_values = values(
+            column("query_index", Integer),
+            column("query_text", String),
+            column("embedding", Vector(dimension)),
+            name="query_values",
+        ).data([
+            (query_index, query_text, query_embedding)
+            for query_index, (query_text, query_embedding) in enumerate(zip(query_texts, query_embeddings))
+        ])
+        queries = select(
+            query_values.c.query_index,
+            query_values.c.query_text,
+            cast(query_values.c.embedding, Vector(dimension)).label("embedding"),
+        ).cte("queries")
+        
+        # CTE for semantic search per query with user ownership check
+        semantic_search_cte = await vector_backend.multi_query_semantic_search_cte(
+            self.db_session,
+            Chunk,
+            queries,
+            query_embeddings,
+            n_results,
+            lambda query: query.where(*base_conditions),
+            VectorSearchFilters(user_id, search_space_id, None if document_type is None else [document_type]),
+        )
+        
+        # Keyword search per query with user ownership check
+        tsvector = Chunk.content_tsv
+        tsquery = func.plainto_tsquery('english', queries.c.query_text)
+        keyword_candidates = (
+            select(
+                Chunk.id,
+                func.rank().over(order_by=func.ts_rank_cd(tsvector, tsquery).desc()).label("rank")
+            )
+            .where(*base_conditions)
+            .where(tsvector.op("@@")(tsquery))
+            # Break keyword rank ties by id, like the per-type keyword search
+            .order_by(func.ts_rank_cd(tsvector, tsquery).desc(), Chunk.id.desc())
+            .limit(n_results)
+            .lateral("keyword_candidates")
+        )
+        
+        keyword_search_cte = (
+            select(
+                queries.c.query_index.label("key"),
+                keyword_candidates.c.id,
+                keyword_candidates.c.rank
+            )
+            .select_from(queries.join(keyword_candidates, true()))
+            .cte("keyword_search")
+        )
+        
+        # Fuse both rankings with RRF and rank the fused results per query
+        fused = (
+            select(
+                func.coalesce(semantic_search_cte.c.key, keyword_search_cte.c.key).label("query_index"),
+                func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id).label("id"),
+                (
+                    func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
+                    func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0)
+                ).label("score")
+            )
+            .select_from(
+                semantic_search_cte.outerjoin(
+                    keyword_search_cte,
+                    and_(
+                        semantic_search_cte.c.key == keyword_search_cte.c.key,
+                        semantic_search_cte.c.id == keyword_search_cte.c.id
+                    ),
+                    full=True
+                )
+            )
+            .subquery("fused")
+        )
+        
+        fused_ranked = (
+            select(
+                fused,
+                func.row_number().over(
+                    partition_by=fused.c.query_index,
+                    order_by=(fused.c.score.desc(), fused.c.id.desc())
+                ).label("position")
+            )
+            .subquery("fused_ranked")
+        )
+        
+        final_query = (
+            self._select_results(
+                fused_ranked.c.score,
+                fused_ranked.c.query_index,
+                from_clause=Chunk.__table__.join(fused_ranked, Chunk.id == fused_ranked.c.id),
+            )
+            .where(*base_conditions)
+            .where(fused_ranked.c.position <= top_k)
+            .order_by(fused_ranked.c.query_index, fused_ranked.c.position)
+        )
+        
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
+        result = await self.db_session.execute(final_query)
+        rows = result.all()
+        
+        for row, serialized_result in zip(rows, self._serialize_results(rows)):
+            results_by_query[row.query_index].append(serialized_result)
+        
+        return results_by_query
+
+    async def fetch_embeddings(self, chunk_ids: list, user_id: str, search_space_id: int = None) -> dict:
+        """
+        Fetch the stored embeddings of search result chunks, e.g. to diversify them.
+        
+        Args:
+            chunk_ids: IDs of the chunks
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID the chunks belong to
+            
+        Returns:
+            Dictionary mapping chunk IDs to their embeddings. Chunks the user
+            can't access are left out.
+        """
+        from sqlalchemy import select
+        from app.db import Chunk
+        
+        if not chunk_ids:
+            return {}
+        
+        result = await self.db_session.execute(
+            select(Chunk.id, Chunk.embedding)
+            .where(Chunk.id.in_(set(chunk_ids)))
+            .where(*self._ownership_conditions(user_id, search_space_id))
+        )
+        return {chunk_id: embedding for chunk_id, embedding in result}
+
+    def _ownership_conditions(self, user_id: str, search_space_id: int = None) -> list:
+        """
+        Build the user ownership and search space filters on the chunk columns.
+        
+        Chunks carry the search space of their document, so they are filtered
+        without joining documents and search spaces, and the composite
+        (search_space_id, document_type) index can be used.
+        
+        Args:
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID to filter results
+            
+        Returns:
+            List of SQLAlchemy conditions on Chunk
+        """
+        from sqlalchemy import select
+        from app.db import Chunk, SearchSpace
+        
+        owned_search_spaces = select(SearchSpace.id).where(SearchSpace.user_id == user_id)
+        if search_space_id is None:
+            return [Chunk.search_space_id.in_(owned_search_spaces)]
+        
+        return [
+            Chunk.search_space_id == search_space_id,
+            owned_search_spaces.where(SearchSpace.id == search_space_id).exists(),
+        ]
+
+    def _select_results(self, *extra_columns, from_clause=None):
+        """
+        Select the result columns of chunks, joined to their documents.
+        
+        Only the columns the results are built from are selected, instead of
+        hydrating Chunk and Document objects with their embeddings, the document
+        content and the search space. The result rows have "chunk_id", "content",
+        "document_id", "title", "document_type" and "document_metadata" attributes,
+        followed by the extra columns.
+        
+        Args:
+            *extra_columns: Additional columns to select, e.g. the RRF score
+            from_clause: FROM clause including the chunks table, defaults to the chunks table
+            
+        Returns:
+            The select statement
+        """
+        from sqlalchemy import and_, select
+        from app.db import Chunk, Document
+        
+        from_clause = Chunk.__table__ if from_clause is None else from_clause
+        return select(
+            Chunk.id.label("chunk_id"),
+            Chunk.content,
+            Document.id.label("document_id"),
+            Document.title,
+            Document.document_type,
+            Document.document_metadata,
+            *extra_columns,
+        ).select_from(
+            from_clause.join(
+                Document,
+                # The search space lets partitioned storage prune the document lookups
+                and_(Document.id == Chunk.document_id, Document.search_space_id == Chunk.search_space_id),
+            )
+        )
+
+    def _serialize_results(self, rows) -> list:
+        """
+        Convert result rows with their RRF score to serializable dictionaries.
+        
+        Args:
+            rows: Rows selected with _select_results and a "score" column
+            
+        Returns:
+            List of dictionaries containing chunk data and relevance scores
+        """
         serialized_results = []
-        for chunk, score in chunks_with_scores:
+        for row in rows:
             serialized_results.append({
-                "chunk_id": chunk.id,
-                "content": chunk.content,
-                "score": float(score),  # Ensure score is a Python float
+                "chunk_id": row.chunk_id,
+                "content": row.content,
+                "score": float(row.score),  # Ensure score is a Python float
                 "document": {
-                    "id": chunk.document.id,
-                    "title": chunk.document.title,
-                    "document_type": chunk.document.document_type.value if hasattr(chunk.document, 'document_type') else None,
-                    "metadata": chunk.document.document_metadata
+                    "id": row.document_id,
+                    "title": row.title,
+                    "document_type": row.document_type.value if row.document_type is not None else None,
+                    "metadata": row.document_metadata
                 }
             })
         
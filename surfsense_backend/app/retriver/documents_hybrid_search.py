@@ -1,12 +1,15 @@
 class DocumentHybridSearchRetriever:
-    def __init__(self, db_session):
+    def __init__(self, db_session, search_preset: str = None):
         """
         Initialize the hybrid search retriever with a database session.
         
         Args:
             db_session: SQLAlchemy AsyncSession from FastAPI dependency injection
+            search_preset: Vector search preset trading recall for latency, see
+                VECTOR_SEARCH_PRESETS. Defaults to VECTOR_SEARCH_PRESET.
         """
         self.db_session = db_session
+        self.search_preset = search_preset
 
     async def vector_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None) -> list:
         """
@@ -19,41 +22,53 @@ class DocumentHybridSearchRetriever:
             search_space_id: Optional search space ID to filter results
             
         Returns:
-            List of documents sorted by vector similarity
+            List of result rows sorted by vector similarity, see _select_results
         """
         from sqlalchemy import select, func
-        from sqlalchemy.orm import joinedload
         from app.db import Document, SearchSpace
-        from app.config import config
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
         
-        # Get embedding for the query
-        embedding_model = config.embedding_model_instance
-        query_embedding = embedding_model.embed(query_text)
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
         
-        # Build the base query with user ownership check
-        query = (
-            select(Document)
-            .options(joinedload(Document.search_space))
-            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
-            .where(SearchSpace.user_id == user_id)
-        )
+        # Base conditions with user ownership check
+        base_conditions = [SearchSpace.user_id == user_id]
         
         # Add search space filter if provided
         if search_space_id is not None:
-            query = query.where(Document.search_space_id == search_space_id)
+            base_conditions.append(Document.search_space_id == search_space_id)
+        
+        # Repeated on the final document lookups so partitioned storage prunes them
+        search_space_conditions = [Document.search_space_id == search_space_id] if search_space_id is not None else []
+        
+        # Rank documents by vector similarity
+        semantic_search_cte = await vector_backend.semantic_search_cte(
+            self.db_session,
+            Document,
+            query_embedding,
+            top_k,
+            lambda query: (
+                query
+                .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+                .where(*base_conditions)
+            ),
+            VectorSearchFilters(user_id, search_space_id),
+        )
         
-        # Add vector similarity ordering
         query = (
-            query
-            .order_by(Document.embedding.op("<=>")(query_embedding))
-            .limit(top_k)
+            self._select_results()
+            .join(semantic_search_cte, Document.id == semantic_search_cte.c.id)
+            .where(*search_space_conditions)
+            .order_by(semantic_search_cte.c.rank)
         )
         
-        # Execute the query
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
         result = await self.db_session.execute(query)
-        documents = result.scalars().all()
         
-        return documents
+        return result.all()
 
     async def full_text_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None) -> list:
         """
@@ -66,20 +81,18 @@ class DocumentHybridSearchRetriever:
             search_space_id: Optional search space ID to filter results
             
         Returns:
-            List of documents sorted by text relevance
+            List of result rows sorted by text relevance, see _select_results
         """
         from sqlalchemy import select, func, text
-        from sqlalchemy.orm import joinedload
         from app.db import Document, SearchSpace
         
-        # Create tsvector and tsquery for PostgreSQL full-text search
-        tsvector = func.to_tsvector('english', Document.content)
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Document.content_tsv
         tsquery = func.plainto_tsquery('english', query_text)
         
         # Build the base query with user ownership check
         query = (
-            select(Document)
-            .options(joinedload(Document.search_space))
+            self._select_results()
             .join(SearchSpace, Document.search_space_id == SearchSpace.id)
             .where(SearchSpace.user_id == user_id)
             .where(tsvector.op("@@")(tsquery))  # Only include results that match the query
@@ -98,9 +111,8 @@ class DocumentHybridSearchRetriever:
         
         # Execute the query
         result = await self.db_session.execute(query)
-        documents = result.scalars().all()
         
-        return documents
+        return result.all()
 
     async def hybrid_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_type: str = None) -> list:
         """
@@ -114,21 +126,35 @@ class DocumentHybridSearchRetriever:
             document_type: Optional document type to filter results (e.g., "FILE", "CRAWLED_URL")
             
         """
+        from app.retriver.search_result_cache import search_result_cache
+        
+        # Serve searches of an unchanged search space from the result cache
+        searches = [(query_text, document_type)]
+        cache_scope, (cached_results,) = await search_result_cache.lookup(self.db_session, "documents", user_id, search_space_id, top_k, self.search_preset, searches)
+        if cached_results is not None:
+            return cached_results
+        
+        results = await self._hybrid_search(query_text, top_k, user_id, search_space_id, document_type)
+        await search_result_cache.store(cache_scope, searches, [results])
+        return results
+
+    async def _hybrid_search(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_type: str = None) -> list:
+        """Run hybrid_search without the result cache."""
         from sqlalchemy import select, func, text
-        from sqlalchemy.orm import joinedload
         from app.db import Document, SearchSpace, DocumentType
-        from app.config import config
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
         
-        # Get embedding for the query
-        embedding_model = config.embedding_model_instance
-        query_embedding = embedding_model.embed(query_text)
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
         
         # Constants for RRF calculation
         k = 60  # Constant for RRF calculation
         n_results = top_k * 2  # Get more results for better fusion
         
-        # Create tsvector and tsquery for PostgreSQL full-text search
-        tsvector = func.to_tsvector('english', Document.content)
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Document.content_tsv
         tsquery = func.plainto_tsquery('english', query_text)
         
         # Base conditions for document filtering
@@ -137,6 +163,9 @@ class DocumentHybridSearchRetriever:
         # Add search space filter if provided
         if search_space_id is not None:
             base_conditions.append(Document.search_space_id == search_space_id)
+        
+        # Repeated on the final document lookups so partitioned storage prunes them
+        search_space_conditions = [Document.search_space_id == search_space_id] if search_space_id is not None else []
             
         # Add document type filter if provided
         if document_type is not None:
@@ -152,20 +181,17 @@ class DocumentHybridSearchRetriever:
                 base_conditions.append(Document.document_type == document_type)
         
         # CTE for semantic search with user ownership check
-        semantic_search_cte = (
-            select(
-                Document.id,
-                func.rank().over(order_by=Document.embedding.op("<=>")(query_embedding)).label("rank")
-            )
-            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
-            .where(*base_conditions)
-        )
-        
-        semantic_search_cte = (
-            semantic_search_cte
-            .order_by(Document.embedding.op("<=>")(query_embedding))
-            .limit(n_results)
-            .cte("semantic_search")
+        semantic_search_cte = await vector_backend.semantic_search_cte(
+            self.db_session,
+            Document,
+            query_embedding,
+            n_results,
+            lambda query: (
+                query
+                .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+                .where(*base_conditions)
+            ),
+            VectorSearchFilters(user_id, search_space_id, None if document_type is None else [document_type]),
         )
         
         # CTE for keyword search with user ownership check
@@ -181,15 +207,15 @@ class DocumentHybridSearchRetriever:
         
         keyword_search_cte = (
             keyword_search_cte
-            .order_by(func.ts_rank_cd(tsvector, tsquery).desc())
+            # Break keyword rank ties by id, like the per-type keyword search
+            .order_by(func.ts_rank_cd(tsvector, tsquery).desc(), Document.id.desc())
             .limit(n_results)
             .cte("keyword_search")
         )
         
         # Final combined query using a FULL OUTER JOIN with RRF scoring
         final_query = (
-            select(
-                Document,
+            self._select_results(
                 (
                     func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
                     func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0)
@@ -206,12 +232,13 @@ class DocumentHybridSearchRetriever:
                 Document,
                 Document.id == func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id)
             )
-            .options(joinedload(Document.search_space))
-            .order_by(text("score DESC"))
+            .where(*search_space_conditions)
+            .order_by(text("score DESC"), Document.id.desc())
             .limit(top_k)
         )
         
-        # Execute the query
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
         result = await self.db_session.execute(final_query)
         documents_with_scores = result.all()
         
@@ -219,29 +246,468 @@ class DocumentHybridSearchRetriever:
         if not documents_with_scores:
             return []
         
-        # Convert to serializable dictionaries
-        serialized_results = []
-        for document, score in documents_with_scores:
-            # Fetch associated chunks for this document
-            from sqlalchemy import select
-            from app.db import Chunk
+        return await self._serialize_results(documents_with_scores)
+
+    async def hybrid_search_page(self, query_text: str, limit: int, user_id: str, search_space_id: int = None, document_types: list = None, after: tuple = None, max_results: int = 200) -> list:
+        """
+        Get a page of the hybrid search results, ordered by (score DESC, id DESC).
+        
+        Fuses the same candidates as hybrid_search with top_k=max_results, so only
+        the first max_results results can be paginated through. The page is
+        selected in SQL with the keyset predicate (score, id) < after and a LIMIT,
+        so no page returns the results before it. Pages are not cached.
+        
+        Args:
+            query_text: The search query text
+            limit: Number of results to return
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID to filter results
+            document_types: Optional document types to filter results (e.g., ["FILE", "CRAWLED_URL"])
+            after: (score, document id) of the last result of the previous page, None for the first page
+            max_results: Number of ranked results to paginate through
             
-            chunks_query = select(Chunk).where(Chunk.document_id == document.id).order_by(Chunk.id)
-            chunks_result = await self.db_session.execute(chunks_query)
-            chunks = chunks_result.scalars().all()
+        Returns:
+            List of dictionaries containing document data and relevance scores, in
+            the same format as hybrid_search
+        """
+        from sqlalchemy import Float, cast, func, literal, select, tuple_
+        from app.db import Document, SearchSpace, DocumentType
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
+        
+        # Base conditions for document filtering
+        base_conditions = [SearchSpace.user_id == user_id]
+        if search_space_id is not None:
+            base_conditions.append(Document.search_space_id == search_space_id)
+        
+        # Repeated on the final document lookups so partitioned storage prunes them
+        search_space_conditions = [Document.search_space_id == search_space_id] if search_space_id is not None else []
+        
+        # Unknown document types have no results
+        valid_types = None
+        if document_types is not None:
+            valid_types = [document_type for document_type in document_types if document_type in DocumentType.__members__]
+            if not valid_types:
+                return []
+            base_conditions.append(Document.document_type.in_([DocumentType[document_type] for document_type in valid_types]))
+        
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
+        
+        # Constants for RRF calculation, matching hybrid_search with top_k=max_results
+        k = 60
+        n_results = max_results * 2
+        
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Document.content_tsv
+        tsquery = func.plainto_tsquery('english', query_text)
+        
+        # CTE for semantic search with user ownership check
+        semantic_search_cte = await vector_backend.semantic_search_cte(
+            self.db_session,
+            Document,
+            query_embedding,
+            n_results,
+            lambda query: (
+                query
+                .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+                .where(*base_conditions)
+            ),
+            VectorSearchFilters(user_id, search_space_id, valid_types),
+        )
+        
+        # CTE for keyword search with user ownership check
+        keyword_search_cte = (
+            select(
+                Document.id,
+                func.rank().over(order_by=func.ts_rank_cd(tsvector, tsquery).desc()).label("rank")
+            )
+            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+            .where(*base_conditions)
+            .where(tsvector.op("@@")(tsquery))
+            # Break keyword rank ties by id, like the per-type keyword search
+            .order_by(func.ts_rank_cd(tsvector, tsquery).desc(), Document.id.desc())
+            .limit(n_results)
+            .cte("keyword_search")
+        )
+        
+        # Fuse both rankings with RRF as double precision, so the cursor score compares exactly
+        fused = (
+            select(
+                func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id).label("id"),
+                cast(
+                    func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
+                    func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0),
+                    Float
+                ).label("score")
+            )
+            .select_from(
+                semantic_search_cte.outerjoin(
+                    keyword_search_cte,
+                    semantic_search_cte.c.id == keyword_search_cte.c.id,
+                    full=True
+                )
+            )
+            .subquery("fused")
+        )
+        
+        fused_ranked = (
+            select(
+                fused.c.id,
+                fused.c.score,
+                func.row_number().over(order_by=(fused.c.score.desc(), fused.c.id.desc())).label("position")
+            )
+            .subquery("fused_ranked")
+        )
+        
+        final_query = (
+            self._select_results(fused_ranked.c.score)
+            .select_from(fused_ranked)
+            .join(Document, Document.id == fused_ranked.c.id)
+            .where(*search_space_conditions)
+            .where(fused_ranked.c.position <= max_results)
+        )
+        if after is not None:
+            after_score, after_id = after
+            final_query = final_query.where(
+                tuple_(fused_ranked.c.score, fused_ranked.c.id) < tuple_(literal(after_score, Float), literal(after_id))
+            )
+        final_query = final_query.order_by(fused_ranked.c.score.desc(), fused_ranked.c.id.desc()).limit(limit)
+        
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
+        result = await self.db_session.execute(final_query)
+        
+        return await self._serialize_results(result.all())
+
+    async def hybrid_search_by_types(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_types: list = None) -> dict:
+        """
+        Run hybrid search for several document types at once, returning the top-k per type.
+        
+        Gives the same results as calling hybrid_search once per document type, but
+        in a single SQL statement: semantic and keyword rankings are partitioned by
+        document type and fused with Reciprocal Rank Fusion per type. Keyword and
+        fused score ties are broken by id in both, so they keep the same rows in
+        the same order. Rows at exactly the same vector distance may still differ,
+        as the ANN index returns them in no fixed order.
+        
+        Args:
+            query_text: The search query text
+            top_k: Number of results to return per document type
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID to filter results
+            document_types: Document types to search (e.g., ["FILE", "SLACK_CONNECTOR"])
             
-            # Concatenate chunks content
-            concatenated_chunks_content = " ".join([chunk.content for chunk in chunks]) if chunks else document.content
+        Returns:
+            Dictionary mapping each requested document type to its list of document
+            dictionaries, in the same format as hybrid_search
+        """
+        from app.retriver.search_result_cache import search_result_cache
+        
+        # Only search the document types without cached results
+        cache_scope, cached_results = await search_result_cache.lookup(
+            self.db_session, "documents", user_id, search_space_id, top_k, self.search_preset,
+            [(query_text, document_type) for document_type in document_types or []]
+        )
+        results_by_type = {
+            document_type: results
+            for document_type, results in zip(document_types or [], cached_results)
+            if results is not None
+        }
+        
+        missing_types = [document_type for document_type in document_types or [] if document_type not in results_by_type]
+        if missing_types:
+            searched_results = await self._hybrid_search_by_types(query_text, top_k, user_id, search_space_id, missing_types)
+            await search_result_cache.store(
+                cache_scope,
+                [(query_text, document_type) for document_type in missing_types],
+                [searched_results[document_type] for document_type in missing_types]
+            )
+            results_by_type.update(searched_results)
+        
+        return {document_type: results_by_type[document_type] for document_type in document_types or []}
+
+    async def _hybrid_search_by_types(self, query_text: str, top_k: int, user_id: str, search_space_id: int = None, document_types: list = None) -> dict:
+        """Run hybrid_search_by_types without the result cache."""
+        from sqlalchemy import select, func
+        from app.db import Document, SearchSpace, DocumentType
+        from app.retriver.query_embedding_cache import get_query_embedding
+        from app.retriver.vector_backend import VectorSearchFilters, vector_backend
+        from app.retriver.vector_storage import apply_vector_search_settings
+        
+        results_by_type = {document_type: [] for document_type in document_types or []}
+        
+        # Unknown document types have no results
+        valid_types = [document_type for document_type in results_by_type if document_type in DocumentType.__members__]
+        if not valid_types:
+            return results_by_type
+        
+        # Get embedding for the query, shared across retrievers and connectors
+        query_embedding = await get_query_embedding(query_text)
+        
+        # Constants for RRF calculation
+        k = 60  # Constant for RRF calculation
+        n_results = top_k * 2  # Get more results for better fusion
+        
+        # Stored tsvector column and tsquery for PostgreSQL full-text search
+        tsvector = Document.content_tsv
+        tsquery = func.plainto_tsquery('english', query_text)
+        
+        # Base conditions for document filtering
+        base_conditions = [SearchSpace.user_id == user_id]
+        
+        # Add search space filter if provided
+        if search_space_id is not None:
+            base_conditions.append(Document.search_space_id == search_space_id)
+        
+        # Repeated on the final document lookups so partitioned storage prunes them
+        search_space_conditions = [Document.search_space_id == search_space_id] if search_space_id is not None else []
+        
+        # CTE for semantic search per document type with user ownership check
+        semantic_search_cte = await vector_backend.partitioned_semantic_search_cte(
+            self.db_session,
+            Document,
+            valid_types,
+            query_embedding,
+            n_results,
+            lambda query: (
+                query
+                .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+                .where(*base_conditions)
+            ),
+            VectorSearchFilters(user_id, search_space_id),
+        )
+        
+        # Keyword search ranked per document type with user ownership check
+        keyword_ranked = (
+            select(
+                Document.id,
+                func.rank().over(
+                    partition_by=Document.document_type,
+                    order_by=func.ts_rank_cd(tsvector, tsquery).desc()
+                ).label("rank"),
+                # Keep exactly n_results rows per type, breaking rank ties by id like hybrid_search
+                func.row_number().over(
+                    partition_by=Document.document_type,
+                    order_by=(func.ts_rank_cd(tsvector, tsquery).desc(), Document.id.desc())
+                ).label("position")
+            )
+            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+            .where(*base_conditions)
+            .where(Document.document_type.in_([DocumentType[document_type] for document_type in valid_types]))
+            .where(tsvector.op("@@")(tsquery))
+            .subquery("keyword_ranked")
+        )
+        
+        keyword_search_cte = (
+            select(keyword_ranked.c.id, keyword_ranked.c.document_type, keyword_ranked.c.rank)
+            .where(keyword_ranked.c.position <= n_results)
+            .cte("keyword_search")
+        )
+        
+        # Fuse both rankings with RRF and rank the fused results per document type
+        fused = (
+            select(
+                func.coalesce(semantic_search_cte.c.id, keyword_search_cte.c.id).label("id"),
+                (
+                    func.coalesce(1.0 / (k + semantic_search_cte.c.rank), 0.0) +
+                    func.coalesce(1.0 / (k + keyword_search_cte.c.rank), 0.0)
+                ).label("score")
+            )
+            .select_from(
+                semantic_search_cte.outerjoin(
+                    keyword_search_cte,
+                    semantic_search_cte.c.id == keyword_search_cte.c.id,
+                    full=True
+                )
+            )
+            .subquery("fused")
+        )
+        
+        fused_ranked = (
+            select(
+                fused.c.id,
+                fused.c.score,
+                Document.document_type,
+                func.row_number().over(
+                    partition_by=Document.document_type,
+                    order_by=(fused.c.score.desc(), fused.c.id.desc())
+                ).label("position")
+            )
+            .join(Document, Document.id == fused.c.id)
+            .where(*search_space_conditions)
+            .subquery("fused_ranked")
+        )
+        
+        final_query = (
+            self._select_results(fused_ranked.c.score)
+            .select_from(Document)
+            .join(fused_ranked, Document.id == fused_ranked.c.id)
+            .where(*search_space_conditions)
+            .where(fused_ranked.c.position <= top_k)
+            .order_by(fused_ranked.c.document_type, fused_ranked.c.position)
+        )
+        
+        # Execute the query with iterative index scans for the filtered ANN search
+        await apply_vector_search_settings(self.db_session, self.search_preset)
+        result = await self.db_session.execute(final_query)
+        
+        for serialized_result in await self._serialize_results(result.all()):
+            results_by_type[serialized_result["document_type"]].append(serialized_result)
+        
+        return results_by_type
+
+    async def fetch_embeddings(self, document_ids: list, user_id: str, search_space_id: int = None) -> dict:
+        """
+        Fetch the stored embeddings of search result documents, e.g. to diversify them.
+        
+        Args:
+            document_ids: IDs of the documents
+            user_id: The ID of the user performing the search
+            search_space_id: Optional search space ID the documents belong to
+            
+        Returns:
+            Dictionary mapping document IDs to their embeddings. Documents the user
+            can't access are left out.
+        """
+        from sqlalchemy import select
+        from app.db import Document, SearchSpace
+        
+        if not document_ids:
+            return {}
+        
+        query = (
+            select(Document.id, Document.embedding)
+            .join(SearchSpace, Document.search_space_id == SearchSpace.id)
+            .where(Document.id.in_(set(document_ids)))
+            .where(SearchSpace.user_id == user_id)
+        )
+        if search_space_id is not None:
+            query = query.where(Document.search_space_id == search_space_id)
+        
+        result = await self.db_session.execute(query)
+        return {document_id: embedding for document_id, embedding in result}
+
+    async def fetch_chunks_content(self, documents, max_chars: int = None) -> dict:
+        """
+        Fetch the concatenated chunk contents of several documents in a single query.
+        
+        The chunks are joined in document order by string_agg in the database. With
+        a character limit only the leading chunks that fit are aggregated and the text
+        is truncated, so huge documents are never transferred whole.
+        
+        Args:
+            documents: The documents whose chunks to fetch, or rows with "id" and
+                "search_space_id" attributes
+            max_chars: Maximum length of the text of each document, defaults to
+                DOCUMENT_CHUNKS_CONTENT_MAX_CHARS. 0 means no limit.
+            
+        Returns:
+            Dictionary mapping document IDs to their concatenated chunks content.
+            Documents without chunks are left out.
+        """
+        from sqlalchemy import select, func, literal_column
+        from sqlalchemy.dialects.postgresql import aggregate_order_by
+        from app.config import config
+        from app.db import Chunk
+        
+        if not documents:
+            return {}
+        if max_chars is None:
+            max_chars = config.DOCUMENT_CHUNKS_CONTENT_MAX_CHARS
+        
+        # Chunks of the documents with the length of the content before each chunk
+        ordered_chunks = (
+            select(
+                Chunk.document_id,
+                Chunk.content,
+                Chunk.position,
+                Chunk.id,
+                (
+                    func.sum(func.length(Chunk.content)).over(
+                        partition_by=Chunk.document_id,
+                        order_by=(Chunk.position, Chunk.id)
+                    ) - func.length(Chunk.content)
+                ).label("preceding_chars")
+            )
+            .where(Chunk.document_id.in_({document.id for document in documents}))
+            # The search spaces let partitioned storage prune partitions
+            .where(Chunk.search_space_id.in_({document.search_space_id for document in documents}))
+            .subquery("ordered_chunks")
+        )
+        
+        chunks_content = func.string_agg(
+            ordered_chunks.c.content,
+            aggregate_order_by(literal_column("' '"), ordered_chunks.c.position, ordered_chunks.c.id)
+        )
+        if max_chars:
+            # Only aggregate the chunks starting within the limit
+            query = (
+                select(ordered_chunks.c.document_id, func.left(chunks_content, max_chars))
+                .where(ordered_chunks.c.preceding_chars < max_chars)
+                .group_by(ordered_chunks.c.document_id)
+            )
+        else:
+            query = select(ordered_chunks.c.document_id, chunks_content).group_by(ordered_chunks.c.document_id)
+        
+        result = await self.db_session.execute(query)
+        return {document_id: content for document_id, content in result}
+
+    def _select_results(self, *extra_columns):
+        """
+        Select the result columns of documents.
+        
+        Only the columns the results are built from are selected, instead of
+        hydrating Document objects with their embedding and search space. The
+        result rows have "id", "title", "content", "document_type",
+        "document_metadata" and "search_space_id" attributes, followed by the
+        extra columns.
+        
+        Args:
+            *extra_columns: Additional columns to select, e.g. the RRF score
             
+        Returns:
+            The select statement
+        """
+        from sqlalchemy import select
+        from app.db import Document
+        
+        return select(
+            Document.id,
+            Document.title,
+            Document.content,
+            Document.document_type,
+            Document.document_metadata,
+            Document.search_space_id,
+            *extra_columns,
+        )
+
+    async def _serialize_results(self, rows) -> list:
+        """
+        Convert result rows with their RRF score to serializable dictionaries with their chunks content.
+        
+        Args:
+            rows: Rows selected with _select_results and a "score" column
+            
+        Returns:
+            List of dictionaries containing document data and relevance scores
+        """
+        # Fetch the chunks content of all documents at once
+        chunks_contents = await self.fetch_chunks_content(rows)
+        
+        # Convert to serializable dictionaries
+        serialized_results = []
+        for row in rows:
             serialized_results.append({
-                "document_id": document.id,
-                "title": document.title,
-                "content": document.content,
-                "chunks_content": concatenated_chunks_content,
-                "document_type": document.document_type.value if hasattr(document, 'document_type') else None,
-                "metadata": document.document_metadata,
-                "score": float(score),  # Ensure score is a Python float
-                "search_space_id": document.search_space_id
+                "document_id": row.id,
+                "title": row.title,
+                "content": row.content,
+                "chunks_content": chunks_contents.get(row.id, row.content),
+                "document_type": row.document_type.value if row.document_type is not None else None,
+                "metadata": row.document_metadata,
+                "score": float(row.score),  # Ensure score is a Python float
+                "search_space_id": row.search_space_id
             })
         
-        return serialized_results 
\ No newline at end of file
+        return serialized_results
@@ -0,0 +1,59 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def maximal_marginal_relevance(
+    query_embeddings: Sequence[Sequence[float]],
+    candidate_embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Select diverse candidates with Maximal Marginal Relevance.
+
+    Candidates are picked one at a time, each maximizing
+    lambda_mult * relevance - (1 - lambda_mult) * redundancy, where relevance is
+    the highest cosine similarity to any of the queries and redundancy the
+    highest cosine similarity to an already selected candidate. Each pick is a
+    single vectorized pass over the candidates, and only the similarities to the
+    selected candidates are computed, so memory stays linear in the candidates.
+
+    Args:
+        query_embeddings: Embeddings of the queries the candidates were retrieved for
+        candidate_embeddings: Embeddings of the candidates
+        k: Number of candidates to select
+        lambda_mult: Weight of relevance against diversity, 1 ranks by relevance only
+
+    Returns:
+        Indexes of the selected candidates, in selection order
+    """
+    n_candidates = len(candidate_embeddings)
+    k = min(k, n_candidates)
+    if k <= 0:
+        return []
+
+    candidates = _normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    queries = _normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(-1, candidates.shape[1]))
+
+    relevance = (candidates @ queries.T).max(axis=1)
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = candidates @ candidates[selected[0]]
+    available = np.ones(n_candidates, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        index = int(np.argmax(scores))
+        selected.append(index)
+        available[index] = False
+        np.maximum(redundancy, candidates @ candidates[index], out=redundancy)
+
+    return selected
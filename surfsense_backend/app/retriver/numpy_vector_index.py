@@ -0,0 +1,285 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Files of a persisted index, see NumpyVectorIndex.save
+_ARRAY_FILES = {
+    "embeddings": "embeddings.npy",
+    "ids": "ids.npy",
+    "group_ids": "group_ids.npy",
+    "labels": "labels.npy",
+    "versions": "versions.npy",
+}
+_META_FILE = "meta.json"
+
+
+class NumpyVectorIndex:
+    """
+    In-process exact cosine similarity index over a contiguous float32 matrix.
+
+    Each row has an id, a group id (the search space) and a label (the document
+    type) to filter on, and a version to detect rows changed in place. Vectors
+    are normalized on insert so that a search is a single matrix product followed
+    by a partial sort. Rows can be appended and deleted incrementally, and the
+    index can be saved to a directory and loaded back memory-mapped, so a large
+    index is paged in by the OS on demand instead of being read whole at startup.
+    """
+
+    def __init__(self, dimension: int):
+        """
+        Initialize an empty index
+
+        Args:
+            dimension: Dimension of the vectors
+        """
+        self.dimension = dimension
+        self._embeddings = np.empty((0, dimension), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._group_ids = np.empty(0, dtype=np.int64)
+        self._labels: np.ndarray = np.empty(0, dtype=np.int32)
+        self._versions = np.empty(0, dtype=np.int64)
+        self._label_codes: Dict[str, int] = {}
+        self._size = 0
+        # Version of each group the rows were loaded from, e.g. a corpus generation
+        self.group_versions: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def memory_mapped(self) -> bool:
+        """Whether the vectors are still served from the memory-mapped files."""
+        return isinstance(self._embeddings, np.memmap)
+
+    def _label_code(self, label: str) -> int:
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self._label_codes)
+        return code
+
+    def _reserve(self, extra: int) -> None:
+        """Grow the arrays geometrically so appends are amortized O(1) per row."""
+        needed = self._size + extra
+        capacity = self._embeddings.shape[0]
+        if needed <= capacity and not self.memory_mapped:
+            return
+
+        new_capacity = max(needed, capacity * 2, 1024)
+        embeddings = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        embeddings[: self._size] = self._embeddings[: self._size]
+        ids = np.empty(new_capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        group_ids = np.empty(new_capacity, dtype=np.int64)
+        group_ids[: self._size] = self._group_ids[: self._size]
+        labels = np.empty(new_capacity, dtype=np.int32)
+        labels[: self._size] = self._labels[: self._size]
+        versions = np.empty(new_capacity, dtype=np.int64)
+        versions[: self._size] = self._versions[: self._size]
+        self._embeddings, self._ids, self._group_ids = embeddings, ids, group_ids
+        self._labels, self._versions = labels, versions
+
+    def append(
+        self,
+        ids: Sequence[int],
+        embeddings: Sequence[Sequence[float]],
+        group_ids: Sequence[int],
+        labels: Sequence[str],
+        versions: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Append rows to the index
+
+        Args:
+            ids: Row ids
+            embeddings: Row vectors
+            group_ids: Group of each row, e.g. its search space
+            labels: Label of each row, e.g. its document type
+            versions: Optional version of each row, 0 by default
+        """
+        if len(ids) == 0:
+            return
+
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._reserve(len(ids))
+            end = self._size + len(ids)
+            self._embeddings[self._size : end] = vectors
+            self._ids[self._size : end] = ids
+            self._group_ids[self._size : end] = group_ids
+            self._labels[self._size : end] = [self._label_code(label) for label in labels]
+            self._versions[self._size : end] = versions if versions is not None else 0
+            self._size = end
+
+    def _compact(self, keep: np.ndarray) -> int:
+        """Keep only the rows selected by a boolean mask, returning the number removed."""
+        removed = int(self._size - keep.sum())
+        if removed:
+            self._embeddings = np.ascontiguousarray(self._embeddings[: self._size][keep])
+            self._ids = self._ids[: self._size][keep]
+            self._group_ids = self._group_ids[: self._size][keep]
+            self._labels = self._labels[: self._size][keep]
+            self._versions = self._versions[: self._size][keep]
+            self._size = len(self._ids)
+        return removed
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """
+        Delete rows by id
+
+        Returns:
+            Number of deleted rows
+        """
+        ids = np.fromiter(ids, dtype=np.int64)
+        with self._lock:
+            return self._compact(~np.isin(self._ids[: self._size], ids))
+
+    def group_rows(self, group_id: int) -> Dict[int, Tuple[str, int]]:
+        """
+        Get the rows of a group
+
+        Returns:
+            Dictionary mapping the id of each row of the group to its (label, version)
+        """
+        with self._lock:
+            labels = {code: label for label, code in self._label_codes.items()}
+            mask = self._group_ids[: self._size] == group_id
+            return {
+                int(row_id): (labels[int(code)], int(version))
+                for row_id, code, version in zip(
+                    self._ids[: self._size][mask],
+                    self._labels[: self._size][mask],
+                    self._versions[: self._size][mask],
+                )
+            }
+
+    def _mask(self, group_ids: Optional[Sequence[int]], labels: Optional[Sequence[str]]) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        if group_ids is not None:
+            mask &= np.isin(self._group_ids[: self._size], np.asarray(list(group_ids), dtype=np.int64))
+        if labels is not None:
+            codes = [self._label_codes[label] for label in labels if label in self._label_codes]
+            mask &= np.isin(self._labels[: self._size], np.asarray(codes, dtype=np.int32))
+        return mask
+
+    def search_many(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int,
+        group_ids: Optional[Sequence[int]] = None,
+        labels: Optional[Sequence[str]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Find the most similar rows to each query vector
+
+        Args:
+            query_embeddings: The query vectors
+            top_k: Number of rows to return per query
+            group_ids: Only search rows of these groups. None searches all groups.
+            labels: Only search rows with these labels. None searches all labels.
+
+        Returns:
+            For each query, its (id, cosine distance) pairs from nearest to farthest
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            mask = self._mask(group_ids, labels)
+            candidate_ids = self._ids[: self._size][mask]
+            if not len(candidate_ids) or top_k <= 0:
+                return [[] for _ in range(len(queries))]
+            similarities = queries @ self._embeddings[: self._size][mask].T
+
+        k = min(top_k, len(candidate_ids))
+        # Partial sort for the top-k of each query, then order those k exactly
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_similarities, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_similarities = np.take_along_axis(top_similarities, order, axis=1)
+
+        return [
+            [(int(candidate_ids[index]), float(1.0 - similarity)) for index, similarity in zip(row, row_similarities)]
+            for row, row_similarities in zip(top, top_similarities)
+        ]
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int,
+        group_ids: Optional[Sequence[int]] = None,
+        labels: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Find the most similar rows to a query vector, see search_many."""
+        return self.search_many([query_embedding], top_k, group_ids, labels)[0]
+
+    def save(self, directory: str) -> None:
+        """
+        Save the index to a directory
+
+        Each file is written next to its target and renamed over it, so a crash
+        never leaves a half-written file behind. The meta file is written last
+        with the row count, so load can detect a crash between two renames. The
+        rows are snapshotted under the lock and written without holding it, as
+        appends only write past the snapshot and deletes replace the arrays.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            arrays = {
+                "embeddings": self._embeddings[: self._size],
+                "ids": self._ids[: self._size],
+                "group_ids": self._group_ids[: self._size],
+                "labels": self._labels[: self._size],
+                "versions": self._versions[: self._size],
+            }
+            meta = {
+                "dimension": self.dimension,
+                "size": self._size,
+                "label_codes": dict(self._label_codes),
+                "group_versions": {str(group_id): version for group_id, version in self.group_versions.items()},
+            }
+        for name, array in arrays.items():
+            path = os.path.join(directory, _ARRAY_FILES[name])
+            with open(path + ".tmp", "wb") as file:
+                np.save(file, np.ascontiguousarray(array))
+            os.replace(path + ".tmp", path)
+        path = os.path.join(directory, _META_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump(meta, file)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str) -> "NumpyVectorIndex":
+        """
+        Load an index saved with save, memory-mapping its vectors
+
+        The vectors stay memory-mapped and read-only until the index is first
+        modified, when they are copied into memory.
+
+        Raises:
+            ValueError: If the files do not all hold the rows of the same save
+        """
+        with open(os.path.join(directory, _META_FILE)) as file:
+            meta = json.load(file)
+
+        index = cls(meta["dimension"])
+        index._embeddings = np.load(os.path.join(directory, _ARRAY_FILES["embeddings"]), mmap_mode="r")
+        index._ids = np.load(os.path.join(directory, _ARRAY_FILES["ids"]))
+        index._group_ids = np.load(os.path.join(directory, _ARRAY_FILES["group_ids"]))
+        index._labels = np.load(os.path.join(directory, _ARRAY_FILES["labels"]))
+        index._versions = np.load(os.path.join(directory, _ARRAY_FILES["versions"]))
+        arrays = (index._embeddings, index._ids, index._group_ids, index._labels, index._versions)
+        if any(len(array) != meta["size"] for array in arrays):
+            raise ValueError(f"Vector store {directory} mixes files of different saves")
+        index._label_codes = meta["label_codes"]
+        index.group_versions = {int(group_id): version for group_id, version in meta["group_versions"].items()}
+        index._size = len(index._ids)
+        return index
@@ -0,0 +1,121 @@
+import asyncio
+from typing import Any, Dict, Hashable, List
+
+from app.config import config
+from app.utils.embedding_service import embedding_service
+from app.utils.lru_cache import LRUCache
+
+# Query embeddings shared by the chunk and document retrievers, so each distinct
+# query string is embedded once across connectors, questions and requests
+query_embedding_cache = LRUCache(
+    max_size=config.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=config.QUERY_EMBEDDING_CACHE_TTL,
+)
+
+# Embeddings currently being computed, so concurrent searches for the same query
+# wait for one model call instead of each starting their own
+_pending_embeddings: Dict[Hashable, asyncio.Future] = {}
+
+
+def normalize_query_text(query_text: str) -> str:
+    """Normalize whitespace in a query so trivially different strings share a cache entry."""
+    return " ".join(query_text.split())
+
+
+async def get_query_embedding(query_text: str) -> Any:
+    """
+    Get the embedding of a search query, embedding it only on a cache miss
+
+    Args:
+        query_text: The search query text
+
+    Returns:
+        The query embedding
+    """
+    normalized_query = normalize_query_text(query_text)
+    cache_key = (embedding_service.model_name, normalized_query)
+
+    embedding = query_embedding_cache.get(cache_key)
+    if embedding is not None:
+        return embedding
+
+    pending = _pending_embeddings.get(cache_key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _pending_embeddings[cache_key] = future
+    try:
+        embedding = await embedding_service.embed(normalized_query)
+        query_embedding_cache.set(cache_key, embedding)
+        future.set_result(embedding)
+        return embedding
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved when nobody else was waiting
+        future.exception()
+        raise
+    finally:
+        _pending_embeddings.pop(cache_key, None)
+
+
+async def get_query_embeddings(query_texts: List[str]) -> List[Any]:
+    """
+    Get the embeddings of several search queries, embedding all cache misses in one batch
+
+    Args:
+        query_texts: The search query texts
+
+    Returns:
+        The query embeddings, in the same order as the query texts
+    """
+    cache_keys = [
+        (embedding_service.model_name, normalize_query_text(query_text))
+        for query_text in query_texts
+    ]
+
+    embeddings: Dict[Hashable, Any] = {}
+    waiting: Dict[Hashable, asyncio.Future] = {}
+    missing: Dict[Hashable, str] = {}
+    for cache_key in cache_keys:
+        if cache_key in embeddings or cache_key in waiting or cache_key in missing:
+            continue
+        embedding = query_embedding_cache.get(cache_key)
+        if embedding is not None:
+            embeddings[cache_key] = embedding
+        elif cache_key in _pending_embeddings:
+            waiting[cache_key] = _pending_embeddings[cache_key]
+        else:
+            missing[cache_key] = cache_key[1]
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        futures = {cache_key: loop.create_future() for cache_key in missing}
+        _pending_embeddings.update(futures)
+        try:
+            new_embeddings = await embedding_service.embed_many(list(missing.values()))
+            for cache_key, embedding in zip(missing, new_embeddings):
+                query_embedding_cache.set(cache_key, embedding)
+                futures[cache_key].set_result(embedding)
+                embeddings[cache_key] = embedding
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures.values():
+                future.set_exception(e)
+                # Mark the exception as retrieved when nobody else was waiting
+                future.exception()
+            raise
+        finally:
+            for cache_key in missing:
+                _pending_embeddings.pop(cache_key, None)
+
+    for cache_key, pending in waiting.items():
+        embeddings[cache_key] = await asyncio.shield(pending)
+
+    return [embeddings[cache_key] for cache_key in cache_keys]
@@ -0,0 +1,344 @@
+import copy
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import config
+from app.retriver.query_embedding_cache import normalize_query_text
+from app.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Searches identified by (query text, document type filter)
+Search = Tuple[str, Optional[str]]
+
+
+def _owned_search_space(user_id: str, search_space_id: int):
+    """Select the corpus generation of a search space, if the user owns it."""
+    from sqlalchemy import select
+    from app.db import SearchSpace, corpus_generation
+
+    return select(corpus_generation(SearchSpace.id).label("generation")).where(
+        SearchSpace.id == search_space_id, SearchSpace.user_id == user_id
+    )
+
+
+class InProcessSearchResultBackend:
+    """Search result storage in an in-process LRU cache, private to each worker."""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.cache = LRUCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats
+        return {"size": stats["size"], "max_size": stats["max_size"], "evictions": stats["evictions"]}
+
+    async def lookup(
+        self, session, user_id: str, search_space_id: int, cache_keys: Sequence[str]
+    ) -> Tuple[Optional[int], Dict[str, Any]]:
+        result = await session.execute(_owned_search_space(user_id, search_space_id))
+        generation = result.scalar_one_or_none()
+        if generation is None:
+            return None, {}
+
+        found = {}
+        for cache_key in cache_keys:
+            results = self.cache.get((cache_key, generation))
+            if results is not None:
+                # Copied so callers can modify the results without corrupting the cache
+                found[cache_key] = copy.deepcopy(results)
+        return generation, found
+
+    async def set_many(self, generation: int, entries: Dict[str, Any]) -> None:
+        for cache_key, results in entries.items():
+            self.cache.set((cache_key, generation), copy.deepcopy(results))
+
+
+class DatabaseSearchResultBackend:
+    """
+    Search result storage in the search_result_cache table, shared by all workers.
+
+    Entries are looked up together with the corpus generation and ownership of the
+    search space in one read-only query on the search session. The table is bounded
+    by max_entries and evicts the least recently used entries first, with
+    last_used_at refreshed at most every touch_interval_seconds. Entries are
+    written in their own sessions, so the cache never affects the transaction of
+    the search.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        eviction_slack: float = 0.1,
+        touch_interval_seconds: float = 300,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.eviction_slack = eviction_slack
+        self.touch_interval = timedelta(seconds=touch_interval_seconds)
+        self.evictions = 0
+        self._inserts_since_eviction_check = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"max_size": self.max_entries, "evictions": self.evictions}
+
+    async def lookup(
+        self, session, user_id: str, search_space_id: int, cache_keys: Sequence[str]
+    ) -> Tuple[Optional[int], Dict[str, Any]]:
+        from sqlalchemy import and_, select
+        from app.db import SearchResultCacheEntry
+
+        now = datetime.now(timezone.utc)
+        space = _owned_search_space(user_id, search_space_id).subquery()
+        conditions = [
+            SearchResultCacheEntry.cache_key.in_(list(cache_keys)),
+            SearchResultCacheEntry.corpus_generation == space.c.generation,
+        ]
+        if self.ttl_seconds is not None:
+            conditions.append(
+                SearchResultCacheEntry.created_at > now - timedelta(seconds=self.ttl_seconds)
+            )
+        result = await session.execute(
+            select(
+                space.c.generation,
+                SearchResultCacheEntry.id,
+                SearchResultCacheEntry.cache_key,
+                SearchResultCacheEntry.results,
+                SearchResultCacheEntry.last_used_at,
+            )
+            .select_from(space)
+            .outerjoin(SearchResultCacheEntry, and_(*conditions))
+        )
+
+        generation = None
+        found = {}
+        stale_ids = []
+        for row in result:
+            generation = row.generation
+            if row.cache_key is not None:
+                found[row.cache_key] = row.results
+                if now - row.last_used_at >= self.touch_interval:
+                    stale_ids.append(row.id)
+
+        if stale_ids:
+            await self._touch(stale_ids, now)
+        return generation, found
+
+    async def _touch(self, entry_ids: List[int], now: datetime) -> None:
+        """Refresh last_used_at of hit entries so they survive LRU eviction."""
+        from sqlalchemy import update
+        from app.db import SearchResultCacheEntry, async_session_maker
+
+        async with async_session_maker() as session:
+            await session.execute(
+                update(SearchResultCacheEntry)
+                .where(SearchResultCacheEntry.id.in_(entry_ids))
+                .values(last_used_at=now)
+            )
+            await session.commit()
+
+    async def set_many(self, generation: int, entries: Dict[str, Any]) -> None:
+        from sqlalchemy.dialects.postgresql import insert
+        from app.db import SearchResultCacheEntry, async_session_maker
+
+        now = datetime.now(timezone.utc)
+        statement = insert(SearchResultCacheEntry).values(
+            [
+                {
+                    "cache_key": cache_key,
+                    "corpus_generation": generation,
+                    "results": results,
+                    "created_at": now,
+                    "last_used_at": now,
+                }
+                for cache_key, results in entries.items()
+            ]
+        )
+        async with async_session_maker() as session:
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[SearchResultCacheEntry.cache_key],
+                    set_={
+                        "corpus_generation": statement.excluded.corpus_generation,
+                        "results": statement.excluded.results,
+                        "created_at": now,
+                        "last_used_at": now,
+                    },
+                )
+            )
+
+            self._inserts_since_eviction_check += len(entries)
+            if self.max_entries and self._inserts_since_eviction_check >= max(
+                1, int(self.max_entries * self.eviction_slack)
+            ):
+                await self._evict(session)
+
+            await session.commit()
+
+    async def _evict(self, session) -> None:
+        """Evict the least recently used entries once the table exceeds max_entries."""
+        from sqlalchemy import delete, func, select
+        from app.db import SearchResultCacheEntry
+
+        self._inserts_since_eviction_check = 0
+        total = (
+            await session.execute(select(func.count(SearchResultCacheEntry.id)))
+        ).scalar() or 0
+        if total <= self.max_entries:
+            return
+
+        # Evict down to below the limit so eviction does not run on every insert
+        target = int(self.max_entries * (1 - self.eviction_slack))
+        stale_ids = (
+            select(SearchResultCacheEntry.id)
+            .order_by(SearchResultCacheEntry.last_used_at.asc())
+            .limit(total - target)
+        )
+        result = await session.execute(
+            delete(SearchResultCacheEntry).where(SearchResultCacheEntry.id.in_(stale_ids))
+        )
+        self.evictions += result.rowcount or 0
+        logger.info(f"Evicted {result.rowcount} entries from the search result cache")
+
+
+class SearchResultCache:
+    """
+    Cache of hybrid search results, invalidated by search space corpus generations.
+
+    Results are cached per (retriever, user, search space, top-k, search preset,
+    normalized query, document type) along with the corpus generation they were
+    computed for. A trigger bumps the corpus generation of a search space whenever
+    its documents are inserted, updated or deleted, so results of an older corpus
+    are never returned and age out of the bounded backend. Searches across all
+    search spaces of a user are not cached.
+    """
+
+    def __init__(self, backend=None):
+        """
+        Initialize the search result cache
+
+        Args:
+            backend: InProcessSearchResultBackend or DatabaseSearchResultBackend.
+                None disables the cache.
+        """
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache hit/miss counters and the backend size metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            **(self.backend.stats if self.backend else {}),
+        }
+
+    def make_key(self, scope: Tuple, query_text: str, document_type: Optional[str] = None) -> str:
+        """Build the cache key of a search within a scope."""
+        payload = json.dumps(
+            [*scope, normalize_query_text(query_text), document_type], default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def lookup(
+        self,
+        session,
+        retriever: str,
+        user_id: str,
+        search_space_id: Optional[int],
+        top_k: int,
+        search_preset: Optional[str],
+        searches: Sequence[Search],
+    ) -> Tuple[Optional[Tuple], List[Optional[Any]]]:
+        """
+        Get the cached results of the searches of a retriever call
+
+        Looks up the current corpus generation of the search space, which also
+        checks that the user owns it, together with the cached results.
+
+        Args:
+            session: The session of the search
+            retriever: "chunks" or "documents"
+            user_id: The ID of the user performing the search
+            search_space_id: The searched search space
+            top_k: Number of results per search
+            search_preset: Vector search preset of the searches
+            searches: (query text, document type filter) of each search
+
+        Returns:
+            The scope to store the results of the missed searches with, None if the
+            searches can't be cached, and the cached results of each search, None
+            on a miss
+        """
+        if self.backend is None or search_space_id is None or not searches:
+            return None, [None] * len(searches)
+
+        scope = (
+            retriever,
+            str(user_id),
+            search_space_id,
+            top_k,
+            search_preset or config.VECTOR_SEARCH_PRESET,
+        )
+        cache_keys = [self.make_key(scope, query_text, document_type) for query_text, document_type in searches]
+
+        try:
+            generation, found = await self.backend.lookup(session, user_id, search_space_id, cache_keys)
+        except Exception as e:
+            logger.warning(f"Search result cache lookup failed: {e}")
+            return None, [None] * len(searches)
+
+        if generation is None:
+            return None, [None] * len(searches)
+
+        results = [found.get(cache_key) for cache_key in cache_keys]
+        hits = sum(1 for cached in results if cached is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return (scope, generation), results
+
+    async def store(self, cache_scope: Optional[Tuple], searches: Sequence[Search], results: Sequence[Any]) -> None:
+        """
+        Store the results of searches
+
+        Args:
+            cache_scope: Scope from lookup. None stores nothing.
+            searches: (query text, document type filter) of each search
+            results: The serialized results of each search
+        """
+        if cache_scope is None or not searches:
+            return
+
+        scope, generation = cache_scope
+        entries = {
+            self.make_key(scope, query_text, document_type): search_results
+            for (query_text, document_type), search_results in zip(searches, results)
+        }
+        try:
+            await self.backend.set_many(generation, entries)
+        except Exception as e:
+            logger.warning(f"Search result cache update failed: {e}")
+
+
+def _create_backend():
+    if config.SEARCH_RESULT_CACHE_BACKEND == "memory":
+        return InProcessSearchResultBackend(
+            config.SEARCH_RESULT_CACHE_SIZE, config.SEARCH_RESULT_CACHE_TTL
+        )
+    if config.SEARCH_RESULT_CACHE_BACKEND == "database":
+        return DatabaseSearchResultBackend(
+            config.SEARCH_RESULT_CACHE_SIZE, config.SEARCH_RESULT_CACHE_TTL
+        )
+    return None
+
+
+# Search results shared by the chunk and document retrievers
+search_result_cache = SearchResultCache(_create_backend())
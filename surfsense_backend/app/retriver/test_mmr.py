@@ -0,0 +1,30 @@
+import unittest
+
+from surfsense_backend.app.retriver.mmr import maximal_marginal_relevance
+
+
+class TestMaximalMarginalRelevance(unittest.TestCase):
+
+    def setUp(self):
+        # The second candidate is a near-duplicate of the first
+        self.candidates = [[1.0, 0.0], [0.99, 0.14], [0.6, 0.8]]
+
+    def test_relevance_only_ranks_by_similarity(self):
+        self.assertEqual(maximal_marginal_relevance([[1.0, 0.0]], self.candidates, k=3, lambda_mult=1.0), [0, 1, 2])
+
+    def test_diversity_skips_near_duplicates(self):
+        self.assertEqual(maximal_marginal_relevance([[1.0, 0.0]], self.candidates, k=2, lambda_mult=0.3), [0, 2])
+
+    def test_relevance_is_the_best_of_all_queries(self):
+        selected = maximal_marginal_relevance([[1.0, 0.0], [0.0, 1.0]], self.candidates, k=1, lambda_mult=1.0)
+
+        self.assertEqual(selected, [0])
+        self.assertEqual(maximal_marginal_relevance([[0.0, 1.0]], self.candidates, k=1), [2])
+
+    def test_k_is_capped_by_the_candidates(self):
+        self.assertEqual(sorted(maximal_marginal_relevance([[1.0, 0.0]], self.candidates, k=10)), [0, 1, 2])
+        self.assertEqual(maximal_marginal_relevance([[1.0, 0.0]], [], k=3), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from surfsense_backend.app.retriver.numpy_vector_index import NumpyVectorIndex
+
+
+class TestNumpyVectorIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NumpyVectorIndex(dimension=2)
+        self.index.append(
+            ids=[1, 2, 3],
+            embeddings=[[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]],
+            group_ids=[10, 10, 20],
+            labels=["FILE", "SLACK_CONNECTOR", "FILE"],
+        )
+
+    def test_search_orders_by_cosine_distance(self):
+        results = self.index.search([2.0, 0.1], top_k=2)
+
+        self.assertEqual([row_id for row_id, _ in results], [1, 2])
+        self.assertAlmostEqual(results[0][1], 1 - 2.0 / (2.0**2 + 0.1**2) ** 0.5, places=5)
+
+    def test_search_filters_by_group_and_label(self):
+        self.assertEqual([row_id for row_id, _ in self.index.search([1.0, 0.0], 3, group_ids=[20])], [3])
+        self.assertEqual([row_id for row_id, _ in self.index.search([1.0, 0.0], 3, labels=["SLACK_CONNECTOR"])], [2])
+        self.assertEqual(self.index.search([1.0, 0.0], 3, labels=["UNKNOWN"]), [])
+
+    def test_delete_and_append_changed_rows(self):
+        # A changed row is deleted and appended again with its new vector and version
+        self.assertEqual(self.index.delete([1, 3]), 2)
+        self.index.append([3, 4], [[1.0, 0.2], [1.0, 0.1]], [20, 20], ["FILE", "FILE"], versions=[5, 6])
+
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual([row_id for row_id, _ in self.index.search([1.0, 0.0], 3)], [4, 3, 2])
+        self.assertEqual(self.index.group_rows(20), {3: ("FILE", 5), 4: ("FILE", 6)})
+
+    def test_group_rows_keep_versions(self):
+        self.index.append([4], [[1.0, 1.0]], [20], ["FILE"], versions=[9])
+
+        self.assertEqual(self.index.group_rows(20), {3: ("FILE", 0), 4: ("FILE", 9)})
+        self.index.delete([3])
+        self.assertEqual(self.index.group_rows(20), {4: ("FILE", 9)})
+
+    def test_save_and_load_memory_maps_vectors(self):
+        self.index.group_versions[10] = 3
+        with tempfile.TemporaryDirectory() as directory:
+            self.index.save(directory)
+            loaded = NumpyVectorIndex.load(directory)
+
+            self.assertTrue(loaded.memory_mapped)
+            self.assertEqual(loaded.group_versions, {10: 3})
+            self.assertEqual(loaded.group_rows(10), {1: ("FILE", 0), 2: ("SLACK_CONNECTOR", 0)})
+            self.assertEqual([row_id for row_id, _ in loaded.search([0.0, 1.0], 3)], [3, 2, 1])
+
+            # The first modification copies the vectors into memory
+            loaded.append([5], [[1.0, 1.0]], [20], ["FILE"])
+            self.assertFalse(loaded.memory_mapped)
+            self.assertEqual(len(loaded), 4)
+
+    def test_load_refuses_files_of_different_saves(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.index.save(directory)
+            ids_path = os.path.join(directory, "ids.npy")
+            with open(ids_path, "rb") as file:
+                old_ids = file.read()
+
+            # A crash after renaming the ids of a later save but not its meta file
+            self.index.delete([1])
+            self.index.save(directory)
+            with open(ids_path, "wb") as file:
+                file.write(old_ids)
+
+            with self.assertRaises(ValueError):
+                NumpyVectorIndex.load(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,428 @@
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, String, column, false, literal, select, values
+from sqlalchemy.sql import Select
+
+from app.config import config
+from app.retriver.vector_storage import (
+    build_multi_query_semantic_search_cte,
+    build_partitioned_semantic_search_cte,
+    build_semantic_search_cte,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows whose embeddings are fetched per query when syncing a NumPy engine
+SYNC_BATCH_SIZE = 1000
+
+
+@dataclass
+class VectorSearchFilters:
+    """Ownership and document type filters of a semantic search, as plain values."""
+
+    user_id: str
+    search_space_id: Optional[int] = None
+    document_types: Optional[List[str]] = None
+
+
+class VectorBackend(ABC):
+    """
+    Interface of the engines running the semantic half of the hybrid searches.
+
+    Each method returns a CTE of ranked row ids that the retrievers fuse with the
+    keyword search in SQL. Engines either rank in the database, using the
+    apply_filters callback to add the SQL filters, or rank elsewhere using the
+    plain filters.
+    """
+
+    @abstractmethod
+    async def semantic_search_cte(
+        self,
+        session,
+        model,
+        query_embedding: Any,
+        n_results: int,
+        apply_filters: Callable[[Select], Select],
+        filters: VectorSearchFilters,
+        name: str = "semantic_search",
+    ):
+        """
+        Build the CTE ranking rows by cosine distance to the query embedding.
+
+        Args:
+            session: The session of the search
+            model: The searched model, Chunk or Document
+            query_embedding: The query embedding
+            n_results: Number of rows to return
+            apply_filters: Adds the joins and ownership/type filters to a select
+            filters: The same filters as plain values
+            name: Name of the CTE
+
+        Returns:
+            CTE with "id" and "rank" columns
+        """
+
+    @abstractmethod
+    async def partitioned_semantic_search_cte(
+        self,
+        session,
+        model,
+        document_types: Sequence[str],
+        query_embedding: Any,
+        n_results: int,
+        apply_filters: Callable[[Select], Select],
+        filters: VectorSearchFilters,
+        name: str = "semantic_search",
+    ):
+        """
+        Build the CTE ranking rows by cosine distance separately for each document type.
+
+        Returns:
+            CTE with "key" (the document type), "id" and "rank" columns, rank
+            restarting at 1 for every document type
+        """
+
+    @abstractmethod
+    async def multi_query_semantic_search_cte(
+        self,
+        session,
+        model,
+        queries,
+        query_embeddings: Sequence[Any],
+        n_results: int,
+        apply_filters: Callable[[Select], Select],
+        filters: VectorSearchFilters,
+        name: str = "semantic_search",
+    ):
+        """
+        Build the CTE ranking rows by cosine distance to each of several query embeddings.
+
+        Args:
+            queries: FROM clause with "query_index" and vector typed "embedding" columns
+            query_embeddings: The query embeddings, in query_index order
+
+        Returns:
+            CTE with "key" (the query index), "id" and "rank" columns, rank restarting
+            at 1 for every query
+        """
+
+    async def close(self) -> None:
+        """Release the resources of the backend, e.g. on app shutdown."""
+
+
+class PgVectorBackend(VectorBackend):
+    """Semantic search with the pgvector indexes, see app/retriver/vector_storage.py."""
+
+    async def semantic_search_cte(
+        self,
+        session,
+        model,
+        query_embedding,
+        n_results,
+        apply_filters,
+        filters,
+        name="semantic_search",
+    ):
+        return build_semantic_search_cte(
+            model.id, model.embedding, query_embedding, n_results, apply_filters, name
+        )
+
+    async def partitioned_semantic_search_cte(
+        self,
+        session,
+        model,
+        document_types,
+        query_embedding,
+        n_results,
+        apply_filters,
+        filters,
+        name="semantic_search",
+    ):
+        return build_partitioned_semantic_search_cte(
+            model.id,
+            model.embedding,
+            model.document_type,
+            document_types,
+            query_embedding,
+            n_results,
+            apply_filters,
+            name,
+        )
+
+    async def multi_query_semantic_search_cte(
+        self,
+        session,
+        model,
+        queries,
+        query_embeddings,
+        n_results,
+        apply_filters,
+        filters,
+        name="semantic_search",
+    ):
+        return build_multi_query_semantic_search_cte(
+            model.id, model.embedding, queries, n_results, apply_filters, name
+        )
+
+
+def _ranked_rows_cte(rows: List[Tuple], key_type, name: str):
+    """
+    Build a CTE from ranked (key, id, rank) rows, or (id, rank) rows without key_type.
+
+    An empty VALUES list is not valid SQL, so no rows give an empty select.
+    """
+    columns = [column("id", Integer), column("rank", Integer)]
+    if key_type is not None:
+        columns.insert(0, column("key", key_type))
+
+    if not rows:
+        return (
+            select(*(literal(None, type_=c.type).label(c.name) for c in columns))
+            .where(false())
+            .cte(name)
+        )
+    return select(values(*columns, name=f"{name}_values").data(rows)).cte(name)
+
+
+class NumpyVectorBackend(VectorBackend):
+    """
+    Semantic search with exact in-process NumpyVectorIndex engines, one per table.
+
+    The engines are kept in sync with the database per search space: before a
+    search, every searched search space whose corpus generation changed since it
+    was synced is diffed against the database, deleting the rows that are gone or
+    changed and appending the embeddings of only the new or changed rows. With a
+    store path the changed engines are saved at most every save_interval seconds
+    and on close, and loaded memory-mapped on startup. Searches are exact scans of
+    all rows of the searched search spaces, so this is meant for small
+    deployments, benchmarks and tests rather than as a replacement for the ANN
+    indexes of pgvector.
+    """
+
+    def __init__(self, store_path: Optional[str] = None, save_interval: float = 300):
+        """
+        Initialize the backend
+
+        Args:
+            store_path: Directory to persist the engines in. None keeps them in memory only.
+            save_interval: Minimum number of seconds between two saves of a changed engine
+        """
+        self.store_path = store_path
+        self.save_interval = save_interval
+        self.indexes: Dict[str, Any] = {}
+        self._sync_lock = asyncio.Lock()
+        self._save_lock = asyncio.Lock()
+        self._dirty: set = set()
+        self._last_saved: Dict[str, float] = {}
+
+    def _get_index(self, table_name: str):
+        from app.retriver.numpy_vector_index import NumpyVectorIndex
+
+        index = self.indexes.get(table_name)
+        if index is None:
+            directory = os.path.join(self.store_path, table_name) if self.store_path else None
+            if directory and os.path.exists(directory):
+                try:
+                    index = NumpyVectorIndex.load(directory)
+                except (OSError, ValueError) as e:
+                    # The search spaces are synced again from the database
+                    logger.warning(f"Discarding the unreadable {table_name} vector store: {e}")
+                if index is not None and index.dimension != config.embedding_dimension:
+                    logger.warning(f"Discarding the {table_name} vector store of another embedding dimension")
+                    index = None
+            if index is None:
+                index = NumpyVectorIndex(config.embedding_dimension)
+            self.indexes[table_name] = index
+            self._last_saved[table_name] = time.monotonic()
+        return index
+
+    @staticmethod
+    def _row_version(content_hash: Optional[str]) -> int:
+        """Version of a row, from its content hash so rows changed in place are detected."""
+        # Chunks have no content hash: they are replaced rather than updated
+        return int(content_hash[:15], 16) if content_hash else 0
+
+    async def _sync_search_space(self, session, model, index, search_space_id: int) -> None:
+        """Apply the changes of a search space since it was last synced to the engine."""
+        content_hash = getattr(model, "content_hash", None)
+        columns = [model.id, model.document_type]
+        if content_hash is not None:
+            columns.append(content_hash)
+        result = await session.execute(
+            select(*columns).where(
+                model.search_space_id == search_space_id,
+                model.embedding.isnot(None),
+            )
+        )
+        rows = {
+            row[0]: (row[1].value, self._row_version(row[2] if content_hash is not None else None))
+            for row in result
+        }
+
+        indexed = index.group_rows(search_space_id)
+        removed = [row_id for row_id, row in indexed.items() if rows.get(row_id) != row]
+        added = [row_id for row_id, row in rows.items() if indexed.get(row_id) != row]
+        # Added rows may also be indexed in another search space they were moved from
+        if removed or added:
+            await asyncio.to_thread(index.delete, removed + added)
+
+        for start in range(0, len(added), SYNC_BATCH_SIZE):
+            batch = added[start : start + SYNC_BATCH_SIZE]
+            result = await session.execute(
+                select(model.id, model.embedding).where(
+                    model.id.in_(batch), model.search_space_id == search_space_id
+                )
+            )
+            embeddings = dict(result.all())
+            row_ids = [row_id for row_id in batch if embeddings.get(row_id) is not None]
+            await asyncio.to_thread(
+                index.append,
+                row_ids,
+                [embeddings[row_id] for row_id in row_ids],
+                [search_space_id] * len(row_ids),
+                [rows[row_id][0] for row_id in row_ids],
+                [rows[row_id][1] for row_id in row_ids],
+            )
+
+    async def _sync(self, session, model, filters: VectorSearchFilters) -> Tuple[Any, List[int]]:
+        """
+        Sync the stale search spaces of a search into the engine of its table
+
+        Returns:
+            The engine and the IDs of the search spaces the user may search
+        """
+        from app.db import SearchSpace, corpus_generation
+
+        conditions = [SearchSpace.user_id == filters.user_id]
+        if filters.search_space_id is not None:
+            conditions.append(SearchSpace.id == filters.search_space_id)
+        result = await session.execute(
+            select(SearchSpace.id, corpus_generation(SearchSpace.id)).where(*conditions)
+        )
+        generations = dict(result.all())
+
+        table_name = model.__tablename__
+        async with self._sync_lock:
+            index = self._get_index(table_name)
+            for search_space_id, generation in generations.items():
+                if index.group_versions.get(search_space_id) == generation:
+                    continue
+                await self._sync_search_space(session, model, index, search_space_id)
+                index.group_versions[search_space_id] = generation
+                self._dirty.add(table_name)
+
+        if (
+            self.store_path
+            and table_name in self._dirty
+            and time.monotonic() - self._last_saved[table_name] >= self.save_interval
+        ):
+            await self._save(table_name)
+
+        return index, list(generations)
+
+    async def _save(self, table_name: str) -> None:
+        """Save an engine to the store path if it changed since it was last saved."""
+        async with self._save_lock:
+            if table_name not in self._dirty:
+                return
+            self._dirty.discard(table_name)
+            self._last_saved[table_name] = time.monotonic()
+            try:
+                await asyncio.to_thread(
+                    self.indexes[table_name].save, os.path.join(self.store_path, table_name)
+                )
+            except Exception as e:
+                self._dirty.add(table_name)
+                logger.warning(f"Saving the {table_name} vector store failed: {e}")
+
+    async def close(self) -> None:
+        """Save the engines changed since they were last saved."""
+        if self.store_path:
+            for table_name in list(self._dirty):
+                await self._save(table_name)
+
+    @staticmethod
+    def _labels(document_types) -> Optional[List[str]]:
+        if document_types is None:
+            return None
+        return [getattr(document_type, "value", document_type) for document_type in document_types]
+
+    async def semantic_search_cte(
+        self,
+        session,
+        model,
+        query_embedding,
+        n_results,
+        apply_filters,
+        filters,
+        name="semantic_search",
+    ):
+        index, search_space_ids = await self._sync(session, model, filters)
+        (matches,) = await asyncio.to_thread(
+            index.search_many, [query_embedding], n_results, search_space_ids, self._labels(filters.document_types)
+        )
+        rows = [(row_id, rank) for rank, (row_id, _) in enumerate(matches, start=1)]
+        return _ranked_rows_cte(rows, None, name)
+
+    async def partitioned_semantic_search_cte(
+        self,
+        session,
+        model,
+        document_types,
+        query_embedding,
+        n_results,
+        apply_filters,
+        filters,
+        name="semantic_search",
+    ):
+        index, search_space_ids = await self._sync(session, model, filters)
+        rows = []
+        for document_type in self._labels(document_types):
+            matches = await asyncio.to_thread(
+                index.search, query_embedding, n_results, search_space_ids, [document_type]
+            )
+            rows.extend(
+                (document_type, row_id, rank) for rank, (row_id, _) in enumerate(matches, start=1)
+            )
+        return _ranked_rows_cte(rows, String, name)
+
+    async def multi_query_semantic_search_cte(
+        self,
+        session,
+        model,
+        queries,
+        query_embeddings,
+        n_results,
+        apply_filters,
+        filters,
+        name="semantic_search",
+    ):
+        index, search_space_ids = await self._sync(session, model, filters)
+        matches_by_query = await asyncio.to_thread(
+            index.search_many, query_embeddings, n_results, search_space_ids, self._labels(filters.document_types)
+        )
+        rows = [
+            (query_index, row_id, rank)
+            for query_index, matches in enumerate(matches_by_query)
+            for rank, (row_id, _) in enumerate(matches, start=1)
+        ]
+        return _ranked_rows_cte(rows, Integer, name)
+
+
+def create_vector_backend() -> VectorBackend:
+    """Create the vector backend configured by VECTOR_BACKEND."""
+    if config.VECTOR_BACKEND == "numpy":
+        return NumpyVectorBackend(
+            config.NUMPY_VECTOR_STORE_PATH or None, config.NUMPY_VECTOR_STORE_SAVE_INTERVAL
+        )
+    return PgVectorBackend()
+
+
+# Vector backend shared by the chunk and document retrievers
+vector_backend = create_vector_backend()
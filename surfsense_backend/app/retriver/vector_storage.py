@@ -0,0 +1,310 @@
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import String, cast, column, func, literal, select, true, values
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.config import config
+
+# Vector storage modes for the ANN indexes, see setup_indexes in app/db.py
+#   full:    float32 HNSW index on the embedding column (max 2000 dimensions)
+#   halfvec: float16 HNSW index on embedding::halfvec(n) (max 4000 dimensions)
+#   binary:  binary quantized HNSW index on binary_quantize(embedding)::bit(n)
+VECTOR_STORAGE_MODES = ("full", "halfvec", "binary")
+
+# Query-time parameters of the vector indexes, from the fastest to the highest recall.
+# "fast" matches the pgvector defaults.
+VECTOR_SEARCH_PRESETS = {
+    "fast": {"ef_search": 40, "probes": 1},
+    "balanced": {"ef_search": 100, "probes": 10},
+    "high_recall": {"ef_search": 400, "probes": 40},
+}
+
+
+def uses_compact_index() -> bool:
+    """Whether queries search a compact index and rescore against the full vectors."""
+    return config.VECTOR_INDEX_STORAGE in ("halfvec", "binary")
+
+
+def compact_index_expression(embedding_column, dimension: int):
+    """
+    Get the indexed expression of the compact index for an embedding column.
+
+    The expression must render exactly like the one in setup_indexes so that
+    PostgreSQL can use the index.
+    """
+    if config.VECTOR_INDEX_STORAGE == "halfvec":
+        return cast(embedding_column, HALFVEC(dimension))
+    if config.VECTOR_INDEX_STORAGE == "binary":
+        return cast(func.binary_quantize(embedding_column), BIT(dimension))
+    return embedding_column
+
+
+def compact_distance(embedding_column, query_embedding: Any, dimension: int):
+    """
+    Get the distance between the compact index expression and the query embedding.
+
+    The query embedding is either a vector or a SQL expression, e.g. a column of
+    query vectors.
+    """
+    if isinstance(query_embedding, ColumnElement):
+        query_vector = query_embedding
+    else:
+        query_vector = literal(query_embedding, type_=Vector(dimension))
+    if config.VECTOR_INDEX_STORAGE == "halfvec":
+        return compact_index_expression(embedding_column, dimension).op("<=>")(
+            cast(query_vector, HALFVEC(dimension))
+        )
+    if config.VECTOR_INDEX_STORAGE == "binary":
+        return compact_index_expression(embedding_column, dimension).op("<~>")(
+            cast(func.binary_quantize(query_vector), BIT(dimension))
+        )
+    return embedding_column.op("<=>")(query_embedding)
+
+
+def vector_index_options() -> Dict[str, int]:
+    """Get the build parameters of the vector indexes for the configured index type."""
+    if config.VECTOR_INDEX_TYPE == "ivfflat":
+        return {"lists": config.IVFFLAT_LISTS}
+    return {"m": config.HNSW_M, "ef_construction": config.HNSW_EF_CONSTRUCTION}
+
+
+def get_vector_search_preset(preset: Optional[str] = None) -> Dict[str, int]:
+    """Get the query-time parameters of a search preset, defaulting to VECTOR_SEARCH_PRESET."""
+    return VECTOR_SEARCH_PRESETS[preset or config.VECTOR_SEARCH_PRESET]
+
+
+async def apply_vector_search_settings(session, preset: Optional[str] = None) -> None:
+    """
+    Configure the pgvector index scans of the current transaction.
+
+    The preset sets the HNSW candidate list size (hnsw.ef_search) or the number
+    of IVFFlat lists probed (ivfflat.probes), trading recall for latency. With
+    iterative scans, a filtered search keeps scanning the index until enough
+    rows pass the filters, so small search spaces in a large table still get a
+    full top-k. Iterative scans need pgvector 0.8+, so their settings are only
+    sent when VECTOR_ITERATIVE_SCAN is not "off". The settings are transaction
+    local, like SET LOCAL, and do not leak into other sessions of the
+    connection pool.
+
+    Args:
+        session: The session the search runs in
+        preset: Name of a VECTOR_SEARCH_PRESETS entry, defaults to VECTOR_SEARCH_PRESET
+    """
+    parameters = get_vector_search_preset(preset)
+    iterative = config.VECTOR_ITERATIVE_SCAN != "off"
+    if config.VECTOR_INDEX_TYPE == "ivfflat":
+        settings = {"ivfflat.probes": parameters["probes"]}
+        if iterative:
+            # IVFFlat only supports relaxed ordering for iterative scans
+            settings["ivfflat.iterative_scan"] = "relaxed_order"
+    else:
+        settings = {"hnsw.ef_search": parameters["ef_search"]}
+        if iterative:
+            settings["hnsw.iterative_scan"] = config.VECTOR_ITERATIVE_SCAN
+            settings["hnsw.max_scan_tuples"] = config.VECTOR_MAX_SCAN_TUPLES
+
+    await session.execute(
+        select(*(func.set_config(name, str(value), True) for name, value in settings.items()))
+    )
+
+
+def build_semantic_search_cte(
+    id_column,
+    embedding_column,
+    query_embedding: Any,
+    n_results: int,
+    apply_filters: Callable[[Select], Select],
+    name: str = "semantic_search",
+):
+    """
+    Build the CTE ranking rows by cosine distance to the query embedding.
+
+    With a compact storage mode the compact index is searched for a widened
+    candidate set, which is then rescored exactly against the full vectors.
+
+    Args:
+        id_column: Primary key column of the searched table
+        embedding_column: Full precision embedding column of the searched table
+        query_embedding: The query embedding
+        n_results: Number of rows to return
+        apply_filters: Adds the joins and ownership/type filters to a select
+        name: Name of the CTE
+
+    Returns:
+        CTE with "id" and "rank" columns
+    """
+    if not uses_compact_index():
+        distance = embedding_column.op("<=>")(query_embedding)
+        return (
+            apply_filters(
+                select(
+                    id_column.label("id"),
+                    func.rank().over(order_by=distance).label("rank"),
+                )
+            )
+            .order_by(distance)
+            .limit(n_results)
+            .cte(name)
+        )
+
+    dimension = config.embedding_dimension
+    candidates = (
+        apply_filters(
+            select(id_column.label("id"), embedding_column.label("embedding"))
+        )
+        .order_by(compact_distance(embedding_column, query_embedding, dimension))
+        .limit(n_results * config.VECTOR_RESCORE_FACTOR)
+        .subquery(f"{name}_candidates")
+    )
+
+    # Rescore the candidates exactly against the full vectors
+    exact_distance = candidates.c.embedding.op("<=>")(query_embedding)
+    return (
+        select(
+            candidates.c.id,
+            func.rank().over(order_by=exact_distance).label("rank"),
+        )
+        .order_by(exact_distance)
+        .limit(n_results)
+        .cte(name)
+    )
+
+
+def _build_lateral_semantic_search_cte(
+    id_column,
+    embedding_column,
+    outer,
+    outer_key,
+    query_embedding: Any,
+    n_results: int,
+    apply_filters: Callable[[Select], Select],
+    name: str,
+):
+    """
+    Rank rows by cosine distance separately for each row of an outer FROM clause.
+
+    Each outer row gets its own index-ordered LATERAL subquery, so the ANN index
+    is still used. With a compact storage mode each subquery fetches a widened
+    candidate set that is ranked by the exact distance.
+
+    Returns:
+        CTE with "key", "id" and "rank" columns, rank restarting at 1 for every key
+    """
+    exact_distance = embedding_column.op("<=>")(query_embedding)
+    if uses_compact_index():
+        index_distance = compact_distance(
+            embedding_column, query_embedding, config.embedding_dimension
+        )
+        n_candidates = n_results * config.VECTOR_RESCORE_FACTOR
+    else:
+        index_distance = exact_distance
+        n_candidates = n_results
+
+    candidates = (
+        apply_filters(
+            select(id_column.label("id"), exact_distance.label("distance"))
+        )
+        .order_by(index_distance)
+        .limit(n_candidates)
+        .lateral(f"{name}_candidates")
+    )
+
+    ranked = (
+        select(
+            outer_key.label("key"),
+            candidates.c.id,
+            func.rank()
+            .over(partition_by=outer_key, order_by=candidates.c.distance)
+            .label("rank"),
+        )
+        .select_from(outer.join(candidates, true()))
+        .subquery(f"{name}_ranked")
+    )
+    return select(ranked).where(ranked.c.rank <= n_results).cte(name)
+
+
+def build_partitioned_semantic_search_cte(
+    id_column,
+    embedding_column,
+    partition_column,
+    partition_values: Sequence[Any],
+    query_embedding: Any,
+    n_results: int,
+    apply_filters: Callable[[Select], Select],
+    name: str = "semantic_search",
+):
+    """
+    Build the CTE ranking rows by cosine distance separately for each partition value.
+
+    Each partition value, e.g. each document type, gets its own index-ordered
+    LATERAL subquery, so the ANN index is still used and every value gets its own
+    n_results rows in one statement. With a compact storage mode each subquery
+    fetches a widened candidate set that is ranked by the exact distance.
+
+    Args:
+        id_column: Primary key column of the searched table
+        embedding_column: Full precision embedding column of the searched table
+        partition_column: Column to partition by, e.g. Document.document_type
+        partition_values: Values of partition_column to search, as strings
+        query_embedding: The query embedding
+        n_results: Number of rows to return per partition value
+        apply_filters: Adds the joins and ownership filters to a select
+        name: Name of the CTE
+
+    Returns:
+        CTE with "key" (the partition value), "id" and "rank" columns, rank
+        restarting at 1 for every partition value
+    """
+    # VALUES list of the partition values, compared as text so that enum columns work
+    partitions = values(
+        column("partition_value", String), name=f"{name}_partitions"
+    ).data([(value,) for value in partition_values])
+
+    return _build_lateral_semantic_search_cte(
+        id_column,
+        embedding_column,
+        partitions,
+        partitions.c.partition_value,
+        query_embedding,
+        n_results,
+        lambda query: apply_filters(query).where(
+            cast(partition_column, String) == partitions.c.partition_value
+        ),
+        name,
+    )
+
+
+def build_multi_query_semantic_search_cte(
+    id_column,
+    embedding_column,
+    queries,
+    n_results: int,
+    apply_filters: Callable[[Select], Select],
+    name: str = "semantic_search",
+):
+    """
+    Build the CTE ranking rows by cosine distance to each of several query embeddings.
+
+    Args:
+        id_column: Primary key column of the searched table
+        embedding_column: Full precision embedding column of the searched table
+        queries: FROM clause with "query_index" and vector typed "embedding" columns
+        n_results: Number of rows to return per query
+        apply_filters: Adds the joins and ownership/type filters to a select
+        name: Name of the CTE
+
+    Returns:
+        CTE with "key" (the query index), "id" and "rank" columns, rank restarting
+        at 1 for every query
+    """
+    return _build_lateral_semantic_search_cte(
+        id_column,
+        embedding_column,
+        queries,
+        queries.c.query_index,
+        queries.c.embedding,
+        n_results,
+        apply_filters,
+        name,
+    )
@@ -5,6 +5,7 @@ from .podcasts_routes import router as podcasts_router
 from .chats_routes import router as chats_router
 from .search_source_connectors_routes import router as search_source_connectors_router
 from .llm_config_routes import router as llm_config_router
+from .search_routes import router as search_router
 
 router = APIRouter()
 
@@ -14,3 +15,4 @@ router.include_router(podcasts_router)
 router.include_router(chats_router)
 router.include_router(search_source_connectors_router)
 router.include_router(llm_config_router)
+router.include_router(search_router)
@@ -9,6 +9,8 @@ from app.users import current_active_user
 from app.utils.check_ownership import check_ownership
 from app.tasks.background_tasks import add_received_markdown_file_document, add_extension_received_document, add_received_file_document_using_unstructured, add_crawled_url_document, add_youtube_video_document, add_received_file_document_using_llamacloud
 from app.config import config as app_config
+from app.utils.document_chunks import sync_document_chunks
+from app.utils.document_converters import generate_content_hash
 # Force asyncio to use standard event loop before unstructured imports
 import asyncio
 try:
@@ -376,8 +378,18 @@ async def update_document(
             )
 
         update_data = document_update.model_dump(exclude_unset=True)
+        new_content = update_data.get("content")
+        content_changed = isinstance(new_content, str) and new_content != db_document.content
         for key, value in update_data.items():
             setattr(db_document, key, value)
+
+        # Re-chunk changed content, re-embedding only new or changed chunks
+        if content_changed:
+            db_document.content_hash = generate_content_hash(
+                new_content, db_document.search_space_id
+            )
+            await sync_document_chunks(session, db_document, new_content)
+
         await session.commit()
         await session.refresh(db_document)
 
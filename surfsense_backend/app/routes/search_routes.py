@@ -0,0 +1,111 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from app.config import config
+from app.db import SearchSpace, User, get_async_session
+from app.retriver.chunks_hybrid_search import ChucksHybridSearchRetriever
+from app.retriver.documents_hybrid_search import DocumentHybridSearchRetriever
+from app.schemas import SearchRequest, SearchResponse
+from app.users import current_active_user
+from app.utils.check_ownership import check_ownership
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter()
+
+
+def _encode_cursor(score: float, result_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, result_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(result_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _search_page(session: AsyncSession, request: SearchRequest, user: User) -> Tuple[List[dict], Optional[str]]:
+    """
+    Get the page of hybrid search results of a request and the cursor of the next page.
+
+    Results are ordered by (score DESC, id DESC). The page after the cursor is
+    selected in SQL, fetching one extra result to tell whether a next page exists.
+    """
+    if request.search_mode == "DOCUMENTS":
+        retriever = DocumentHybridSearchRetriever(session, request.search_preset)
+        id_key = "document_id"
+    else:
+        retriever = ChucksHybridSearchRetriever(session, request.search_preset)
+        id_key = "chunk_id"
+
+    results = await retriever.hybrid_search_page(
+        request.query,
+        request.page_size + 1,
+        user.id,
+        request.search_space_id,
+        [document_type.value for document_type in request.document_types] if request.document_types else None,
+        after=_decode_cursor(request.cursor) if request.cursor else None,
+        max_results=config.SEARCH_API_MAX_RESULTS,
+    )
+
+    page = results[: request.page_size]
+    next_cursor = None
+    if len(results) > request.page_size:
+        next_cursor = _encode_cursor(page[-1]["score"], page[-1][id_key])
+    return page, next_cursor
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search(
+    request: SearchRequest,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user)
+):
+    """
+    Search the chunks or documents of a search space without the research agent.
+
+    Results are ranked by hybrid search and paginated with an opaque keyset
+    cursor: pass the next_cursor of a page to get the following page. Only the
+    first max_results (SEARCH_API_MAX_RESULTS) ranked results can be paged
+    through; the cap is returned with every page. With stream set, the page is
+    returned as newline-delimited JSON, one {"type": "result", "result": ...}
+    line per result followed by a
+    {"type": "cursor", "next_cursor": ..., "max_results": ...} line. This only
+    changes the wire format: the whole page is still searched before its first
+    line is sent, so it saves neither latency nor memory.
+    """
+    # Check if the search space belongs to the current user
+    try:
+        await check_ownership(session, SearchSpace, request.search_space_id, user)
+    except HTTPException:
+        raise HTTPException(
+            status_code=403, detail="You don't have access to this search space")
+
+    try:
+        page, next_cursor = await _search_page(session, request, user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search: {str(e)}"
+        )
+
+    if not request.stream:
+        return SearchResponse(
+            results=page, next_cursor=next_cursor, max_results=config.SEARCH_API_MAX_RESULTS
+        )
+
+    # The page is already fetched, only its serialization is streamed
+    def stream_page():
+        for result in page:
+            yield json.dumps({"type": "result", "result": result}, default=str) + "\n"
+        yield json.dumps(
+            {"type": "cursor", "next_cursor": next_cursor, "max_results": config.SEARCH_API_MAX_RESULTS}
+        ) + "\n"
+
+    return StreamingResponse(stream_page(), media_type="application/x-ndjson")
@@ -0,0 +1,23 @@
+import unittest
+
+from fastapi import HTTPException
+
+from surfsense_backend.app.routes.search_routes import _decode_cursor, _encode_cursor
+
+
+class TestSearchCursor(unittest.TestCase):
+
+    def test_cursor_round_trips_exact_score(self):
+        score = 1.0 / 61 + 1.0 / 63
+
+        self.assertEqual(_decode_cursor(_encode_cursor(score, 42)), (score, 42))
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        for cursor in ("not base64!", _encode_cursor(0.5, 1)[:-4], "W10=", "WyJhIiwgMV0="):
+            with self.assertRaises(HTTPException) as context:
+                _decode_cursor(cursor)
+            self.assertEqual(context.exception.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,7 @@ from .podcasts import PodcastBase, PodcastCreate, PodcastUpdate, PodcastRead, Po
 from .chats import ChatBase, ChatCreate, ChatUpdate, ChatRead, AISDKChatRequest
 from .search_source_connector import SearchSourceConnectorBase, SearchSourceConnectorCreate, SearchSourceConnectorUpdate, SearchSourceConnectorRead
 from .llm_config import LLMConfigBase, LLMConfigCreate, LLMConfigUpdate, LLMConfigRead
+from .search import SearchRequest, SearchResponse
 
 __all__ = [
     "AISDKChatRequest",
@@ -53,4 +54,6 @@ __all__ = [
     "LLMConfigCreate",
     "LLMConfigUpdate",
     "LLMConfigRead",
+    "SearchRequest",
+    "SearchResponse",
 ] 
\ No newline at end of file
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+from app.db import DocumentType
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    search_space_id: int
+    search_mode: Literal["CHUNKS", "DOCUMENTS"] = "CHUNKS"
+    document_types: Optional[List[DocumentType]] = None
+    page_size: int = Field(10, ge=1, le=100)
+    # Opaque cursor of the last result of the previous page
+    cursor: Optional[str] = None
+    search_preset: Optional[Literal["fast", "balanced", "high_recall"]] = None
+    # Stream the page as newline-delimited JSON instead of a single JSON body
+    stream: bool = False
+
+class SearchResponse(BaseModel):
+    results: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    # Number of ranked results that can be paged through, see SEARCH_API_MAX_RESULTS
+    max_results: int
@@ -2,12 +2,14 @@ from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from app.db import Document, DocumentType, Chunk
+from app.db import Document, DocumentType
 from app.schemas import ExtensionDocumentContent
 from app.config import config
 from app.prompts import SUMMARY_PROMPT_TEMPLATE
 from app.utils.document_converters import convert_document_to_markdown, generate_content_hash
+from app.utils.document_chunks import store_document_with_chunks
 from app.utils.llm_service import get_user_long_context_llm
+from app.utils.near_duplicate_service import compute_simhash, find_near_duplicate_document
 from langchain_core.documents import Document as LangChainDocument
 from langchain_community.document_loaders import FireCrawlLoader, AsyncChromiumLoader
 from langchain_community.document_transformers import MarkdownifyTransformer
@@ -84,6 +86,15 @@ async def add_crawled_url_document(
             logging.info(f"Document with content hash {content_hash} already exists. Skipping processing.")
             return existing_document
 
+        # Skip near-duplicates of recent documents before any LLM or embedding work
+        simhash = compute_simhash(content_in_markdown)
+        near_duplicate = await find_near_duplicate_document(
+            session, search_space_id, DocumentType.CRAWLED_URL, simhash
+        )
+        if near_duplicate:
+            logging.info(f"Document is a near-duplicate of document {near_duplicate.id}. Skipping processing.")
+            return near_duplicate
+
         # Get user's long context LLM
         user_llm = await get_user_long_context_llm(session, user_id)
         if not user_llm:
@@ -95,16 +106,6 @@ async def add_crawled_url_document(
             {"document": combined_document_string}
         )
         summary_content = summary_result.content
-        summary_embedding = config.embedding_model_instance.embed(summary_content)
-
-        # Process chunks
-        chunks = [
-            Chunk(
-                content=chunk.text,
-                embedding=config.embedding_model_instance.embed(chunk.text),
-            )
-            for chunk in config.chunker_instance.chunk(content_in_markdown)
-        ]
 
         # Create and store document
         document = Document(
@@ -115,12 +116,12 @@ async def add_crawled_url_document(
             document_type=DocumentType.CRAWLED_URL,
             document_metadata=url_crawled[0].metadata,
             content=summary_content,
-            embedding=summary_embedding,
-            chunks=chunks,
             content_hash=content_hash,
+            simhash=simhash,
         )
 
-        session.add(document)
+        # Embed the summary, chunk and embed the content and store the document
+        await store_document_with_chunks(session, document, content_in_markdown)
         await session.commit()
         await session.refresh(document)
 
@@ -191,6 +192,15 @@ async def add_extension_received_document(
             logging.info(f"Document with content hash {content_hash} already exists. Skipping processing.")
             return existing_document
 
+        # Skip near-duplicates of recent documents before any LLM or embedding work
+        simhash = compute_simhash(content.pageContent)
+        near_duplicate = await find_near_duplicate_document(
+            session, search_space_id, DocumentType.EXTENSION, simhash
+        )
+        if near_duplicate:
+            logging.info(f"Document is a near-duplicate of document {near_duplicate.id}. Skipping processing.")
+            return near_duplicate
+
         # Get user's long context LLM
         user_llm = await get_user_long_context_llm(session, user_id)
         if not user_llm:
@@ -202,16 +212,6 @@ async def add_extension_received_document(
             {"document": combined_document_string}
         )
         summary_content = summary_result.content
-        summary_embedding = config.embedding_model_instance.embed(summary_content)
-
-        # Process chunks
-        chunks = [
-            Chunk(
-                content=chunk.text,
-                embedding=config.embedding_model_instance.embed(chunk.text),
-            )
-            for chunk in config.chunker_instance.chunk(content.pageContent)
-        ]
 
         # Create and store document
         document = Document(
@@ -220,12 +220,12 @@ async def add_extension_received_document(
             document_type=DocumentType.EXTENSION,
             document_metadata=content.metadata.model_dump(),
             content=summary_content,
-            embedding=summary_embedding,
-            chunks=chunks,
             content_hash=content_hash,
+            simhash=simhash,
         )
 
-        session.add(document)
+        # Embed the summary, chunk and embed the content and store the document
+        await store_document_with_chunks(session, document, content.pageContent)
         await session.commit()
         await session.refresh(document)
 
@@ -255,6 +255,15 @@ async def add_received_markdown_file_document(
             logging.info(f"Document with content hash {content_hash} already exists. Skipping processing.")
             return existing_document
 
+        # Skip near-duplicates of recent documents before any LLM or embedding work
+        simhash = compute_simhash(file_in_markdown)
+        near_duplicate = await find_near_duplicate_document(
+            session, search_space_id, DocumentType.FILE, simhash
+        )
+        if near_duplicate:
+            logging.info(f"Document is a near-duplicate of document {near_duplicate.id}. Skipping processing.")
+            return near_duplicate
+
         # Get user's long context LLM
         user_llm = await get_user_long_context_llm(session, user_id)
         if not user_llm:
@@ -264,16 +273,6 @@ async def add_received_markdown_file_document(
         summary_chain = SUMMARY_PROMPT_TEMPLATE | user_llm
         summary_result = await summary_chain.ainvoke({"document": file_in_markdown})
         summary_content = summary_result.content
-        summary_embedding = config.embedding_model_instance.embed(summary_content)
-
-        # Process chunks
-        chunks = [
-            Chunk(
-                content=chunk.text,
-                embedding=config.embedding_model_instance.embed(chunk.text),
-            )
-            for chunk in config.chunker_instance.chunk(file_in_markdown)
-        ]
 
         # Create and store document
         document = Document(
@@ -284,12 +283,12 @@ async def add_received_markdown_file_document(
                 "FILE_NAME": file_name,
             },
             content=summary_content,
-            embedding=summary_embedding,
-            chunks=chunks,
             content_hash=content_hash,
+            simhash=simhash,
         )
 
-        session.add(document)
+        # Embed the summary, chunk and embed the content and store the document
+        await store_document_with_chunks(session, document, file_in_markdown)
         await session.commit()
         await session.refresh(document)
 
@@ -326,6 +325,15 @@ async def add_received_file_document_using_unstructured(
             logging.info(f"Document with content hash {content_hash} already exists. Skipping processing.")
             return existing_document
 
+        # Skip near-duplicates of recent documents before any LLM or embedding work
+        simhash = compute_simhash(file_in_markdown)
+        near_duplicate = await find_near_duplicate_document(
+            session, search_space_id, DocumentType.FILE, simhash
+        )
+        if near_duplicate:
+            logging.info(f"Document is a near-duplicate of document {near_duplicate.id}. Skipping processing.")
+            return near_duplicate
+
         # TODO: Check if file_markdown exceeds token limit of embedding model
 
         # Get user's long context LLM
@@ -337,16 +345,6 @@ async def add_received_file_document_using_unstructured(
         summary_chain = SUMMARY_PROMPT_TEMPLATE | user_llm
         summary_result = await summary_chain.ainvoke({"document": file_in_markdown})
         summary_content = summary_result.content
-        summary_embedding = config.embedding_model_instance.embed(summary_content)
-
-        # Process chunks
-        chunks = [
-            Chunk(
-                content=chunk.text,
-                embedding=config.embedding_model_instance.embed(chunk.text),
-            )
-            for chunk in config.chunker_instance.chunk(file_in_markdown)
-        ]
 
         # Create and store document
         document = Document(
@@ -358,12 +356,12 @@ async def add_received_file_document_using_unstructured(
                 "ETL_SERVICE": "UNSTRUCTURED",
             },
             content=summary_content,
-            embedding=summary_embedding,
-            chunks=chunks,
             content_hash=content_hash,
+            simhash=simhash,
         )
 
-        session.add(document)
+        # Embed the summary, chunk and embed the content and store the document
+        await store_document_with_chunks(session, document, file_in_markdown)
         await session.commit()
         await session.refresh(document)
 
@@ -411,6 +409,15 @@ async def add_received_file_document_using_llamacloud(
             logging.info(f"Document with content hash {content_hash} already exists. Skipping processing.")
             return existing_document
 
+        # Skip near-duplicates of recent documents before any LLM or embedding work
+        simhash = compute_simhash(file_in_markdown)
+        near_duplicate = await find_near_duplicate_document(
+            session, search_space_id, DocumentType.FILE, simhash
+        )
+        if near_duplicate:
+            logging.info(f"Document is a near-duplicate of document {near_duplicate.id}. Skipping processing.")
+            return near_duplicate
+
         # Get user's long context LLM
         user_llm = await get_user_long_context_llm(session, user_id)
         if not user_llm:
@@ -420,16 +427,6 @@ async def add_received_file_document_using_llamacloud(
         summary_chain = SUMMARY_PROMPT_TEMPLATE | user_llm
         summary_result = await summary_chain.ainvoke({"document": file_in_markdown})
         summary_content = summary_result.content
-        summary_embedding = config.embedding_model_instance.embed(summary_content)
-
-        # Process chunks
-        chunks = [
-            Chunk(
-                content=chunk.text,
-                embedding=config.embedding_model_instance.embed(chunk.text),
-            )
-            for chunk in config.chunker_instance.chunk(file_in_markdown)
-        ]
 
         # Create and store document
         document = Document(
@@ -441,12 +438,12 @@ async def add_received_file_document_using_llamacloud(
                 "ETL_SERVICE": "LLAMACLOUD",
             },
             content=summary_content,
-            embedding=summary_embedding,
-            chunks=chunks,
             content_hash=content_hash,
+            simhash=simhash,
         )
 
-        session.add(document)
+        # Embed the summary, chunk and embed the content and store the document
+        await store_document_with_chunks(session, document, file_in_markdown)
         await session.commit()
         await session.refresh(document)
 
@@ -579,16 +576,6 @@ async def add_youtube_video_document(
             {"document": combined_document_string}
         )
         summary_content = summary_result.content
-        summary_embedding = config.embedding_model_instance.embed(summary_content)
-
-        # Process chunks
-        chunks = [
-            Chunk(
-                content=chunk.text,
-                embedding=config.embedding_model_instance.embed(chunk.text),
-            )
-            for chunk in config.chunker_instance.chunk(combined_document_string)
-        ]
 
         # Create document
 
@@ -603,13 +590,12 @@ async def add_youtube_video_document(
                 "thumbnail": video_data.get("thumbnail_url", ""),
             },
             content=summary_content,
-            embedding=summary_embedding,
-            chunks=chunks,
             search_space_id=search_space_id,
             content_hash=content_hash,
         )
 
-        session.add(document)
+        # Embed the summary, chunk and embed the content and store the document
+        await store_document_with_chunks(session, document, combined_document_string)
         await session.commit()
         await session.refresh(document)
 
@@ -1,4 +1,4 @@
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
@@ -6,7 +6,6 @@ from datetime import datetime, timedelta, timezone
 from app.db import (
     Document,
     DocumentType,
-    Chunk,
     SearchSourceConnector,
     SearchSourceConnectorType,
     SearchSpace,
@@ -25,10 +24,19 @@ import logging
 import asyncio
 
 from app.utils.document_converters import generate_content_hash
+from app.utils.chunking_service import chunking_service
+from app.utils.document_chunks import (
+    find_document_by_metadata,
+    store_document_with_chunks,
+    upsert_document_with_chunks,
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Number of GitHub files collected before they are chunked in parallel and stored
+GITHUB_CHUNKING_BATCH_FILES = 64
+
 
 def safe_json_serialize(obj):
     """
@@ -304,18 +312,6 @@ async def index_slack_messages(
                     {"document": combined_document_string}
                 )
                 summary_content = summary_result.content
-                summary_embedding = config.embedding_model_instance.embed(
-                    summary_content
-                )
-
-                # Process chunks
-                chunks = [
-                    Chunk(
-                        content=chunk.text,
-                        embedding=config.embedding_model_instance.embed(chunk.text),
-                    )
-                    for chunk in config.chunker_instance.chunk(channel_content)
-                ]
 
                 # Create and store new document
                 document = Document(
@@ -331,12 +327,11 @@ async def index_slack_messages(
                         "indexed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     },
                     content=summary_content,
-                    embedding=summary_embedding,
-                    chunks=chunks,
                     content_hash=content_hash,
                 )
 
-                session.add(document)
+                # Embed the summary, chunk and embed the content and store the document
+                await store_document_with_chunks(session, document, channel_content)
                 documents_indexed += 1
                 logger.info(
                     f"Successfully indexed new channel {channel_name} with {len(formatted_messages)} messages"
@@ -616,19 +611,14 @@ async def index_notion_pages(
                     {"document": combined_document_string}
                 )
                 summary_content = summary_result.content
-                summary_embedding = config.embedding_model_instance.embed(
-                    summary_content
-                )
 
-                # Process chunks
-                logger.debug(f"Chunking content for page {page_title}")
-                chunks = [
-                    Chunk(
-                        content=chunk.text,
-                        embedding=config.embedding_model_instance.embed(chunk.text),
-                    )
-                    for chunk in config.chunker_instance.chunk(markdown_content)
-                ]
+                # Find the version of this page indexed earlier, if any
+                existing_document = await find_document_by_metadata(
+                    session,
+                    search_space_id,
+                    DocumentType.NOTION_CONNECTOR,
+                    {"page_id": page_id},
+                )
 
                 # Create and store new document
                 document = Document(
@@ -642,11 +632,12 @@ async def index_notion_pages(
                     },
                     content=summary_content,
                     content_hash=content_hash,
-                    embedding=summary_embedding,
-                    chunks=chunks,
                 )
 
-                session.add(document)
+                # Store the document, reusing the unchanged chunks of an earlier version
+                await upsert_document_with_chunks(
+                    session, document, markdown_content, existing_document
+                )
                 documents_indexed += 1
                 logger.info(f"Successfully indexed new Notion page: {page_title}")
 
@@ -695,6 +686,50 @@ async def index_notion_pages(
         return 0, f"Failed to index Notion pages: {str(e)}"
 
 
+async def _store_github_files(
+    session: AsyncSession,
+    pending_files: List[Tuple[str, Document, str, Optional[Document]]],
+    errors: List[str],
+) -> int:
+    """
+    Chunk a group of GitHub files in parallel with the code chunker and store them.
+
+    Files indexed before are updated in place, reusing their unchanged chunks.
+
+    Args:
+        session: Database session
+        pending_files: Tuples of (full_path_key, document, file_content, existing_document)
+        errors: List that chunking errors are appended to
+
+    Returns:
+        Number of files stored
+    """
+    chunk_results = await chunking_service.chunk_many(
+        [file_content for _, _, file_content, _ in pending_files], code=True
+    )
+
+    stored = 0
+    for (full_path_key, document, file_content, existing_document), chunk_texts in zip(
+        pending_files, chunk_results
+    ):
+        if isinstance(chunk_texts, BaseException):
+            logger.error(f"Failed to chunk file {full_path_key}: {chunk_texts}")
+            errors.append(f"Chunking failed for {full_path_key}: {chunk_texts}")
+            continue  # Skip this file if chunking fails
+
+        await upsert_document_with_chunks(
+            session,
+            document,
+            file_content,
+            existing_document,
+            code=True,
+            chunk_texts=chunk_texts,
+        )
+        stored += 1
+
+    return stored
+
+
 async def index_github_repos(
     session: AsyncSession,
     connector_id: int,
@@ -718,6 +753,8 @@ async def index_github_repos(
     """
     documents_processed = 0
     errors = []
+    # Content hashes of files collected in this run that are not flushed yet
+    pending_hashes = set()
 
     try:
         # 1. Get the GitHub connector from the database
@@ -784,6 +821,10 @@ async def index_github_repos(
                     f"Found {len(files_to_index)} files to process in {repo_full_name}"
                 )
 
+                # Files waiting to be chunked together:
+                # (full_path_key, document, file_content, existing_document)
+                pending_files = []
+
                 for file_info in files_to_index:
                     file_path = file_info.get("path")
                     file_url = file_info.get("url")
@@ -818,7 +859,7 @@ async def index_github_repos(
                         existing_doc_by_hash_result.scalars().first()
                     )
 
-                    if existing_document_by_hash:
+                    if existing_document_by_hash or content_hash in pending_hashes:
                         logger.info(
                             f"Document with content hash {content_hash} already exists for file {full_path_key}. Skipping processing."
                         )
@@ -827,31 +868,6 @@ async def index_github_repos(
                     # Use file_content directly for chunking, maybe summary for main content?
                     # For now, let's use the full content for both, might need refinement
                     summary_content = f"GitHub file: {full_path_key}\n\n{file_content[:1000]}..."  # Simple summary
-                    summary_embedding = config.embedding_model_instance.embed(
-                        summary_content
-                    )
-
-                    # Chunk the content
-                    try:
-                        chunks_data = [
-                            Chunk(
-                                content=chunk.text,
-                                embedding=config.embedding_model_instance.embed(
-                                    chunk.text
-                                ),
-                            )
-                            for chunk in config.code_chunker_instance.chunk(
-                                file_content
-                            )
-                        ]
-                    except Exception as chunk_err:
-                        logger.error(
-                            f"Failed to chunk file {full_path_key}: {chunk_err}"
-                        )
-                        errors.append(
-                            f"Chunking failed for {full_path_key}: {chunk_err}"
-                        )
-                        continue  # Skip this file if chunking fails
 
                     doc_metadata = {
                         "repository_full_name": repo_full_name,
@@ -863,6 +879,14 @@ async def index_github_repos(
                         "indexed_at": datetime.now(timezone.utc).isoformat(),
                     }
 
+                    # Find the version of this file indexed earlier, if any
+                    existing_document = await find_document_by_metadata(
+                        session,
+                        search_space_id,
+                        DocumentType.GITHUB_CONNECTOR,
+                        {"full_path": full_path_key},
+                    )
+
                     # Create new document
                     logger.info(f"Creating new document for file: {full_path_key}")
                     document = Document(
@@ -871,12 +895,25 @@ async def index_github_repos(
                         document_metadata=doc_metadata,
                         content=summary_content,  # Store summary
                         content_hash=content_hash,
-                        embedding=summary_embedding,
                         search_space_id=search_space_id,
-                        chunks=chunks_data,  # Associate chunks directly
                     )
-                    session.add(document)
-                    documents_processed += 1
+
+                    pending_files.append(
+                        (full_path_key, document, file_content, existing_document)
+                    )
+                    pending_hashes.add(content_hash)
+
+                    # Chunk the collected files in parallel once enough are pending
+                    if len(pending_files) >= GITHUB_CHUNKING_BATCH_FILES:
+                        documents_processed += await _store_github_files(
+                            session, pending_files, errors
+                        )
+                        pending_files = []
+
+                if pending_files:
+                    documents_processed += await _store_github_files(
+                        session, pending_files, errors
+                    )
 
             except Exception as repo_err:
                 logger.error(
@@ -1122,20 +1159,14 @@ async def index_linear_issues(
                     documents_skipped += 1
                     continue
 
-                # Generate embedding for the summary
-                summary_embedding = config.embedding_model_instance.embed(
-                    summary_content
+                # Find the version of this issue indexed earlier, if any
+                existing_document = await find_document_by_metadata(
+                    session,
+                    search_space_id,
+                    DocumentType.LINEAR_CONNECTOR,
+                    {"issue_id": issue_id},
                 )
 
-                # Process chunks - using the full issue content with comments
-                chunks = [
-                    Chunk(
-                        content=chunk.text,
-                        embedding=config.embedding_model_instance.embed(chunk.text),
-                    )
-                    for chunk in config.chunker_instance.chunk(issue_content)
-                ]
-
                 # Create and store new document
                 logger.info(
                     f"Creating new document for issue {issue_identifier} - {issue_title}"
@@ -1154,11 +1185,12 @@ async def index_linear_issues(
                     },
                     content=summary_content,
                     content_hash=content_hash,
-                    embedding=summary_embedding,
-                    chunks=chunks,
                 )
 
-                session.add(document)
+                # Store the document, reusing the unchanged chunks of an earlier version
+                await upsert_document_with_chunks(
+                    session, document, issue_content, existing_document
+                )
                 documents_indexed += 1
                 logger.info(
                     f"Successfully indexed new issue {issue_identifier} - {issue_title}"
@@ -1464,29 +1496,6 @@ async def index_discord_messages(
                         {"document": combined_document_string}
                     )
                     summary_content = summary_result.content
-                    summary_embedding = await asyncio.to_thread(
-                        config.embedding_model_instance.embed, summary_content
-                    )
-
-                    # Process chunks
-                    raw_chunks = await asyncio.to_thread(
-                        config.chunker_instance.chunk, channel_content
-                    )
-
-                    chunk_texts = [
-                        chunk.text for chunk in raw_chunks if chunk.text.strip()
-                    ]
-                    chunk_embeddings = await asyncio.to_thread(
-                        lambda texts: [
-                            config.embedding_model_instance.embed(t) for t in texts
-                        ],
-                        chunk_texts,
-                    )
-
-                    chunks = [
-                        Chunk(content=raw_chunk.text, embedding=embedding)
-                        for raw_chunk, embedding in zip(raw_chunks, chunk_embeddings)
-                    ]
 
                     # Create and store new document
                     document = Document(
@@ -1507,11 +1516,10 @@ async def index_discord_messages(
                         },
                         content=summary_content,
                         content_hash=content_hash,
-                        embedding=summary_embedding,
-                        chunks=chunks,
                     )
 
-                    session.add(document)
+                    # Embed the summary, chunk and embed the content and store the document
+                    await store_document_with_chunks(session, document, channel_content)
                     documents_indexed += 1
                     logger.info(
                         f"Successfully indexed Discord channel {guild_name}#{channel_name} with {len(formatted_messages)} messages"
@@ -1775,21 +1783,14 @@ async def index_obsidian_vault(
                 )
                 summary_content = summary_result.content
 
-                # Generate embedding for summary
-                summary_embedding = config.embedding_model_instance.embed(
-                    summary_content
+                # Find the version of this file indexed earlier, if any
+                existing_document = await find_document_by_metadata(
+                    session,
+                    search_space_id,
+                    DocumentType.OBSIDIAN_CONNECTOR,
+                    {"vault_name": vault_name, "file_path": relative_path},
                 )
 
-                # Process chunks
-                logger.debug(f"Chunking content for file {relative_path}")
-                chunks = [
-                    Chunk(
-                        content=chunk.text,
-                        embedding=config.embedding_model_instance.embed(chunk.text),
-                    )
-                    for chunk in config.chunker_instance.chunk(document_content)
-                ]
-
                 # Create and store new document
                 document = Document(
                     search_space_id=search_space_id,
@@ -1812,14 +1813,15 @@ async def index_obsidian_vault(
                     },
                     content=summary_content,
                     content_hash=content_hash,
-                    embedding=summary_embedding,
-                    chunks=chunks,
                 )
 
-                session.add(document)
+                # Store the document, reusing the unchanged chunks of an earlier version
+                await upsert_document_with_chunks(
+                    session, document, document_content, existing_document
+                )
                 documents_indexed += 1
                 logger.info(
-                    f"Successfully indexed Obsidian file {vault_name}/{relative_path} with {len(chunks)} chunks"
+                    f"Successfully indexed Obsidian file {vault_name}/{relative_path}"
                 )
 
                 # Commit every 10 documents to prevent long-running transactions
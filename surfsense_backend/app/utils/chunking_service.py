@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+
+from app.config import config
+from app.utils.chunking_worker import chunk_in_worker, chunk_with
+from app.utils.embedding_service import embedding_service
+from app.utils.model_executor import ModelExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def iter_content_segments(content: str, segment_size: int) -> Iterator[str]:
+    """
+    Split content into segments of at most segment_size characters.
+
+    Segments end at paragraph, line or word boundaries where possible, so
+    chunking each segment gives approximately the chunks of the whole content:
+    a chunk that would span a segment boundary is split in two. Not suitable
+    for code, whose functions and classes would be cut.
+    """
+    start = 0
+    length = len(content)
+    while start < length:
+        end = min(start + segment_size, length)
+        if end < length:
+            for separator in ("\n\n", "\n", " "):
+                boundary = content.rfind(separator, start + segment_size // 2, end)
+                if boundary != -1:
+                    end = boundary + len(separator)
+                    break
+        yield content[start:end]
+        start = end
+
+
+class ChunkingService:
+    """
+    Service for chunking document content with the configured chunkers.
+
+    Large contents are split at safe boundaries and the segments are chunked in
+    parallel in a process pool. Many small contents, such as the files of a
+    repository, are grouped into batches and chunked in parallel as well. Chunk
+    texts are always returned in input order.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[ModelExecutor] = None,
+        segment_size: int = 100_000,
+        parallel_threshold: int = 200_000,
+        batch_chars: int = 200_000,
+    ):
+        """
+        Initialize the chunking service
+
+        Args:
+            executor: Process pool executor. Without one, chunking runs in a worker thread.
+            segment_size: Size in characters of the segments large contents are split into
+            parallel_threshold: Contents of at least this many characters are split into segments
+            batch_chars: Maximum total size of small contents sent to a worker in one call
+        """
+        self.executor = executor
+        self.segment_size = segment_size
+        self.parallel_threshold = parallel_threshold
+        self.batch_chars = batch_chars
+
+    async def get_chunk_size(self) -> int:
+        """Get the chunk size, the maximum sequence length of the embedding model."""
+        return await embedding_service.get_max_seq_length()
+
+    @property
+    def metrics(self) -> Optional[Dict[str, Any]]:
+        """Get process pool metrics."""
+        return self.executor.metrics if self.executor else None
+
+    async def _chunk_contents(
+        self, contents: List[str], code: bool, return_exceptions: bool = False
+    ) -> List[Union[List[str], Exception]]:
+        """Chunk a list of contents in a single executor call."""
+        if self.executor is None:
+            chunker = config.code_chunker_instance if code else config.chunker_instance
+            return await asyncio.to_thread(
+                chunk_with, chunker, contents, return_exceptions
+            )
+        return await self.executor.run(
+            chunk_in_worker, code, await self.get_chunk_size(), contents, return_exceptions
+        )
+
+    async def iter_chunks(self, content: str, code: bool = False) -> AsyncIterator[str]:
+        """
+        Lazily chunk content segment by segment
+
+        As many segments as there are workers are chunked in parallel at a time,
+        so memory use stays bounded for very large contents. Chunk boundaries at
+        segment edges are approximate, see iter_content_segments. Code is chunked
+        whole, since cutting it into segments would split functions and classes.
+
+        Args:
+            content: The content to chunk
+            code: Whether to use the code chunker
+
+        Yields:
+            Non-empty chunk texts in document order
+        """
+        if code:
+            (chunk_texts,) = await self._chunk_contents([content], code)
+            for chunk_text in chunk_texts:
+                yield chunk_text
+            return
+
+        window = self.executor.max_workers if self.executor else 1
+        segments = iter_content_segments(content, self.segment_size)
+        while True:
+            group = list(islice(segments, window))
+            if not group:
+                break
+            results = await asyncio.gather(
+                *(self._chunk_contents([segment], code) for segment in group)
+            )
+            for (chunk_texts,) in results:
+                for chunk_text in chunk_texts:
+                    yield chunk_text
+
+    async def chunk(self, content: str, code: bool = False) -> List[str]:
+        """
+        Chunk a single content without blocking the event loop
+
+        Args:
+            content: The content to chunk
+            code: Whether to use the code chunker
+
+        Returns:
+            Non-empty chunk texts in document order
+        """
+        if code or len(content) < self.parallel_threshold:
+            (chunk_texts,) = await self._chunk_contents([content], code)
+            return chunk_texts
+        return [chunk_text async for chunk_text in self.iter_chunks(content, code)]
+
+    async def chunk_many(
+        self, contents: Sequence[str], code: bool = False
+    ) -> List[Union[List[str], Exception]]:
+        """
+        Chunk many contents in parallel
+
+        Small contents are grouped into batches of up to batch_chars characters to
+        keep the number of worker round trips low. A content that fails to chunk
+        does not affect the others.
+
+        Args:
+            contents: The contents to chunk
+            code: Whether to use the code chunker
+
+        Returns:
+            For each content, in input order, its chunk texts or the exception raised
+            while chunking it
+        """
+        contents = list(contents)
+        batches: List[List[int]] = []
+        large_indexes: List[int] = []
+        batch: List[int] = []
+        batch_chars = 0
+        for index, content in enumerate(contents):
+            if len(content) >= self.parallel_threshold:
+                large_indexes.append(index)
+                continue
+            if batch and batch_chars + len(content) > self.batch_chars:
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(index)
+            batch_chars += len(content)
+        if batch:
+            batches.append(batch)
+
+        outcomes = await asyncio.gather(
+            *(
+                self._chunk_contents(
+                    [contents[index] for index in batch], code, return_exceptions=True
+                )
+                for batch in batches
+            ),
+            *(self.chunk(contents[index], code) for index in large_indexes),
+            return_exceptions=True,
+        )
+
+        results: List[Union[List[str], Exception]] = [None] * len(contents)
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, BaseException):
+                for index in batch:
+                    results[index] = outcome
+            else:
+                for index, result in zip(batch, outcome):
+                    results[index] = result
+        for index, outcome in zip(large_indexes, outcomes[len(batches) :]):
+            results[index] = outcome
+
+        return results
+
+
+# Shared chunking service used by ingestion
+chunking_service = ChunkingService(
+    executor=ModelExecutor(
+        "chunking",
+        kind="process",
+        max_workers=config.CHUNKING_WORKERS,
+        max_queue_depth=config.CHUNKING_WORKERS * 16,
+    )
+    if config.CHUNKING_WORKERS > 0
+    else None,
+    segment_size=config.CHUNKING_SEGMENT_SIZE,
+    parallel_threshold=config.CHUNKING_PARALLEL_THRESHOLD,
+)
@@ -0,0 +1,42 @@
+"""
+Chunking functions run inside the process pool workers of the chunking service.
+
+Kept apart from app/utils/chunking_service.py so that the workers import
+neither the database models nor the embedding service.
+"""
+from typing import Any, Dict, List, Tuple, Union
+
+
+def chunk_with(
+    chunker, contents: List[str], return_exceptions: bool = False
+) -> List[Union[List[str], Exception]]:
+    """Chunk each content with the given chunker, dropping empty chunks."""
+    results = []
+    for content in contents:
+        try:
+            results.append(
+                [chunk.text for chunk in chunker.chunk(content) if chunk.text.strip()]
+            )
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+# Chunkers created lazily inside each process pool worker, keyed by (code, chunk_size)
+_worker_chunkers: Dict[Tuple[bool, int], Any] = {}
+
+
+def chunk_in_worker(
+    code: bool, chunk_size: int, contents: List[str], return_exceptions: bool = False
+) -> List[Union[List[str], Exception]]:
+    """Chunk contents inside a process pool worker."""
+    key = (code, chunk_size)
+    chunker = _worker_chunkers.get(key)
+    if chunker is None:
+        from chonkie import CodeChunker, RecursiveChunker
+
+        chunker_class = CodeChunker if code else RecursiveChunker
+        chunker = _worker_chunkers[key] = chunker_class(chunk_size=chunk_size)
+    return chunk_with(chunker, contents, return_exceptions)
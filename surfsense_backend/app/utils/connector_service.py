@@ -12,14 +12,59 @@ from sqlalchemy import func
 from app.agents.researcher.configuration import SearchMode
 
 
+# Document types searched in the user's own knowledge base rather than through an external API
+LOCAL_DOCUMENT_TYPES = (
+    "CRAWLED_URL",
+    "FILE",
+    "SLACK_CONNECTOR",
+    "NOTION_CONNECTOR",
+    "EXTENSION",
+    "YOUTUBE_VIDEO",
+    "GITHUB_CONNECTOR",
+    "LINEAR_CONNECTOR",
+    "DISCORD_CONNECTOR",
+)
+
+
 class ConnectorService:
-    def __init__(self, session: AsyncSession, user_id: str = None):
+    def __init__(self, session: AsyncSession, user_id: str = None, search_preset: str = None):
         self.session = session
-        self.chunk_retriever = ChucksHybridSearchRetriever(session)
-        self.document_retriever = DocumentHybridSearchRetriever(session)
+        self.chunk_retriever = ChucksHybridSearchRetriever(session, search_preset)
+        self.document_retriever = DocumentHybridSearchRetriever(session, search_preset)
         self.user_id = user_id
+        self.search_preset = search_preset  # Vector search preset, see VECTOR_SEARCH_PRESETS
+        self._root = self  # Service owning the counter, see for_session
         self.source_id_counter = 100000  # High starting value to avoid collisions with existing IDs
         self.counter_lock = asyncio.Lock()  # Lock to protect counter in multithreaded environments
+        self._prefetched_results = {}  # Local search results fetched ahead by prefetch_local_search
+    
+    @property
+    def source_id_counter(self) -> int:
+        return self._root._source_id_counter
+    
+    @source_id_counter.setter
+    def source_id_counter(self, value: int):
+        self._root._source_id_counter = value
+    
+    def for_session(self, session: AsyncSession) -> "ConnectorService":
+        """
+        Create a connector service searching with another database session.
+        
+        The new service shares the source ID counter, its lock and the prefetched
+        results with this one, so that several searches can run concurrently, each
+        on its own session, without handing out duplicate source IDs.
+        
+        Args:
+            session: The session for the new service
+            
+        Returns:
+            The connector service bound to the session
+        """
+        service = ConnectorService(session, self.user_id, self.search_preset)
+        service._root = self._root
+        service.counter_lock = self.counter_lock
+        service._prefetched_results = self._prefetched_results
+        return service
     
     async def initialize_counter(self):
         """
@@ -51,24 +96,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            crawled_urls_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="CRAWLED_URL"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            crawled_urls_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="CRAWLED_URL"
-            )
-            # Transform document retriever results to match expected format
-            crawled_urls_chunks = self._transform_document_results(crawled_urls_chunks)
+        crawled_urls_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="CRAWLED_URL"
+        )
 
         # Early return if no results
         if not crawled_urls_chunks:
@@ -115,24 +150,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            files_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="FILE"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            files_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="FILE"
-            )
-            # Transform document retriever results to match expected format
-            files_chunks = self._transform_document_results(files_chunks)
+        files_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="FILE"
+        )
         
         # Early return if no results
         if not files_chunks:
@@ -172,6 +197,117 @@ class ConnectorService:
         
         return result_object, files_chunks
     
+    async def prefetch_local_search_many(self, user_queries: List[str], user_id: str, search_space_id: int, connectors: List[str], top_k: int = 20, search_mode: SearchMode = SearchMode.CHUNKS) -> None:
+        """
+        Search the selected local connectors for several queries up front.
+        
+        In chunks mode each selected local connector is searched for all queries in
+        a single hybrid_search_many query, so the number of database round trips no
+        longer grows with the number of queries. The results are kept until the
+        matching search_* method asks for them. Several prefetches may run
+        concurrently on services created with for_session.
+        
+        Args:
+            user_queries: The search queries, e.g. all research questions
+            user_id: The ID of the user performing the search
+            search_space_id: The search space to search
+            connectors: The selected connectors. Non-local connectors are ignored.
+            top_k: Number of results per connector and query
+            search_mode: Whether to search chunks or documents
+        """
+        if search_mode != SearchMode.CHUNKS or len(user_queries) < 2:
+            return
+        
+        document_types = [connector for connector in connectors if connector in LOCAL_DOCUMENT_TYPES]
+        for document_type in document_types:
+            # Savepoint so that a failed prefetch leaves the session usable for the fallback searches
+            async with self.session.begin_nested():
+                results_by_query = await self.chunk_retriever.hybrid_search_many(
+                    query_texts=user_queries,
+                    top_k=top_k,
+                    user_id=user_id,
+                    search_space_id=search_space_id,
+                    document_type=document_type
+                )
+            for user_query, results in zip(user_queries, results_by_query):
+                key = (user_query, user_id, search_space_id, top_k, search_mode, document_type)
+                self._prefetched_results[key] = results
+    
+    def clear_prefetched_results(self) -> None:
+        """Discard the results of earlier prefetches, e.g. before researching new questions."""
+        self._prefetched_results.clear()
+    
+    async def prefetch_local_search(self, user_query: str, user_id: str, search_space_id: int, connectors: List[str], top_k: int = 20, search_mode: SearchMode = SearchMode.CHUNKS) -> None:
+        """
+        Search all selected local connectors in a single database round trip.
+        
+        When at least two local connectors without prefetched results are selected,
+        their results are fetched with one hybrid_search_by_types query and kept
+        until the matching search_* method asks for them.
+        
+        Args:
+            user_query: The search query
+            user_id: The ID of the user performing the search
+            search_space_id: The search space to search
+            connectors: The selected connectors. Non-local connectors are ignored.
+            top_k: Number of results per connector
+            search_mode: Whether to search chunks or documents
+        """
+        document_types = [
+            connector for connector in connectors
+            if connector in LOCAL_DOCUMENT_TYPES
+            and (user_query, user_id, search_space_id, top_k, search_mode, connector) not in self._prefetched_results
+        ]
+        if len(document_types) < 2:
+            return
+        
+        retriever = self.chunk_retriever if search_mode == SearchMode.CHUNKS else self.document_retriever
+        # Savepoint so that a failed prefetch leaves the session usable for the fallback searches
+        async with self.session.begin_nested():
+            results_by_type = await retriever.hybrid_search_by_types(
+                query_text=user_query,
+                top_k=top_k,
+                user_id=user_id,
+                search_space_id=search_space_id,
+                document_types=document_types
+            )
+        for document_type, results in results_by_type.items():
+            key = (user_query, user_id, search_space_id, top_k, search_mode, document_type)
+            self._prefetched_results[key] = results
+    
+    async def _local_hybrid_search(self, user_query: str, user_id: str, search_space_id: int, top_k: int, search_mode: SearchMode, document_type: str) -> List[Dict]:
+        """
+        Hybrid search one local document type, using prefetched results when available.
+        
+        Returns:
+            List of chunk dictionaries. Document results are transformed to the chunk format.
+        """
+        key = (user_query, user_id, search_space_id, top_k, search_mode, document_type)
+        if key in self._prefetched_results:
+            results = self._prefetched_results.pop(key)
+        elif search_mode == SearchMode.CHUNKS:
+            results = await self.chunk_retriever.hybrid_search(
+                query_text=user_query,
+                top_k=top_k,
+                user_id=user_id,
+                search_space_id=search_space_id,
+                document_type=document_type
+            )
+        else:
+            results = await self.document_retriever.hybrid_search(
+                query_text=user_query,
+                top_k=top_k,
+                user_id=user_id,
+                search_space_id=search_space_id,
+                document_type=document_type
+            )
+        
+        if search_mode == SearchMode.DOCUMENTS:
+            # Transform document retriever results to match expected format
+            results = self._transform_document_results(results)
+        
+        return results
+    
     def _transform_document_results(self, document_results: List[Dict]) -> List[Dict]:
         """
         Transform results from document_retriever.hybrid_search() to match the format
@@ -327,24 +463,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            slack_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="SLACK_CONNECTOR"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            slack_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="SLACK_CONNECTOR"
-            )
-            # Transform document retriever results to match expected format
-            slack_chunks = self._transform_document_results(slack_chunks)
+        slack_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="SLACK_CONNECTOR"
+        )
         
         # Early return if no results
         if not slack_chunks:
@@ -416,24 +542,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            notion_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="NOTION_CONNECTOR"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            notion_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="NOTION_CONNECTOR"
-            )
-            # Transform document retriever results to match expected format
-            notion_chunks = self._transform_document_results(notion_chunks)
+        notion_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="NOTION_CONNECTOR"
+        )
             
         # Early return if no results
         if not notion_chunks:
@@ -506,24 +622,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            extension_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="EXTENSION"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            extension_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="EXTENSION"
-            )
-            # Transform document retriever results to match expected format
-            extension_chunks = self._transform_document_results(extension_chunks)
+        extension_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="EXTENSION"
+        )
 
         # Early return if no results
         if not extension_chunks:
@@ -614,24 +720,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            youtube_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="YOUTUBE_VIDEO"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            youtube_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="YOUTUBE_VIDEO"
-            )
-            # Transform document retriever results to match expected format
-            youtube_chunks = self._transform_document_results(youtube_chunks)
+        youtube_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="YOUTUBE_VIDEO"
+        )
         
         # Early return if no results
         if not youtube_chunks:
@@ -698,24 +794,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            github_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="GITHUB_CONNECTOR"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            github_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="GITHUB_CONNECTOR"
-            )
-            # Transform document retriever results to match expected format
-            github_chunks = self._transform_document_results(github_chunks)
+        github_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="GITHUB_CONNECTOR"
+        )
         
         # Early return if no results
         if not github_chunks:
@@ -768,24 +854,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            linear_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="LINEAR_CONNECTOR"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            linear_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="LINEAR_CONNECTOR"
-            )
-            # Transform document retriever results to match expected format
-            linear_chunks = self._transform_document_results(linear_chunks)
+        linear_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="LINEAR_CONNECTOR"
+        )
 
         # Early return if no results
         if not linear_chunks:
@@ -976,24 +1052,14 @@ class ConnectorService:
         Returns:
             tuple: (sources_info, langchain_documents)
         """
-        if search_mode == SearchMode.CHUNKS:
-            discord_chunks = await self.chunk_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="DISCORD_CONNECTOR"
-            )
-        elif search_mode == SearchMode.DOCUMENTS:
-            discord_chunks = await self.document_retriever.hybrid_search(
-                query_text=user_query,
-                top_k=top_k,
-                user_id=user_id,
-                search_space_id=search_space_id,
-                document_type="DISCORD_CONNECTOR"
-            )
-            # Transform document retriever results to match expected format
-            discord_chunks = self._transform_document_results(discord_chunks)
+        discord_chunks = await self._local_hybrid_search(
+            user_query=user_query,
+            user_id=user_id,
+            search_space_id=search_space_id,
+            top_k=top_k,
+            search_mode=search_mode,
+            document_type="DISCORD_CONNECTOR"
+        )
         
         # Early return if no results
         if not discord_chunks:
@@ -0,0 +1,301 @@
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.db import Chunk, Document, DocumentType
+from app.utils.chunking_service import chunking_service
+from app.utils.embedding_service import embedding_service
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_chunk_text(text: str) -> str:
+    """Hash chunk text the same way as the md5() used to match stored chunks."""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+async def _insert_chunk_batch(
+    session: AsyncSession,
+    document: Document,
+    chunk_texts: List[str],
+    positions: Sequence[int],
+) -> int:
+    """Embed a batch of chunk texts and insert the rows without ORM hydration."""
+    chunk_embeddings = await embedding_service.embed_many(chunk_texts, session=session)
+    await session.execute(
+        insert(Chunk),
+        [
+            {
+                "document_id": document.id,
+                "search_space_id": document.search_space_id,
+                "position": position,
+                "content": text,
+                "embedding": embedding,
+            }
+            for position, text, embedding in zip(
+                positions, chunk_texts, chunk_embeddings
+            )
+        ],
+    )
+    return len(chunk_texts)
+
+
+async def store_document_with_chunks(
+    session: AsyncSession,
+    document: Document,
+    content: str,
+    code: bool = False,
+    chunk_texts: Optional[List[str]] = None,
+) -> Document:
+    """
+    Embed a new document's summary, chunk and embed its content and add it to the session.
+
+    Documents shorter than STREAMING_INGESTION_THRESHOLD characters are chunked and
+    embedded in one go and stored with their chunks. Larger documents are streamed:
+    chunks are produced lazily and embedded and inserted in batches of
+    STREAMING_CHUNK_BATCH_SIZE, so peak memory depends on the batch size and not on
+    the document size. The streamed inserts run in a savepoint, so a failure leaves
+    no partial document behind.
+
+    Args:
+        session: Database session. The caller commits.
+        document: The new document with its summary as content
+        content: The full content to chunk
+        code: Whether to chunk the content with the code chunker
+        chunk_texts: Chunk texts of the content if it was already chunked, e.g. with
+            chunking_service.chunk_many
+
+    Returns:
+        The document added to the session
+    """
+    if chunk_texts is not None or len(content) < config.STREAMING_INGESTION_THRESHOLD:
+        if chunk_texts is None:
+            chunk_texts = await chunking_service.chunk(content, code)
+
+        # Embed the summary and all chunks in batches
+        summary_embedding, chunk_embeddings = await embedding_service.embed_document(
+            document.content, chunk_texts, session=session
+        )
+        document.embedding = summary_embedding
+        document.chunks = [
+            Chunk(position=position, content=text, embedding=embedding)
+            for position, (text, embedding) in enumerate(
+                zip(chunk_texts, chunk_embeddings)
+            )
+        ]
+        session.add(document)
+        return document
+
+    batch_size = config.STREAMING_CHUNK_BATCH_SIZE
+    async with session.begin_nested():
+        summary_embeddings = await embedding_service.embed_many(
+            [document.content], session=session
+        )
+        document.embedding = summary_embeddings[0]
+        session.add(document)
+        await session.flush()
+
+        chunk_count = 0
+        batch: List[str] = []
+        async for chunk_text in chunking_service.iter_chunks(content, code):
+            batch.append(chunk_text)
+            if len(batch) >= batch_size:
+                chunk_count += await _insert_chunk_batch(
+                    session,
+                    document,
+                    batch,
+                    range(chunk_count, chunk_count + len(batch)),
+                )
+                batch = []
+        if batch:
+            chunk_count += await _insert_chunk_batch(
+                session, document, batch, range(chunk_count, chunk_count + len(batch))
+            )
+
+    logger.info(
+        f"Streamed {chunk_count} chunks for document {document.id} ({len(content)} characters)"
+    )
+    return document
+
+
+async def sync_document_chunks(
+    session: AsyncSession,
+    document: Document,
+    content: str,
+    code: bool = False,
+    chunk_texts: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """
+    Incrementally update the chunks of an existing document whose content changed.
+
+    The new content is re-chunked and its chunks are matched by hash against the
+    stored chunks. Unchanged chunks keep their rows and embeddings and only get
+    their position updated, new or changed chunks are embedded and inserted, and
+    chunks that no longer exist are deleted in a single statement. The summary
+    embedding is refreshed from document.content.
+
+    Args:
+        session: Database session. The caller commits.
+        document: The persisted document, with its new summary as content
+        content: The new full content to chunk
+        code: Whether to chunk the content with the code chunker
+        chunk_texts: Chunk texts of the content if it was already chunked
+
+    Returns:
+        Counts of reused, embedded and deleted chunks
+    """
+    if chunk_texts is None:
+        chunk_texts = await chunking_service.chunk(content, code)
+
+    summary_embeddings = await embedding_service.embed_many(
+        [document.content], session=session
+    )
+    document.embedding = summary_embeddings[0]
+
+    # Stored chunks by content hash, in document order so duplicates match in order
+    result = await session.execute(
+        select(Chunk.id, Chunk.position, func.md5(Chunk.content))
+        .where(
+            Chunk.document_id == document.id,
+            Chunk.search_space_id == document.search_space_id,
+        )
+        .order_by(Chunk.position, Chunk.id)
+    )
+    stored_chunks = defaultdict(list)
+    for chunk_id, position, content_hash in result:
+        stored_chunks[content_hash].append((chunk_id, position))
+
+    moved_chunks = []
+    new_texts = []
+    new_positions = []
+    for position, chunk_text in enumerate(chunk_texts):
+        matches = stored_chunks.get(_hash_chunk_text(chunk_text))
+        if matches:
+            chunk_id, stored_position = matches.pop(0)
+            if stored_position != position:
+                moved_chunks.append({"chunk_id": chunk_id, "new_position": position})
+        else:
+            new_texts.append(chunk_text)
+            new_positions.append(position)
+
+    orphan_ids = [chunk_id for matches in stored_chunks.values() for chunk_id, _ in matches]
+    if orphan_ids:
+        await session.execute(
+            delete(Chunk)
+            .where(
+                Chunk.id.in_(orphan_ids),
+                Chunk.search_space_id == document.search_space_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if moved_chunks:
+        # Filtering on the search space lets partitioned storage prune partitions
+        chunks_table = Chunk.__table__
+        await session.execute(
+            update(chunks_table)
+            .where(
+                chunks_table.c.id == bindparam("chunk_id"),
+                chunks_table.c.search_space_id == document.search_space_id,
+            )
+            .values(position=bindparam("new_position")),
+            moved_chunks,
+        )
+
+    batch_size = config.STREAMING_CHUNK_BATCH_SIZE
+    for start in range(0, len(new_texts), batch_size):
+        await _insert_chunk_batch(
+            session,
+            document,
+            new_texts[start : start + batch_size],
+            new_positions[start : start + batch_size],
+        )
+
+    stats = {
+        "reused": len(chunk_texts) - len(new_texts),
+        "embedded": len(new_texts),
+        "deleted": len(orphan_ids),
+    }
+    logger.info(f"Synced chunks for document {document.id}: {stats}")
+    return stats
+
+
+async def find_document_by_metadata(
+    session: AsyncSession,
+    search_space_id: int,
+    document_type: DocumentType,
+    identifiers: Dict[str, Any],
+) -> Optional[Document]:
+    """
+    Find the document a connector indexed earlier for a given source item.
+
+    Args:
+        session: Database session
+        search_space_id: The search space of the document
+        document_type: The connector document type
+        identifiers: document_metadata values identifying the source item, e.g.
+            {"issue_id": issue_id}
+
+    Returns:
+        The most recent matching document, or None
+    """
+    conditions = [
+        Document.document_metadata[key].as_string() == str(value)
+        for key, value in identifiers.items()
+    ]
+    result = await session.execute(
+        select(Document)
+        .where(
+            Document.search_space_id == search_space_id,
+            Document.document_type == document_type,
+            *conditions,
+        )
+        .order_by(Document.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def upsert_document_with_chunks(
+    session: AsyncSession,
+    document: Document,
+    content: str,
+    existing_document: Optional[Document] = None,
+    code: bool = False,
+    chunk_texts: Optional[List[str]] = None,
+) -> Document:
+    """
+    Store a new document, or update an earlier version of it in place.
+
+    Without an existing document this is store_document_with_chunks. Otherwise the
+    existing document takes the title, metadata, summary and content hash of the
+    new one and its chunks are synced with sync_document_chunks.
+
+    Args:
+        session: Database session. The caller commits.
+        document: The new, not yet persisted document
+        content: The full content to chunk
+        existing_document: The earlier version of the document, if any
+        code: Whether to chunk the content with the code chunker
+        chunk_texts: Chunk texts of the content if it was already chunked
+
+    Returns:
+        The stored document
+    """
+    if existing_document is None:
+        return await store_document_with_chunks(
+            session, document, content, code=code, chunk_texts=chunk_texts
+        )
+
+    existing_document.title = document.title
+    existing_document.document_metadata = document.document_metadata
+    existing_document.content = document.content
+    existing_document.content_hash = document.content_hash
+    await sync_document_chunks(
+        session, existing_document, content, code=code, chunk_texts=chunk_texts
+    )
+    return existing_document
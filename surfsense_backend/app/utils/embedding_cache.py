@@ -0,0 +1,215 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import EmbeddingCacheEntry, async_session_maker
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT, 5 bind parameters each, well below the 32767 parameters
+# asyncpg accepts in a single statement
+INSERT_BATCH_SIZE = 1000
+
+
+def hash_embedding_text(text: str) -> str:
+    """Generate the SHA-256 cache key of a text to embed."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed embedding cache stored in the embedding_cache table.
+
+    Entries are keyed by (embedding model name, sha256 of the text), so chunks whose
+    text did not change are never embedded twice, even when their document is
+    re-created. The table is bounded by max_entries and evicts the least recently
+    used entries first.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000000,
+        eviction_slack: float = 0.1,
+        touch_interval_seconds: float = 3600,
+    ):
+        """
+        Initialize the embedding cache
+
+        Args:
+            max_entries: Maximum number of cached embeddings. 0 disables eviction.
+            eviction_slack: Fraction of max_entries evicted at once when the cache is full,
+                so eviction does not run on every insert.
+            touch_interval_seconds: Minimum age of last_used_at before a hit updates it,
+                so repeated hits do not turn every lookup into a write.
+        """
+        self.max_entries = max_entries
+        self.eviction_slack = eviction_slack
+        self.touch_interval = timedelta(seconds=touch_interval_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._inserts_since_eviction_check = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    async def get_many(
+        self, session: AsyncSession, model_name: str, content_hashes: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Look up cached embeddings in bulk
+
+        Args:
+            session: Database session
+            model_name: Name of the embedding model
+            content_hashes: Hashes of the texts to look up, duplicates allowed
+
+        Returns:
+            Dictionary mapping each cached hash to its embedding
+        """
+        unique_hashes = list(dict.fromkeys(content_hashes))
+        if not unique_hashes:
+            return {}
+
+        result = await session.execute(
+            select(
+                EmbeddingCacheEntry.id,
+                EmbeddingCacheEntry.content_hash,
+                EmbeddingCacheEntry.embedding,
+                EmbeddingCacheEntry.last_used_at,
+            ).where(
+                EmbeddingCacheEntry.model_name == model_name,
+                EmbeddingCacheEntry.content_hash.in_(unique_hashes),
+            )
+        )
+        now = datetime.now(timezone.utc)
+        cached = {}
+        stale_ids = []
+        for entry_id, content_hash, embedding, last_used_at in result.all():
+            cached[content_hash] = embedding
+            if last_used_at is None or now - last_used_at >= self.touch_interval:
+                stale_ids.append(entry_id)
+
+        if stale_ids:
+            await self._touch(stale_ids, now)
+
+        hits = sum(1 for content_hash in content_hashes if content_hash in cached)
+        self.hits += hits
+        self.misses += len(content_hashes) - hits
+
+        return cached
+
+    async def _touch(self, entry_ids: List[int], now: datetime) -> None:
+        """
+        Refresh last_used_at of hit entries so they survive LRU eviction
+
+        Runs in its own short session rather than the ingestion transaction, so
+        concurrent ingestions sharing cached texts do not hold locks on the
+        entries until they commit. Entries are locked in id order and entries
+        locked by another touch are skipped, so touches never deadlock.
+        """
+        try:
+            async with async_session_maker() as session:
+                locked_ids = (
+                    select(EmbeddingCacheEntry.id)
+                    .where(EmbeddingCacheEntry.id.in_(sorted(entry_ids)))
+                    .order_by(EmbeddingCacheEntry.id)
+                    .with_for_update(skip_locked=True)
+                )
+                await session.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(EmbeddingCacheEntry.id.in_(locked_ids))
+                    .values(last_used_at=now)
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache touch failed: {e}")
+
+    async def put_many(
+        self, session: AsyncSession, model_name: str, embeddings: Dict[str, Any]
+    ) -> None:
+        """
+        Store embeddings in the cache, ignoring entries that already exist
+
+        Args:
+            session: Database session
+            model_name: Name of the embedding model
+            embeddings: Dictionary mapping text hashes to embeddings
+        """
+        if not embeddings:
+            return
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "model_name": model_name,
+                "content_hash": content_hash,
+                "embedding": embedding,
+                "created_at": now,
+                "last_used_at": now,
+            }
+            for content_hash, embedding in embeddings.items()
+        ]
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            await session.execute(
+                insert(EmbeddingCacheEntry)
+                .values(rows[start:start + INSERT_BATCH_SIZE])
+                .on_conflict_do_nothing(
+                    constraint="uq_embedding_cache_model_content_hash"
+                )
+            )
+
+        self._inserts_since_eviction_check += len(embeddings)
+        if self.max_entries and self._inserts_since_eviction_check >= max(
+            1, int(self.max_entries * self.eviction_slack)
+        ):
+            await self.evict(session)
+
+    async def evict(self, session: AsyncSession) -> int:
+        """
+        Evict the least recently used entries once the cache exceeds max_entries
+
+        Args:
+            session: Database session
+
+        Returns:
+            Number of evicted entries
+        """
+        self._inserts_since_eviction_check = 0
+        if not self.max_entries:
+            return 0
+
+        total = (
+            await session.execute(select(func.count(EmbeddingCacheEntry.id)))
+        ).scalar() or 0
+        if total <= self.max_entries:
+            return 0
+
+        # Evict down to below the limit so eviction does not run on every insert
+        target = int(self.max_entries * (1 - self.eviction_slack))
+        stale_ids = (
+            select(EmbeddingCacheEntry.id)
+            .order_by(EmbeddingCacheEntry.last_used_at.asc())
+            .limit(total - target)
+        )
+        result = await session.execute(
+            delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.id.in_(stale_ids))
+        )
+        evicted = result.rowcount or 0
+        self.evictions += evicted
+        logger.info(f"Evicted {evicted} entries from the embedding cache")
+
+        return evicted
@@ -0,0 +1,210 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.utils.embedding_cache import EmbeddingCache, hash_embedding_text
+from app.utils.embedding_worker import (
+    embed_batch_in_worker,
+    embed_with_model,
+    init_embedding_worker,
+    max_seq_length_in_worker,
+)
+from app.utils.model_executor import ModelExecutor
+
+
+class EmbeddingService:
+    """
+    Service for computing embeddings with the configured embedding model.
+
+    All ingestion and retrieval paths go through this service so that texts are
+    embedded in batches on a dedicated executor and the model never runs on the
+    event loop thread.
+    """
+
+    def __init__(
+        self,
+        embedding_model=None,
+        batch_size: int = 32,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        executor: Optional[ModelExecutor] = None,
+    ):
+        """
+        Initialize the embedding service
+
+        Args:
+            embedding_model: The embedding model to use. Defaults to the model from app config.
+            batch_size: Default number of texts embedded per model call
+            embedding_cache: Optional persistent cache consulted when a session is provided
+            executor: Executor running the model. Defaults to a single worker thread.
+        """
+        self._embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.embedding_cache = embedding_cache
+        self.executor = executor or ModelExecutor("embedding")
+        self._max_seq_length: Optional[int] = None
+
+    @property
+    def embedding_model(self):
+        return self._embedding_model or config.embedding_model_instance
+
+    @property
+    def model_name(self) -> str:
+        return config.EMBEDDING_MODEL
+
+    @property
+    def uses_worker_model(self) -> bool:
+        """Whether the model is only loaded in process pool workers."""
+        return self._embedding_model is None and self.executor.kind == "process"
+
+    async def get_max_seq_length(self) -> int:
+        """
+        Get the maximum sequence length of the embedding model
+
+        Read from a pool worker when the model runs in a process pool, so the
+        model is not loaded in this process as well.
+        """
+        if self._max_seq_length is None:
+            if self.uses_worker_model:
+                self._max_seq_length = await self.executor.run(max_seq_length_in_worker)
+            else:
+                self._max_seq_length = getattr(self.embedding_model, "max_seq_length", 512)
+        return self._max_seq_length
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Get executor and cache metrics."""
+        return {
+            "executor": self.executor.metrics,
+            "cache": self.embedding_cache.stats if self.embedding_cache else None,
+        }
+
+    def _embed_batch(self, texts: List[str]) -> List[Any]:
+        """Embed a single batch of texts synchronously."""
+        return embed_with_model(self.embedding_model, texts)
+
+    async def _embed_uncached(
+        self, texts: List[str], batch_size: Optional[int] = None
+    ) -> List[Any]:
+        """Run the embedding model over all texts in batches."""
+        batch_size = max(1, batch_size or self.batch_size)
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            if self.executor.kind == "process":
+                embeddings.extend(
+                    await self.executor.run(embed_batch_in_worker, batch)
+                )
+            else:
+                embeddings.extend(await self.executor.run(self._embed_batch, batch))
+
+        return embeddings
+
+    async def embed(self, text: str) -> Any:
+        """
+        Embed a single text without blocking the event loop
+
+        Args:
+            text: The text to embed
+
+        Returns:
+            The embedding vector
+        """
+        embeddings = await self.embed_many([text])
+        return embeddings[0]
+
+    async def embed_many(
+        self,
+        texts: Sequence[str],
+        batch_size: Optional[int] = None,
+        session: Optional[AsyncSession] = None,
+    ) -> List[Any]:
+        """
+        Embed many texts in batches without blocking the event loop
+
+        When a session is provided and the embedding cache is enabled, cached
+        embeddings are looked up in bulk first and only the misses are sent to
+        the model. New embeddings are written to the cache within the session.
+
+        Args:
+            texts: The texts to embed
+            batch_size: Number of texts per model call. Defaults to the service batch size.
+            session: Optional database session used for the persistent embedding cache
+
+        Returns:
+            List of embedding vectors in the same order as the input texts
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        if session is None or self.embedding_cache is None:
+            return await self._embed_uncached(texts, batch_size)
+
+        content_hashes = [hash_embedding_text(text) for text in texts]
+        embeddings_by_hash = await self.embedding_cache.get_many(
+            session, self.model_name, content_hashes
+        )
+
+        # Embed every distinct missing text once
+        missing_texts = {}
+        for content_hash, text in zip(content_hashes, texts):
+            if content_hash not in embeddings_by_hash:
+                missing_texts.setdefault(content_hash, text)
+
+        if missing_texts:
+            new_embeddings = dict(
+                zip(
+                    missing_texts.keys(),
+                    await self._embed_uncached(list(missing_texts.values()), batch_size),
+                )
+            )
+            await self.embedding_cache.put_many(
+                session, self.model_name, new_embeddings
+            )
+            embeddings_by_hash.update(new_embeddings)
+
+        return [embeddings_by_hash[content_hash] for content_hash in content_hashes]
+
+    async def embed_document(
+        self,
+        summary_content: str,
+        chunk_texts: Sequence[str],
+        session: Optional[AsyncSession] = None,
+    ) -> Tuple[Any, List[Any]]:
+        """
+        Embed a document summary together with all of its chunks
+
+        Args:
+            summary_content: The document summary
+            chunk_texts: The texts of the document chunks
+            session: Optional database session used for the persistent embedding cache
+
+        Returns:
+            Tuple of (summary_embedding, chunk_embeddings)
+        """
+        embeddings = await self.embed_many(
+            [summary_content, *chunk_texts], session=session
+        )
+        return embeddings[0], embeddings[1:]
+
+
+# Shared embedding service used by ingestion and retrieval
+embedding_service = EmbeddingService(
+    batch_size=config.EMBEDDING_BATCH_SIZE,
+    executor=ModelExecutor(
+        "embedding",
+        kind=config.EMBEDDING_EXECUTOR,
+        max_workers=config.EMBEDDING_EXECUTOR_WORKERS,
+        max_queue_depth=config.EMBEDDING_EXECUTOR_MAX_QUEUE,
+        initializer=init_embedding_worker
+        if config.EMBEDDING_EXECUTOR == "process"
+        else None,
+        initargs=(config.EMBEDDING_MODEL,)
+        if config.EMBEDDING_EXECUTOR == "process"
+        else (),
+    ),
+    embedding_cache=EmbeddingCache(max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES)
+    if config.EMBEDDING_CACHE_ENABLED
+    else None,
+)
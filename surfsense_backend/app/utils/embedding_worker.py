@@ -0,0 +1,36 @@
+"""
+Embedding functions run inside the process pool workers of the embedding service.
+
+Kept apart from app/utils/embedding_service.py so that the workers import
+neither the database models nor the embedding cache.
+"""
+from typing import Any, List
+
+
+def embed_with_model(model, texts: List[str]) -> List[Any]:
+    """Embed a single batch of texts synchronously with the given model."""
+    if hasattr(model, "embed_batch"):
+        return list(model.embed_batch(texts))
+    return [model.embed(text) for text in texts]
+
+
+# Embedding model loaded once per process when running in a process pool
+_worker_model = None
+
+
+def init_embedding_worker(model_name: str) -> None:
+    """Load the embedding model inside a process pool worker."""
+    global _worker_model
+    from chonkie import AutoEmbeddings
+
+    _worker_model = AutoEmbeddings.get_embeddings(model_name)
+
+
+def embed_batch_in_worker(texts: List[str]) -> List[Any]:
+    """Embed a batch of texts inside a process pool worker."""
+    return embed_with_model(_worker_model, texts)
+
+
+def max_seq_length_in_worker() -> int:
+    """Get the maximum sequence length of the model inside a process pool worker."""
+    return getattr(_worker_model, "max_seq_length", 512)
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[Any, float, float]:
+    """
+    Run fn inside the worker and report when it started and how long it took.
+
+    Module level so that it can be pickled for process pools.
+    """
+    started_at = time.time()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, started_at, time.perf_counter() - start
+
+
+def _warm_up_worker() -> None:
+    """
+    Keep a worker busy briefly, so concurrent warm up calls each start a worker.
+
+    Module level so that it can be pickled for process pools.
+    """
+    time.sleep(0.1)
+
+
+class ModelExecutor:
+    """
+    Async facade over a thread or process pool for blocking model inference.
+
+    Keeps inference off the event loop thread, bounds the number of queued calls
+    and records queue wait and inference time metrics.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = "thread",
+        max_workers: int = 1,
+        max_queue_depth: int = 64,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+    ):
+        """
+        Initialize the model executor
+
+        Args:
+            name: Name used in logs and metrics
+            kind: "thread" or "process"
+            max_workers: Number of pool workers
+            max_queue_depth: Maximum number of calls waiting for a worker. Further callers
+                wait until a slot frees up.
+            initializer: Optional worker initializer, e.g. to load a model in each process
+            initargs: Arguments for the initializer
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = asyncio.Semaphore(self.max_workers + self.max_queue_depth)
+
+        self._calls = 0
+        self._failures = 0
+        self._timeouts = 0
+        self._in_flight = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._inference_total = 0.0
+        self._inference_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        """Create the pool on first use."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        # Spawn so that workers do not inherit model or event loop state
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=self._initializer,
+                            initargs=self._initargs,
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix=self.name,
+                            initializer=self._initializer,
+                            initargs=self._initargs,
+                        )
+                    logger.info(
+                        f"Started {self.kind} executor '{self.name}' with {self.max_workers} workers"
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run fn(*args) in the pool and await its result
+
+        Args:
+            fn: The blocking callable. Must be picklable for process pools.
+            *args: Arguments for fn
+            timeout: Optional timeout in seconds for queue wait plus inference
+
+        Returns:
+            The return value of fn
+        """
+        submitted_at = time.time()
+        await self._slots.acquire()
+        self._in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            work = self._get_executor().submit(_timed_call, fn, *args)
+        except Exception:
+            self._release_slot()
+            self._failures += 1
+            raise
+
+        # Free the slot when the pool is done with the call, not when the caller
+        # stops waiting, so timed out calls still running in a worker keep
+        # counting against max_workers + max_queue_depth
+        work.add_done_callback(lambda _: self._release_slot_threadsafe(loop))
+
+        try:
+            future = asyncio.wrap_future(work, loop=loop)
+            if timeout is not None:
+                remaining = max(0.0, timeout - (time.time() - submitted_at))
+                result, started_at, inference_time = await asyncio.wait_for(
+                    future, remaining
+                )
+            else:
+                result, started_at, inference_time = await future
+        except asyncio.TimeoutError:
+            self._failures += 1
+            self._timeouts += 1
+            raise
+        except Exception:
+            self._failures += 1
+            raise
+
+        queue_wait = max(0.0, started_at - submitted_at)
+        self._calls += 1
+        self._queue_wait_total += queue_wait
+        self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+        self._inference_total += inference_time
+        self._inference_max = max(self._inference_max, inference_time)
+
+        return result
+
+    async def warm_up(self) -> None:
+        """
+        Start the pool workers ahead of the first call, running their initializer,
+        e.g. to load a model in each worker process.
+        """
+        await asyncio.gather(
+            *(self.run(_warm_up_worker) for _ in range(self.max_workers))
+        )
+
+    def _release_slot(self) -> None:
+        self._in_flight -= 1
+        self._slots.release()
+
+    def _release_slot_threadsafe(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Release a slot from the pool callback thread."""
+        try:
+            loop.call_soon_threadsafe(self._release_slot)
+        except RuntimeError:
+            # The event loop is closed, nobody waits for the slot anymore
+            pass
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Get queue wait and inference time metrics in seconds."""
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "calls": self._calls,
+            "failures": self._failures,
+            "timeouts": self._timeouts,
+            "in_flight": self._in_flight,
+            "queue_wait_avg": self._queue_wait_total / self._calls if self._calls else 0.0,
+            "queue_wait_max": self._queue_wait_max,
+            "inference_avg": self._inference_total / self._calls if self._calls else 0.0,
+            "inference_max": self._inference_max,
+        }
+
+    def shutdown(self) -> None:
+        """Shut down the pool. It is recreated on the next call."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,114 @@
+import hashlib
+import re
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from app.config import config
+from app.db import Document
+
+SIMHASH_BITS = 64
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def compute_simhash(text: str, shingle_size: int = 3) -> Optional[int]:
+    """
+    Compute the 64-bit SimHash fingerprint of a text.
+
+    The text is lowercased and split into overlapping word shingles. Each
+    shingle votes on every bit of the fingerprint with its own hash, so texts
+    sharing most of their shingles get fingerprints differing in only a few
+    bits, while unrelated texts differ in about half of them.
+
+    Args:
+        text: The text to fingerprint
+        shingle_size: Number of words per shingle
+
+    Returns:
+        The fingerprint as a signed 64-bit integer, to fit a BIGINT column, or
+        None if the text has no words
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if not tokens:
+        return None
+
+    shingles = [
+        " ".join(tokens[i:i + shingle_size])
+        for i in range(max(1, len(tokens) - shingle_size + 1))
+    ]
+
+    # One row of 64 bits per shingle hash, bit i of a row being bit i of the
+    # little-endian hash, so the votes of large documents are counted in bulk
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=SIMHASH_BITS // 8).digest()
+        for shingle in shingles
+    )
+    bits = np.unpackbits(
+        np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), -1),
+        axis=1,
+        bitorder="little",
+    )
+    # A bit is set when most shingles have it set
+    set_bits = np.flatnonzero(bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles))
+
+    fingerprint = sum(1 << int(bit) for bit in set_bits)
+    # Two's complement so the fingerprint fits a signed BIGINT
+    if fingerprint >= 1 << (SIMHASH_BITS - 1):
+        fingerprint -= 1 << SIMHASH_BITS
+    return fingerprint
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Count the bits in which two 64-bit fingerprints differ."""
+    return ((first ^ second) & ((1 << SIMHASH_BITS) - 1)).bit_count()
+
+
+async def find_near_duplicate_document(session, search_space_id: int, document_type, simhash: Optional[int]):
+    """
+    Find a recent document of the same type and search space with a near-identical fingerprint.
+
+    Compares the fingerprint with those of the NEAR_DUPLICATE_WINDOW most recent
+    documents, which is cheap enough to run before any summarization or
+    embedding work. Only documents of the NEAR_DUPLICATE_DOCUMENT_TYPES are
+    checked, so e.g. a re-uploaded file with a small edit is ingested again.
+
+    Args:
+        session: Database session
+        search_space_id: ID of the search space
+        document_type: Type of the new document
+        simhash: Fingerprint of the new document content, see compute_simhash
+
+    Returns:
+        The near-duplicate document, or None if there is none or detection is
+        disabled for the document type
+    """
+    if simhash is None or not config.NEAR_DUPLICATE_DETECTION:
+        return None
+    if getattr(document_type, "value", document_type) not in config.NEAR_DUPLICATE_DOCUMENT_TYPES:
+        return None
+
+    result = await session.execute(
+        select(Document.id, Document.simhash)
+        .where(
+            Document.search_space_id == search_space_id,
+            Document.document_type == document_type,
+            Document.simhash.isnot(None),
+        )
+        .order_by(Document.created_at.desc())
+        .limit(config.NEAR_DUPLICATE_WINDOW)
+    )
+
+    best_id, best_distance = None, None
+    for document_id, document_simhash in result:
+        distance = hamming_distance(simhash, document_simhash)
+        if distance <= config.NEAR_DUPLICATE_MAX_DISTANCE and (best_distance is None or distance < best_distance):
+            best_id, best_distance = document_id, distance
+
+    if best_id is None:
+        return None
+
+    result = await session.execute(
+        select(Document).where(Document.id == best_id, Document.search_space_id == search_space_id)
+    )
+    return result.scalars().first()
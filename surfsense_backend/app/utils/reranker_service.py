@@ -1,95 +1,271 @@
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from rerankers import Document as RerankerDocument
 
+from app.config import config
+from app.utils.lru_cache import LRUCache
+from app.utils.model_executor import ModelExecutor
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _rank_with_model(reranker, query_text: str, texts_and_ids: List[Tuple[str, Any]]) -> List[Tuple[Any, float, int]]:
+    """
+    Rank texts synchronously with the given reranker.
+
+    Returns:
+        (doc_id, score, rank) of each ranked text, best first
+    """
+    reranker_docs = [
+        RerankerDocument(text=text, doc_id=doc_id) for text, doc_id in texts_and_ids
+    ]
+    reranking_results = reranker.rank(query=query_text, docs=reranker_docs)
+    return [
+        (result.document.doc_id, float(result.score), result.rank)
+        for result in reranking_results.results
+    ]
+
+
+# Reranker loaded once per process when running in a process pool
+_worker_reranker = None
+
+
+def _init_reranker_worker(model_name: str, model_type: str) -> None:
+    """Load the reranker inside a process pool worker."""
+    global _worker_reranker
+    from rerankers import Reranker
+
+    _worker_reranker = Reranker(model_name=model_name, model_type=model_type)
+
+
+def _rank_in_worker(query_text: str, texts_and_ids: List[Tuple[str, Any]]) -> List[Tuple[Any, float, int]]:
+    """Rank texts inside a process pool worker."""
+    return _rank_with_model(_worker_reranker, query_text, texts_and_ids)
+
+
 class RerankerService:
     """
     Service for reranking documents using a configured reranker
     """
-    
-    def __init__(self, reranker_instance=None):
+
+    def __init__(
+        self,
+        reranker_instance=None,
+        executor: Optional[ModelExecutor] = None,
+        timeout: Optional[float] = None,
+        score_cache: Optional[LRUCache] = None,
+        model_name: Optional[str] = None,
+    ):
         """
         Initialize the reranker service
-        
+
         Args:
-            reranker_instance: The reranker instance to use for reranking
+            reranker_instance: The reranker instance to use for reranking. Defaults to
+                the reranker from app config when RERANKERS_MODEL_NAME is set.
+            executor: Executor running the reranker. Defaults to a single worker thread.
+            timeout: Optional timeout in seconds of a reranking call, queue wait included
+            score_cache: Optional cache of scores keyed by (model, query hash, content hash).
+                Scores must be pointwise, i.e. not depend on the other documents ranked.
+            model_name: Name of the reranker in the score cache keys. Defaults to the
+                configured RERANKERS_MODEL_TYPE and RERANKERS_MODEL_NAME.
+        """
+        self._reranker_instance = reranker_instance
+        self.executor = executor or ModelExecutor("reranker")
+        self.timeout = timeout
+        self.timeouts = 0
+        self.score_cache = score_cache
+        self.model_name = model_name or f"{config.RERANKERS_MODEL_TYPE}:{config.RERANKERS_MODEL_NAME}"
+        # Query/document pairs sent to the model
+        self.scored_pairs = 0
+
+    @property
+    def reranker_instance(self):
+        if self._reranker_instance is not None:
+            return self._reranker_instance
+        return config.reranker_instance if config.RERANKERS_MODEL_NAME else None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a reranker is configured."""
+        return self._reranker_instance is not None or bool(config.RERANKERS_MODEL_NAME)
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Get executor latency metrics, timed out calls and score cache hit rates."""
+        return {
+            "executor": self.executor.metrics,
+            "timeouts": self.timeouts,
+            "scored_pairs": self.scored_pairs,
+            "score_cache": self.score_cache.stats if self.score_cache is not None else None,
+        }
+
+    def _lookup_scores(self, query_text: str, documents: List[Dict[str, Any]]):
+        """
+        Look up the cached scores of the documents.
+
+        Returns:
+            The score key of each document, the scores found by key, and the
+            (text, index) pairs of the distinct uncached texts to send to the model,
+            the index being a position in the list of score keys
         """
-        self.reranker_instance = reranker_instance
-    
+        query_hash = _text_hash(query_text)
+        keys = []
+        scores = {}
+        pending = []
+        for i, doc in enumerate(documents):
+            content = doc.get("content", "")
+            key = (self.model_name, query_hash, _text_hash(content))
+            keys.append(key)
+            if key in scores:
+                continue
+
+            score = self.score_cache.get(key) if self.score_cache is not None else None
+            scores[key] = score
+            if score is None:
+                pending.append((content, i))
+
+        return keys, scores, pending
+
+    def _store_scores(self, keys: List[tuple], scores: Dict[tuple, Optional[float]], ranking: List[Tuple[Any, float, int]]) -> None:
+        """Record the scores returned by the model, by document position."""
+        for index, score, _ in ranking:
+            key = keys[index]
+            scores[key] = score
+            if self.score_cache is not None:
+                self.score_cache.set(key, score)
+        self.scored_pairs += len(ranking)
+
+    @staticmethod
+    def _apply_scores(documents: List[Dict[str, Any]], keys: List[tuple], scores: Dict[tuple, Optional[float]]) -> List[Dict[str, Any]]:
+        """Copy the scored documents in descending score order with their reranked score and rank."""
+        scored = [
+            (scores[key], i) for i, key in enumerate(keys) if scores.get(key) is not None
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        # Convert to serializable dictionaries
+        serialized_results = []
+        for rank, (score, i) in enumerate(scored, start=1):
+            # Create a new document with the reranked score
+            reranked_doc = documents[i].copy()
+            reranked_doc["score"] = score
+            reranked_doc["rank"] = rank
+            serialized_results.append(reranked_doc)
+
+        return serialized_results
+
     def rerank_documents(self, query_text: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Rerank documents using the configured reranker
-        
+        Rerank documents using the configured reranker, blocking the calling thread
+
         Args:
             query_text: The query text to use for reranking
             documents: List of document dictionaries to rerank
-            
+
         Returns:
             List[Dict[str, Any]]: Reranked documents
         """
-        if not self.reranker_instance or not documents:
+        reranker_instance = self.reranker_instance
+        if not reranker_instance or not documents:
+            return documents
+
+        try:
+            keys, scores, pending = self._lookup_scores(query_text, documents)
+            if pending:
+                ranking = _rank_with_model(reranker_instance, query_text, pending)
+                self._store_scores(keys, scores, ranking)
+            return self._apply_scores(documents, keys, scores)
+
+        except Exception as e:
+            # Log the error
+            logging.error(f"Error during reranking: {str(e)}")
+            # Fall back to original documents without reranking
+            return documents
+
+    async def arerank_documents(self, query_text: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Rerank documents on the reranker executor without blocking the event loop
+
+        Only the documents without a cached score for the query are sent to the model.
+
+        Args:
+            query_text: The query text to use for reranking
+            documents: List of document dictionaries to rerank
+
+        Returns:
+            List[Dict[str, Any]]: Reranked documents, or the original documents if
+            reranking failed or timed out
+        """
+        if not self.enabled or not documents:
             return documents
-        
+
         try:
-            # Create Document objects for the rerankers library
-            reranker_docs = []
-            for i, doc in enumerate(documents):
-                chunk_id = doc.get("chunk_id", f"chunk_{i}")
-                content = doc.get("content", "")
-                score = doc.get("score", 0.0)
-                document_info = doc.get("document", {})
-                
-                reranker_docs.append(
-                    RerankerDocument(
-                        text=content,
-                        doc_id=chunk_id,
-                        metadata={
-                            'document_id': document_info.get("id", ""),
-                            'document_title': document_info.get("title", ""),
-                            'document_type': document_info.get("document_type", ""),
-                            'rrf_score': score
-                        }
+            keys, scores, pending = self._lookup_scores(query_text, documents)
+            if pending:
+                if self.executor.kind == "process":
+                    ranking = await self.executor.run(
+                        _rank_in_worker, query_text, pending, timeout=self.timeout
+                    )
+                else:
+                    ranking = await self.executor.run(
+                        self._rank, query_text, pending, timeout=self.timeout
                     )
-                )
-            
-            # Rerank using the configured reranker
-            reranking_results = self.reranker_instance.rank(
-                query=query_text,
-                docs=reranker_docs
-            )
-            
-            # Process the results from the reranker
-            # Convert to serializable dictionaries
-            serialized_results = []
-            for result in reranking_results.results:
-                # Find the original document by id
-                original_doc = next((doc for doc in documents if doc.get("chunk_id") == result.document.doc_id), None)
-                if original_doc:
-                    # Create a new document with the reranked score
-                    reranked_doc = original_doc.copy()
-                    reranked_doc["score"] = float(result.score)
-                    reranked_doc["rank"] = result.rank
-                    serialized_results.append(reranked_doc)
-            
-            return serialized_results
-        
+                self._store_scores(keys, scores, ranking)
+            return self._apply_scores(documents, keys, scores)
+
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logging.warning(f"Reranking {len(documents)} documents timed out after {self.timeout}s")
+            return documents
         except Exception as e:
             # Log the error
             logging.error(f"Error during reranking: {str(e)}")
             # Fall back to original documents without reranking
             return documents
-    
+
+    def _rank(self, query_text: str, texts_and_ids: List[Tuple[str, Any]]) -> List[Tuple[Any, float, int]]:
+        """Rank texts synchronously with the reranker of this process."""
+        return _rank_with_model(self.reranker_instance, query_text, texts_and_ids)
+
     @staticmethod
     def get_reranker_instance(config=None) -> Optional['RerankerService']:
         """
         Get a reranker service instance based on configuration
-        
+
         Args:
             config: Configuration object that may contain a reranker_instance
-            
+
         Returns:
             Optional[RerankerService]: A reranker service instance or None
         """
         if config and hasattr(config, 'reranker_instance') and config.reranker_instance:
             return RerankerService(config.reranker_instance)
-        return None 
\ No newline at end of file
+        return None
+
+
+# Shared reranker service used by the researcher agents
+reranker_service = RerankerService(
+    executor=ModelExecutor(
+        "reranker",
+        kind=config.RERANKER_EXECUTOR,
+        max_workers=config.RERANKER_EXECUTOR_WORKERS,
+        max_queue_depth=config.RERANKER_EXECUTOR_MAX_QUEUE,
+        initializer=_init_reranker_worker
+        if config.RERANKER_EXECUTOR == "process"
+        else None,
+        initargs=(config.RERANKERS_MODEL_NAME, config.RERANKERS_MODEL_TYPE)
+        if config.RERANKER_EXECUTOR == "process"
+        else (),
+    ),
+    timeout=config.RERANKER_TIMEOUT,
+    score_cache=LRUCache(
+        max_size=config.RERANKER_SCORE_CACHE_SIZE,
+        ttl_seconds=config.RERANKER_SCORE_CACHE_TTL,
+    )
+    if config.RERANKER_SCORE_CACHE_SIZE > 0
+    else None,
+)
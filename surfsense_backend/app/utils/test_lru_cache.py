@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+
+from surfsense_backend.app.utils.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        # Touch "a" so that "b" becomes the least recently used entry
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    @patch('surfsense_backend.app.utils.lru_cache.time.monotonic')
+    def test_expired_entries_are_misses(self, mock_monotonic):
+        cache = LRUCache(max_size=10, ttl_seconds=60)
+
+        mock_monotonic.return_value = 1000.0
+        cache.set("query", [0.1, 0.2])
+
+        mock_monotonic.return_value = 1059.0
+        self.assertEqual(cache.get("query"), [0.1, 0.2])
+
+        mock_monotonic.return_value = 1061.0
+        self.assertIsNone(cache.get("query"))
+        self.assertEqual(len(cache), 0)
+
+    def test_stats_track_hits_and_misses(self):
+        cache = LRUCache(max_size=10)
+        cache.set("a", 1)
+
+        cache.get("a")
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
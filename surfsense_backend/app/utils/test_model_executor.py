@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import unittest
+
+from surfsense_backend.app.utils.model_executor import ModelExecutor
+
+
+class TestModelExecutor(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = []
+
+    def tearDown(self):
+        self.release.set()
+
+    def blocking_call(self, name):
+        self.started.append(name)
+        self.release.wait(5)
+        return name
+
+    async def test_bounds_running_and_queued_calls(self):
+        executor = ModelExecutor("test", max_workers=1, max_queue_depth=1)
+        calls = [asyncio.create_task(executor.run(self.blocking_call, i)) for i in range(3)]
+        await asyncio.sleep(0.1)
+
+        # One call runs, one waits in the pool queue and the third waits for a slot
+        self.assertEqual(self.started, [0])
+        self.assertEqual(executor.metrics["in_flight"], 2)
+
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*calls), [0, 1, 2])
+        self.assertEqual(executor.metrics["in_flight"], 0)
+        self.assertEqual(executor.metrics["calls"], 3)
+        executor.shutdown()
+
+    async def test_counts_timeouts(self):
+        executor = ModelExecutor("test", max_workers=1, max_queue_depth=0)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await executor.run(self.blocking_call, "slow", timeout=0.05)
+
+        self.assertEqual(executor.metrics["timeouts"], 1)
+        self.assertEqual(executor.metrics["failures"], 1)
+        executor.shutdown()
+
+    async def test_timed_out_call_keeps_its_slot_until_the_pool_finishes(self):
+        executor = ModelExecutor("test", max_workers=1, max_queue_depth=0)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await executor.run(self.blocking_call, "slow", timeout=0.05)
+        next_call = asyncio.create_task(executor.run(self.blocking_call, "next"))
+        await asyncio.sleep(0.1)
+
+        # The timed out call still runs in the worker, so the next call waits
+        self.assertEqual(self.started, ["slow"])
+        self.assertFalse(next_call.done())
+        self.assertEqual(executor.metrics["in_flight"], 1)
+
+        self.release.set()
+        self.assertEqual(await next_call, "next")
+        self.assertEqual(executor.metrics["in_flight"], 0)
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from surfsense_backend.app.utils.near_duplicate_service import compute_simhash, hamming_distance
+
+WORDS = ["vector", "index", "search", "space", "document", "chunk", "query", "ranking",
+         "fusion", "embedding", "latency", "recall", "postgres", "cache", "summary", "page"]
+
+
+def make_page(step: int, period: int, modulus: int) -> str:
+    return " ".join(WORDS[(i * step + i // period) % len(WORDS)] + str(i % modulus) for i in range(600))
+
+
+class TestSimHash(unittest.TestCase):
+
+    def setUp(self):
+        self.page = make_page(7, 5, 13)
+
+    def test_formatting_changes_keep_the_fingerprint(self):
+        reformatted = self.page.upper().replace(" ", "\n  ")
+
+        self.assertEqual(compute_simhash(self.page), compute_simhash(reformatted))
+
+    def test_small_edit_is_a_near_duplicate(self):
+        edited = self.page.replace("vector0", "vectors0", 1)
+        self.assertNotEqual(edited, self.page)
+
+        self.assertLessEqual(hamming_distance(compute_simhash(self.page), compute_simhash(edited)), 3)
+
+    def test_different_page_is_not_a_near_duplicate(self):
+        other = make_page(3, 7, 11)
+
+        self.assertGreater(hamming_distance(compute_simhash(self.page), compute_simhash(other)), 3)
+
+    def test_fingerprint_fits_a_signed_bigint(self):
+        fingerprint = compute_simhash("Hello")
+
+        self.assertTrue(-(1 << 63) <= fingerprint < 1 << 63)
+        self.assertIsNone(compute_simhash("  ...  "))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from types import SimpleNamespace
+
+from surfsense_backend.app.utils.lru_cache import LRUCache
+from surfsense_backend.app.utils.reranker_service import RerankerService
+
+
+class FakeReranker:
+    """Pointwise reranker scoring a text by its length, recording the texts it ranks."""
+
+    def __init__(self):
+        self.calls = []
+
+    def rank(self, query, docs):
+        self.calls.append([doc.text for doc in docs])
+        ranked = sorted(docs, key=lambda doc: -len(doc.text))
+        return SimpleNamespace(
+            results=[
+                SimpleNamespace(document=doc, score=float(len(doc.text)), rank=rank)
+                for rank, doc in enumerate(ranked, start=1)
+            ]
+        )
+
+
+def make_documents(*contents):
+    return [{"chunk_id": i, "content": content} for i, content in enumerate(contents)]
+
+
+class TestRerankerScoreCache(unittest.TestCase):
+
+    def setUp(self):
+        self.reranker = FakeReranker()
+        self.service = RerankerService(
+            self.reranker, score_cache=LRUCache(max_size=100), model_name="fake"
+        )
+
+    def test_only_uncached_pairs_reach_the_model(self):
+        self.service.rerank_documents("query", make_documents("aa", "b"))
+        self.service.rerank_documents("query", make_documents("b", "cccc", "aa"))
+        self.service.rerank_documents("other query", make_documents("b"))
+
+        self.assertEqual(self.reranker.calls, [["aa", "b"], ["cccc"], ["b"]])
+        self.assertEqual(self.service.scored_pairs, 4)
+
+    def test_same_content_shares_one_score(self):
+        results = self.service.rerank_documents("query", make_documents("aa", "b", "aa"))
+
+        self.assertEqual(self.reranker.calls, [["aa", "b"]])
+        self.assertEqual([result["chunk_id"] for result in results], [0, 2, 1])
+        self.assertEqual(results[0]["score"], results[1]["score"])
+
+    def test_cached_run_matches_uncached_run(self):
+        documents = make_documents("b", "cccc", "aa", "dd")
+        self.service.rerank_documents("query", make_documents("aa", "cccc"))
+
+        cached = self.service.rerank_documents("query", documents)
+        uncached = RerankerService(FakeReranker(), model_name="fake").rerank_documents("query", documents)
+
+        self.assertEqual(
+            [(result["chunk_id"], result["score"], result["rank"]) for result in cached],
+            [(result["chunk_id"], result["score"], result["rank"]) for result in uncached],
+        )
+
+    def test_stats_report_hits(self):
+        self.service.rerank_documents("query", make_documents("aa", "b"))
+        self.service.rerank_documents("query", make_documents("aa", "b", "cc"))
+
+        stats = self.service.metrics["score_cache"]
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["size"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()